@@ -0,0 +1,161 @@
+"""Multi-timeframe OHLCV aggregation pyramid"""
+from collections import namedtuple
+
+import numpy as np
+
+from indicators import IndicatorSet
+from ohlc import BarBuffer, BarMatrix, date_unit
+
+# Supported chart intervals in seconds, finest first
+INTERVALS = {
+    '1m': 60,
+    '5m': 300,
+    '1h': 3600,
+    '1d': 86400,
+    '1w': 604800
+}
+
+DEFAULT_INTERVAL = '1d'
+
+# Weekly buckets start on Monday; the Unix epoch was a Thursday
+WEEK_OFFSET = 4 * 86400
+
+# What one level contributes to a snapshot: closed bars, live bar arrays, indicators
+LevelView = namedtuple('LevelView', ['bars', 'live', 'indicators'])
+
+
+def bucket_seconds(seconds, interval):
+    """Start (epoch seconds) of the `interval` bucket containing each timestamp"""
+    offset = WEEK_OFFSET if interval == INTERVALS['1w'] else 0
+    return (seconds - offset) // interval * interval + offset
+
+
+def bucket_start(moment, interval):
+    """Bucket start for one datetime64 moment, in the level's date unit"""
+    seconds = int(np.datetime64(moment, 's').astype(np.int64))
+    return np.datetime64(bucket_seconds(seconds, interval), 's').astype(f'datetime64[{date_unit(interval)}]')
+
+
+def rollup(bars, interval):
+    """Aggregate finer bars into `interval` buckets in one vectorized pass"""
+    seconds = bars.dates.astype('datetime64[s]').astype(np.int64)
+    buckets = bucket_seconds(seconds, interval)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+    dates = buckets[starts].astype('datetime64[s]').astype(f'datetime64[{date_unit(interval)}]')
+    return BarMatrix(
+        bars.symbols,
+        dates,
+        bars.open[:, starts],
+        np.maximum.reduceat(bars.high, starts, axis=1),
+        np.minimum.reduceat(bars.low, starts, axis=1),
+        bars.close[:, ends],
+        np.add.reduceat(bars.volume, starts, axis=1)
+    )
+
+
+class TimeframeLevel:
+    """Closed bars plus the forming bar for one interval of the pyramid"""
+
+    def __init__(self, symbols, interval, capacity, allocate=np.empty):
+        self.interval = interval
+        self.buffer = BarBuffer(symbols, capacity, date_unit(interval), allocate)
+        self.indicators = IndicatorSet(symbols, capacity, date_unit(interval), allocate)
+        self.live = None
+
+    def load(self, bars, final=False):
+        """Append pre-aggregated history; with `final` the last bucket stays open"""
+        if self.live is not None:
+            self._close_live()
+        closed = bars.slice(None, -1) if final else bars
+        if len(closed.dates):
+            self.buffer.extend(closed)
+        if final:
+            self.live = {
+                'date': bars.dates[-1],
+                'open': bars.open[:, -1].copy(),
+                'high': bars.high[:, -1].copy(),
+                'low': bars.low[:, -1].copy(),
+                'close': bars.close[:, -1].copy(),
+                'volume': bars.volume[:, -1].copy()
+            }
+
+    def backfill_indicators(self):
+        """Compute indicators over everything loaded so far in one vectorized pass"""
+        self.indicators.backfill(self.buffer.view())
+
+    def _close_live(self):
+        live = self.live
+        before = self.buffer.view()
+        self.buffer.append(live['date'], live['open'], live['high'], live['low'],
+                           live['close'], live['volume'])
+        self.indicators.update(before, live['date'], live['close'], live['high'], live['low'],
+                               live['volume'])
+        self.live = None
+
+    def merge(self, bars):
+        """Fold consecutive bars of this interval into the level; returns how many bars it closed.
+
+        A bar in the live bucket extends the live bar (the rest of that bucket
+        arriving in a later call), so a range can be merged in pieces and end
+        up the same as rolling it up in one go.
+        """
+        closed = 0
+        for j, date in enumerate(bars.dates):
+            live = self.live
+            if live is not None and date == live['date']:
+                self.live = {
+                    'date': live['date'],
+                    'open': live['open'],
+                    'high': np.maximum(live['high'], bars.high[:, j]),
+                    'low': np.minimum(live['low'], bars.low[:, j]),
+                    'close': bars.close[:, j].copy(),
+                    'volume': live['volume'] + bars.volume[:, j]
+                }
+                continue
+            if live is not None:
+                self._close_live()
+                closed += 1
+            self.live = {
+                'date': date,
+                'open': bars.open[:, j].copy(),
+                'high': bars.high[:, j].copy(),
+                'low': bars.low[:, j].copy(),
+                'close': bars.close[:, j].copy(),
+                'volume': bars.volume[:, j].copy()
+            }
+        return closed
+
+    def update(self, moment, previous_close, close, volume):
+        """Apply one tick; returns True if it closed the previous bucket"""
+        bucket = bucket_start(moment, self.interval)
+        live = self.live
+        if live is None or bucket > live['date']:
+            closed = live is not None
+            if closed:
+                self._close_live()
+            self.live = {
+                'date': bucket,
+                'open': previous_close,
+                'high': np.maximum(previous_close, close),
+                'low': np.minimum(previous_close, close),
+                'close': close,
+                'volume': volume
+            }
+            return closed
+
+        # Fresh arrays each tick: the previous live bar may already be published
+        self.live = {
+            'date': live['date'],
+            'open': live['open'],
+            'high': np.maximum(live['high'], close),
+            'low': np.minimum(live['low'], close),
+            'close': close,
+            'volume': live['volume'] + volume
+        }
+        return False
+
+    def view(self):
+        """LevelView of closed bars, live bar arrays and indicators for a snapshot"""
+        bars = self.buffer.view()
+        return LevelView(bars, self.live, self.indicators.view(bars, self.live))
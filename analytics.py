@@ -0,0 +1,92 @@
+"""Cross-asset analytics over the columnar close history: returns, realized volatility, correlation"""
+import json
+from functools import reduce
+
+import numpy as np
+
+DEFAULT_LOOKBACK = 30
+DEFAULT_HORIZONS = (1, 5)
+
+# Correlation output grows with the square of this
+MAX_SYMBOLS = 500
+
+# Mock markets trade around the clock
+SECONDS_PER_YEAR = 365 * 86400
+
+# JSON text of every correlation rounded to 4 decimals, from -1 to 1, then NaN
+CORRELATION_TEXT = np.array([repr(k / 10000) for k in range(-10000, 10001)] + ['null'], dtype=object)
+
+
+def close_matrix(historical, selection, interval, lookback):
+    """(dates, closes) of the last `lookback` + 1 points (closed bars, then the live bar) per selected symbol.
+
+    `selection` is a list of (market type, symbol). Markets are aligned on
+    the dates they all hold, so the columns line up even if one market's
+    history is shorter. Raises KeyError for an unknown market or symbol.
+    """
+    rows = {}
+    for position, (market_type, symbol) in enumerate(selection):
+        view = historical.get(market_type)
+        index = view.index.get(symbol) if view is not None else None
+        if index is None:
+            raise KeyError(market_type, symbol)
+        rows.setdefault(market_type, []).append((position, index))
+
+    columns = {}
+    for market_type in rows:
+        bars, live = historical[market_type].levels[interval][:2]
+        columns[market_type] = (np.r_[bars.dates, [live['date']]], bars.close, live['close'])
+    dates = reduce(np.intersect1d, (market_dates for market_dates, _, _ in columns.values()))[-(lookback + 1):]
+
+    closes = np.empty((len(selection), len(dates)))
+    for market_type, market_rows in rows.items():
+        market_dates, closed, live_close = columns[market_type]
+        positions, indices = (np.array(values) for values in zip(*market_rows))
+        at = np.searchsorted(market_dates, dates)
+        history = at < closed.shape[1]
+        closes[positions[:, None], np.flatnonzero(history)] = closed[indices[:, None], at[history]]
+        if not history.all():
+            closes[positions, -1] = live_close[indices]
+    return dates, closes
+
+
+def analyze(closes, interval, horizons):
+    """Returns (%), annualized realized volatility (%) and correlation of a (symbols x points) close matrix.
+
+    One pass over the log returns of every row at once: returns are taken
+    from the close `h` points before the last, volatility is the sample
+    standard deviation scaled to a year of `interval`-second bars, and the
+    correlation matrix is np.corrcoef of the log returns.
+    """
+    log_returns = np.diff(np.log(closes), axis=1)
+    returns = {h: (closes[:, -1] / closes[:, -1 - h] - 1) * 100 for h in horizons}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        volatility = log_returns.std(axis=1, ddof=1) * np.sqrt(SECONDS_PER_YEAR / interval) * 100
+        correlation = np.atleast_2d(np.corrcoef(log_returns))
+    return returns, volatility, correlation
+
+
+def finite(values, decimals=4):
+    """Rounded list with NaN (e.g. the volatility of a single return) as None"""
+    values = np.round(values, decimals)
+    missing = np.isnan(values)
+    if not missing.any():
+        return values.tolist()
+    values = values.astype(object)
+    values[missing] = None
+    return values.tolist()
+
+
+def encode(payload, correlation):
+    """JSON bytes of `payload` plus its "correlation" matrix, rounded to 4 decimals.
+
+    A rounded correlation is one of 20001 values, so each is looked up as text
+    instead of going through the float encoder, which otherwise dominates the
+    response time with hundreds of symbols.
+    """
+    with np.errstate(invalid='ignore'):
+        codes = np.rint(np.clip(correlation, -1, 1) * 10000) + 10000
+    codes = np.where(np.isnan(codes), len(CORRELATION_TEXT) - 1, codes).astype(np.int64)
+    matrix = ','.join('[' + ','.join(row) + ']' for row in CORRELATION_TEXT[codes].tolist())
+    head = json.dumps(payload, separators=(',', ':'))
+    return f'{head[:-1]},"correlation":[{matrix}]}}'.encode('utf-8')
@@ -1,12 +1,31 @@
-from flask import Flask, render_template, jsonify
-import requests
+from flask import Flask, render_template, jsonify, request, Response, g
 from datetime import datetime, timedelta
 import threading
 import time
+import atexit
 import random
 import os
 import logging
 from dotenv import load_dotenv
+import numpy as np
+from market_state import MarketSnapshot, SnapshotStore
+from breadth import DEFAULT_TOP, MAX_TOP, MarketBreadth
+import analytics
+from aggregation import DEFAULT_INTERVAL, INTERVALS, bucket_start
+from market_engine import DEFAULT_CAPACITY, MarketEngine
+from bar_log import BarLog
+from providers import create_provider
+from symbols import load_registry
+from history_pool import HistoryPool
+from shared_snapshot import SharedSnapshots
+from indicators import INDICATOR_PARAMS
+from ohlc import date_unit, window_bounds
+from seeded_ohlc import seeded_history, seeded_minutes
+from news_store import DEFAULT_PAGE_SIZE, FILTER_PARAMS, MAX_PAGE_SIZE, NewsStore
+from news_store import format_cursor, is_cursor, parse_cursor
+from streaming import SnapshotBroadcaster
+from response_cache import MAX_BYTES as MAX_CACHE_BYTES, ResponseCache, negotiate
+import metrics
 
 # Configure logging to reduce noise
 log = logging.getLogger('werkzeug')
@@ -32,77 +51,143 @@ if not app.debug:
     app.logger.addHandler(handler)
     app.logger.setLevel(logging.INFO)
 
-# Enhanced data structure with exactly 6 symbols per market
-SYMBOLS = {
-    'forex': ['EUR/USD', 'GBP/USD', 'USD/JPY', 'AUD/USD', 'USD/CAD', 'USD/CHF'],
-    'crypto': ['BTC/USDT', 'ETH/USDT', 'BNB/USDT', 'SOL/USDT', 'XRP/USDT', 'ADA/USDT'],
-    'stocks': ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'TSLA', 'META'],
-    'commodities': ['XAUUSD', 'XAGUSD', 'USOIL', 'UKOIL', 'XPTUSD', 'XPDUSD']
-}
+# Every instrument served, with integer IDs and display metadata, from a JSON or CSV file
+SYMBOLS_FILE = os.getenv('SYMBOLS_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'symbols.json'))
+symbol_registry = load_registry(SYMBOLS_FILE)
 
-# User-friendly display names for commodities
-COMMODITY_NAMES = {
-    'XAUUSD': 'Gold',
-    'XAGUSD': 'Silver', 
-    'USOIL': 'WTI Oil',
-    'UKOIL': 'Brent Oil',
-    'XPTUSD': 'Platinum',
-    'XPDUSD': 'Palladium'
-}
+# Symbols per market in engine row order
+SYMBOLS = symbol_registry.markets
+
+# Display names (None when the symbol is its own name) aligned with SYMBOLS
+DISPLAY_NAMES = {market_type: symbol_registry.display_names(market_type) for market_type in SYMBOLS}
+
+# Latest published market snapshot (in-memory only, no database).
+# Refreshes build a complete new snapshot off to the side and swap it in with a
+# single reference assignment, so request threads never see a half-updated state.
+snapshot_store = SnapshotStore()
+
+# Pushes each published snapshot's price changes to /api/stream clients
+broadcaster = SnapshotBroadcaster()
+# Bounded in bytes per worker process, so budget for WEB_CONCURRENCY of them
+response_cache = ResponseCache(max_bytes=int(os.getenv('RESPONSE_CACHE_MAX_BYTES', MAX_CACHE_BYTES)),
+                               enabled=os.getenv('RESPONSE_CACHE', '1') != '0')
+
+# Prometheus metrics served at /metrics; routes are labelled by URL rule, not by path
+REQUESTS_TOTAL = metrics.Counter('http_requests_total', 'HTTP requests by route, method and status',
+                                 ('route', 'method', 'status'))
+REQUEST_DURATION = metrics.Histogram('http_request_duration_seconds', 'Time to build a response, by route',
+                                     ('route',))
+RESPONSE_SIZE = metrics.Histogram('http_response_size_bytes', 'Response body bytes sent, by route',
+                                  ('route',), buckets=metrics.SIZE_BUCKETS)
+REFRESH_DURATION = metrics.Histogram('market_refresh_duration_seconds', 'Time spent in fetch_real_data per refresh')
+REFRESH_ERRORS = metrics.Counter('market_refresh_errors_total', 'Refreshes that raised before publishing')
+
+# `since` values below this are snapshot versions, anything larger is epoch seconds
+MAX_SNAPSHOT_VERSION = 10 ** 9
+
+# Upper bound on entries in one /api/historical/batch request
+MAX_BATCH_SYMBOLS = 100
+
+# Per-entry overrides accepted by /api/historical/batch
+HISTORY_QUERY_PARAMS = ('interval', 'from', 'to', 'limit', 'since')
+
+# Seconds between background refreshes
+REFRESH_INTERVAL = int(os.getenv('REFRESH_INTERVAL', 60))
 
-# Store historical OHLC data (in-memory only, no database)
-historical_data = {
-    'forex': {},
-    'crypto': {},
-    'stocks': {},
-    'commodities': {}
+_updater_lock = threading.Lock()
+_updater_started = False
+
+# Directory (under /dev/shm) through which server workers share one updater's snapshots; see gunicorn.conf.py
+SHARED_SNAPSHOT_DIR = os.getenv('SHARED_SNAPSHOT_DIR')
+shared_snapshots = SharedSnapshots(SHARED_SNAPSHOT_DIR) if SHARED_SNAPSHOT_DIR else None
+if SHARED_SNAPSHOT_DIR:
+    # Any worker may answer a scrape, so /metrics sums every worker's series
+    metrics.enable_multiprocess(os.path.join(SHARED_SNAPSHOT_DIR, 'metrics'))
+
+# Seconds between a worker's checks for a newer shared snapshot or a vacant updater role
+SHARED_POLL_SECONDS = float(os.getenv('SHARED_POLL_SECONDS', 0.5))
+_adopt_lock = threading.Lock()
+
+# Fallback base price for symbols registered without one
+DEFAULT_BASE_PRICES = {'forex': 1.0, 'crypto': 1000, 'stocks': 150, 'commodities': 100}
+
+# Daily (min, max) fractional price change per market type, for symbols registered without one
+DAILY_CHANGE_RANGES = {
+    'forex': (-0.008, 0.008),
+    'crypto': (-0.05, 0.06),
+    'stocks': (-0.03, 0.03),
+    'commodities': (-0.03, 0.03)
 }
+DEFAULT_CHANGE_RANGE = (-0.03, 0.03)
+
+# Days of 1m history generated per symbol on startup (rolled up into 5m/1h/1d/1w)
+HISTORY_DAYS = 30
+
+# Bars (including the live one) used for the high_24h/low_24h range
+HIGH_LOW_WINDOW = 7
+
+# Shared generator for the vectorized bar generator; seed it for reproducible runs
+market_rng = np.random.default_rng(int(os.environ['MARKET_DATA_SEED']) if os.getenv('MARKET_DATA_SEED') else None)
+
+# 'random' walks on from each process's own start; 'seeded' makes every bar a pure function of
+# (symbol, minute, MARKET_DATA_SEED), so replicas started at different times serve the same data
+MARKET_DATA_MODE = os.getenv('MARKET_DATA_MODE', 'random')
+if MARKET_DATA_MODE not in ('random', 'seeded'):
+    raise ValueError(f"Unknown MARKET_DATA_MODE '{MARKET_DATA_MODE}'; choose from random, seeded")
+MARKET_SEED = int(os.getenv('MARKET_DATA_SEED', 0)) if MARKET_DATA_MODE == 'seeded' else None
+
+# Seeded mode: bars older than the held history are generated per request, at most this far back
+SEEDED_LOOKBACK_DAYS = int(os.getenv('SEEDED_LOOKBACK_DAYS', 365))
+SEEDED_MAX_BARS = 5000
+# ...and one request, or a whole batch, generates at most this many 1m bars (about half a second of CPU)
+SEEDED_MAX_MINUTES = int(os.getenv('SEEDED_MAX_MINUTES', 2_000_000))
+
+# Per-market incremental bar engines; only the refresh path touches them
+market_engines = {}
+_engine_lock = threading.Lock()
 
-# Global market data cache (in-memory only)
-market_data_cache = {}
+# Processes that generate startup history in symbol shards; 1 keeps it in-process
+BACKFILL_WORKERS = int(os.getenv('BACKFILL_WORKERS', os.cpu_count() or 1))
+history_pool = HistoryPool(BACKFILL_WORKERS) if BACKFILL_WORKERS > 1 else None
+
+# Directory for the durable bar log; unset keeps history in memory only
+BAR_LOG_DIR = os.getenv('BAR_LOG_DIR')
+BAR_LOG_FLUSH_SECONDS = int(os.getenv('BAR_LOG_FLUSH_SECONDS', 60))
+
+# Where each tick's prices come from: 'mock' (random walk) or 'http' (MARKET_DATA_URL)
+MARKET_DATA_PROVIDER = os.getenv('MARKET_DATA_PROVIDER', 'mock')
+market_provider = create_provider(MARKET_DATA_PROVIDER, **({
+    'base_url': os.getenv('MARKET_DATA_URL', 'http://localhost:8080'),
+    'api_token': os.getenv('API_TOKEN'),
+    'rate': float(os.getenv('MARKET_DATA_RATE', 50)),
+    'workers': int(os.getenv('MARKET_DATA_WORKERS', 16))
+} if MARKET_DATA_PROVIDER == 'http' else {}))
+
+def get_base_price(symbol, market_type):
+    """Starting price for a symbol's mock random walk"""
+    instrument = symbol_registry.get(market_type, symbol)
+    if instrument is not None and instrument.base_price is not None:
+        return instrument.base_price
+    return DEFAULT_BASE_PRICES.get(market_type, 100)
+
+def get_change_range(symbol, market_type):
+    """Daily (min, max) fractional change of a symbol's mock random walk"""
+    instrument = symbol_registry.get(market_type, symbol)
+    if instrument is not None and instrument.daily_change is not None:
+        return instrument.daily_change
+    return DAILY_CHANGE_RANGES.get(market_type, DEFAULT_CHANGE_RANGE)
 
 def generate_mock_ohlc_data(symbol, market_type):
-    """Generate mock OHLC data for development"""
-    # More realistic base prices for each market type
-    base_price = 100  # Default value
-    
-    if market_type == 'forex':
-        forex_rates = {
-            'EUR/USD': 1.0845, 'GBP/USD': 1.2534, 'USD/JPY': 149.85, 
-            'AUD/USD': 0.6543, 'USD/CAD': 1.3567, 'USD/CHF': 0.9012
-        }
-        base_price = forex_rates.get(symbol, 1.0)
-    elif market_type == 'crypto':
-        crypto_prices = {
-            'BTC/USDT': 114250, 'ETH/USDT': 3485, 'BNB/USDT': 598, 
-            'SOL/USDT': 152, 'XRP/USDT': 0.52, 'ADA/USDT': 0.45
-        }
-        base_price = crypto_prices.get(symbol, 1000)
-    elif market_type == 'stocks':
-        stock_prices = {
-            'AAPL': 182.45, 'MSFT': 398.23, 'GOOGL': 142.67, 
-            'AMZN': 145.67, 'TSLA': 201.89, 'META': 512.34
-        }
-        base_price = stock_prices.get(symbol, 150)
-    elif market_type == 'commodities':
-        commodity_prices = {
-            'XAUUSD': 2518.45, 'XAGUSD': 28.67, 'USOIL': 89.34, 
-            'UKOIL': 91.23, 'XPTUSD': 945.67, 'XPDUSD': 1234.56
-        }
-        base_price = commodity_prices.get(symbol, 100)
+    """Generate mock OHLC data for development (one symbol, row by row)"""
+    base_price = get_base_price(symbol, market_type)
     
     ohlc_data = []
     current_price = base_price
     
     for i in range(30):  # 30 days of data
         # Generate realistic price movements
-        if market_type == 'crypto':
-            change_pct = random.uniform(-0.05, 0.06)
-        elif market_type == 'forex':
-            change_pct = random.uniform(-0.008, 0.008)
-        else:
-            change_pct = random.uniform(-0.03, 0.03)
-            
+        change_pct = random.uniform(*get_change_range(symbol, market_type))
+        
         new_price = current_price * (1 + change_pct)
         
         # Generate OHLC from the price movement
@@ -124,109 +209,302 @@ def generate_mock_ohlc_data(symbol, market_type):
     
     return ohlc_data
 
-def calculate_market_stats():
-    """Calculate overall market statistics"""
-    gainers = 0
-    losers = 0
-    total_instruments = 0
+def get_market_engine(market_type):
+    """Return the incremental bar engine for a market, creating it on first use"""
+    engine = market_engines.get(market_type)
+    if engine is None:
+        symbols = SYMBOLS[market_type]
+        engine = MarketEngine(
+            symbols,
+            [get_base_price(symbol, market_type) for symbol in symbols],
+            [get_change_range(symbol, market_type) for symbol in symbols],
+            window=HIGH_LOW_WINDOW,
+            tick_seconds=REFRESH_INTERVAL,
+            backfill_days=HISTORY_DAYS,
+            rng=market_rng,
+            bar_log=BarLog(BAR_LOG_DIR, market_type, symbols, DEFAULT_CAPACITY,
+                           flush_interval=BAR_LOG_FLUSH_SECONDS) if BAR_LOG_DIR else None,
+            history_pool=history_pool,
+            # Buffers in shared memory are referenced by published snapshots instead of copied
+            allocate=shared_snapshots.arena.empty if shared_snapshots is not None else np.empty,
+            seed=MARKET_SEED
+        )
+        # A worker taking over as updater continues the random walk it was serving; seeded
+        # engines regenerate identical bars anyway
+        current = snapshot_store.current()
+        if MARKET_SEED is None and current is not None and market_type in current.historical:
+            if engine.resume(current.historical[market_type]):
+                print(f"🔁 {market_type}: continuing from snapshot v{current.version}")
+        market_engines[market_type] = engine
+    return engine
+
+@atexit.register
+def flush_bar_logs():
+    """Write bars still queued for the bar log before the process exits"""
+    with _engine_lock:
+        for market_type, engine in market_engines.items():
+            if engine.bar_log is not None:
+                try:
+                    engine.bar_log.flush()
+                except OSError as e:
+                    print(f"❌ Error flushing bar log for {market_type}: {e}")
+
+def fetch_real_data(version=0):
+    """Advance every market by one tick of provider prices and return a new, unpublished snapshot"""
+    print(f"📊 Fetching fresh market data ({market_provider.name})...")
+    
+    # Everything is built into fresh containers; published snapshots are never touched
+    prices = {market_type: {} for market_type in SYMBOLS}
+    historical = {}
+    columns = {}
     
-    for market_type in ['forex', 'crypto', 'stocks', 'commodities']:
-        if market_type in market_data_cache:
-            for symbol, data in market_data_cache[market_type].items():
-                if isinstance(data, dict) and 'change' in data:
-                    total_instruments += 1
-                    if data['change'] > 0:
-                        gainers += 1
-                    elif data['change'] < 0:
-                        losers += 1
+    # One timestamp for the whole tick, so bar buckets and snapshot age agree
+    now = time.time()
+    tick_time = np.datetime64(int(now * 1000), 'ms')
+    
+    with _engine_lock:
+        engines = {market_type: get_market_engine(market_type) for market_type in SYMBOLS}
+        # Markets that just backfilled already end at `now`; the rest get one provider quote each
+        ready = {market_type: engine for market_type, engine in engines.items() if engine.prepare(tick_time)}
+        quotes = market_provider.quotes(ready, now) if ready else {}
+        views = {market_type: engine.tick(tick_time, *quotes[market_type]) if market_type in quotes else engine.view()
+                 for market_type, engine in engines.items()}
+    
+    for market_type, view in views.items():
+        # Bars for every interval are served straight from the engine's view
+        historical[market_type] = view
+        
+        # Round the live daily bars once per market, then slice per symbol
+        live = view.live
+        date = str(live['date'])
+        opens = live['open'].round(4).tolist()
+        highs = live['high'].round(4).tolist()
+        lows = live['low'].round(4).tolist()
+        close_array = live['close'].round(4)
+        previous_close = view.previous_close.round(4)
+        # Current price is the live close; change is against the last closed bar
+        change_array = ((close_array - previous_close) / previous_close * 100).round(2)
+        closes = close_array.tolist()
+        changes = change_array.tolist()
+        volumes = live['volume'].tolist()
+        columns[market_type] = (view.symbols, close_array, change_array, live['volume'])
+        display_names = DISPLAY_NAMES[market_type]
+        highs_24h = view.high_window.round(4).tolist()
+        lows_24h = view.low_window.round(4).tolist()
+        
+        for i, symbol in enumerate(view.symbols):
+            latest = {
+                'date': date,
+                'open': opens[i],
+                'high': highs[i],
+                'low': lows[i],
+                'close': closes[i],
+                'volume': volumes[i]
+            }
+            price_data = {
+                'current': closes[i],
+                'change': changes[i],
+                'ohlc': latest,
+                'volume': volumes[i],
+                'high_24h': highs_24h[i],
+                'low_24h': lows_24h[i]
+            }
+            
+            # Use clean display names (e.g. commodities) to avoid "undef" issues
+            if display_names[i] is not None:
+                price_data['display_name'] = display_names[i]
+            
+            prices[market_type][symbol] = price_data
     
-    # Determine overall market trend
-    if gainers > losers:
-        trend = "Bullish"
-    elif losers > gainers:
-        trend = "Bearish"  
-    else:
-        trend = "Neutral"
+    # Breadth and rankings are computed once here, not per request
+    breadth = MarketBreadth(columns)
     
+    total_instruments = sum(len(v) for v in prices.values())
+    print(f"✅ Generated data for {total_instruments} instruments across {len(prices)} markets")
+    return MarketSnapshot(version, prices, historical, breadth.summary, created_at=now, breadth=breadth)
+
+def refresh_snapshot():
+    """Generate fresh market data and publish it as the next snapshot"""
+    started = time.perf_counter()
+    try:
+        snapshot = fetch_real_data(snapshot_store.next_version())
+    except Exception:
+        REFRESH_ERRORS.inc()
+        raise
+    REFRESH_DURATION.observe(time.perf_counter() - started)
+    published = snapshot_store.publish(snapshot)
+    if shared_snapshots is not None:
+        shared_snapshots.publish(published)
+    response_cache.evict(published.version)
+    broadcaster.publish(published)
+    metrics.sync()
+    return published
+
+def adopt_shared_snapshot():
+    """Publish locally the newest snapshot the elected updater put in shared memory"""
+    current = snapshot_store.current()
+    version = shared_snapshots.latest_version()
+    if version == 0 or (current is not None and current.version >= version):
+        return current
+    with _adopt_lock:
+        current = snapshot_store.current()
+        if current is not None and current.version >= version:
+            return current
+        snapshot = shared_snapshots.load(version)
+        if snapshot is None:
+            return current
+        published = snapshot_store.publish(snapshot)
+        response_cache.evict(published.version)
+        broadcaster.publish(published)
+        return published
+
+def get_snapshot():
+    """Return the latest published snapshot, or None if none is ready yet"""
+    if shared_snapshots is not None and not shared_snapshots.lease.held:
+        return adopt_shared_snapshot()
+    return snapshot_store.current()
+
+def snapshot_headers(snapshot):
+    """Response headers describing which snapshot served the request"""
     return {
-        'gainers': gainers,
-        'losers': losers,
-        'trend': trend
+        'X-Snapshot-Version': str(snapshot.version),
+        'X-Snapshot-Age': f"{snapshot.age():.3f}"
     }
 
-def fetch_real_data():
-    """Generate enhanced mock data for demo purposes"""
-    global market_data_cache
+def cached_json(key, version, build, headers=None):
+    """JSON response served from the per-snapshot cache, honouring If-None-Match and Accept-Encoding
+    
+    build() returns (payload, status, headers) and only runs on a cache miss.
+    """
+    entry = response_cache.get(key, version, build)
+    response = Response(status=entry.status, mimetype='application/json')
+    response.headers.update(entry.headers)
+    response.headers.update(headers or {})
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'no-cache'
+    response.set_etag(entry.etag, weak=True)
     
-    print("📊 Generating fresh market data...")
+    if entry.status == 200 and request.if_none_match.contains_weak(entry.etag):
+        response.status_code = 304
+        return response
     
-    data = {
-        'forex': {},
-        'crypto': {},
-        'stocks': {},
-        'commodities': {},
-        'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    encoding = negotiate(request.accept_encodings, len(entry.body))
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.set_data(entry.variant(encoding))
+    return response
+
+def parse_time_param(value):
+    """Parse an ISO date/time or epoch-seconds query parameter into datetime64[s]"""
+    if value is None or value == '':
+        return None
+    # Batch entries are JSON, so epoch seconds may arrive as numbers
+    value = str(value).strip()
+    # numpy reads a signed number as a year (e.g. -5 is 5 BC), so only unsigned values are times
+    if value[:1] in ('-', '+'):
+        raise ValueError(f"Invalid time '{value}'; use ISO 8601 or epoch seconds")
+    try:
+        if value.isdigit():
+            return np.datetime64(int(value), 's')
+        return np.datetime64(value, 's')
+    except (ValueError, OverflowError, TypeError):
+        raise ValueError(f"Invalid time '{value}'; use ISO 8601 or epoch seconds")
+
+def parse_limit(value):
+    """Parse a `limit` (last N bars) parameter; None when absent"""
+    if value in (None, ''):
+        return None
+    try:
+        limit = int(value)
+        if limit < 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid limit '{value}'")
+    return limit
+
+def parse_history_query(params):
+    """Validate interval/from/to/limit/since from query args or a batch entry"""
+    interval = params.get('interval') or DEFAULT_INTERVAL
+    if not isinstance(interval, str) or interval not in INTERVALS:
+        raise ValueError(f"Unsupported interval '{interval}'")
+    limit = parse_limit(params.get('limit'))
+    since = str(params.get('since') or '')
+    since_version = int(since) if since.isdigit() and int(since) < MAX_SNAPSHOT_VERSION else None
+    return {
+        'interval': interval,
+        'start': parse_time_param(params.get('from')),
+        'end': parse_time_param(params.get('to')),
+        'limit': limit,
+        'since_version': since_version,
+        'since_time': parse_time_param(since) if since and since_version is None else None
     }
+
+class GenerationLimitExceeded(ValueError):
+    """A request would generate more seeded history than SEEDED_MAX_MINUTES allows"""
+
+def history_records(snapshot, market_type, symbol, query, budget):
+    """(records, resync) for one symbol from one snapshot; records is None for unknown symbols
     
-    # Process each market type - exactly 6 items each
-    for market_type, symbols in SYMBOLS.items():
-        # Ensure we only process exactly 6 symbols
-        limited_symbols = symbols[:6]
-        
-        for symbol in limited_symbols:
-            # Generate mock data
-            ohlc_data = generate_mock_ohlc_data(symbol, market_type)
-            
-            # Store the data in memory
-            if market_type not in historical_data:
-                historical_data[market_type] = {}
-            historical_data[market_type][symbol] = ohlc_data
-            
-            # Get current price (latest close)
-            if ohlc_data:
-                latest = ohlc_data[-1]
-                previous = ohlc_data[-2] if len(ohlc_data) > 1 else latest
-                
-                price_change = ((latest['close'] - previous['close']) / previous['close']) * 100
-                
-                price_data = {
-                    'current': latest['close'],
-                    'change': round(price_change, 2),
-                    'ohlc': latest,
-                    'volume': latest['volume'],
-                    'high_24h': max([d['high'] for d in ohlc_data[-7:]]),
-                    'low_24h': min([d['low'] for d in ohlc_data[-7:]])
-                }
-                '''
-                # Handle symbol naming to avoid "undef" issues
-                clean_symbol = symbol
-                if market_type == 'commodities':
-                    # Use clean display names for commodities
-                    if symbol == 'XAUUSD':
-                        clean_symbol = 'Gold'
-                    elif symbol == 'XAGUSD':
-                        clean_symbol = 'Silver'
-                    elif symbol == 'USOIL':
-                        clean_symbol = 'WTI Oil'
-                    elif symbol == 'UKOIL':
-                        clean_symbol = 'Brent Oil'
-                    elif symbol == 'XPTUSD':
-                        clean_symbol = 'Platinum'
-                    elif symbol == 'XPDUSD':
-                        clean_symbol = 'Palladium'
-                '
-                data[market_type][clean_symbol] = price_data
-    '''
-    # Cache the data in memory
-    market_data_cache = data
+    since=<version> resumes from the bar that was live in that snapshot; resync
+    is True when that version is too old to be known and full history was sent.
+    In seeded mode a start before the held history is filled in from the model,
+    drawing on `budget`, a one-item list of 1m bars the request may still generate.
+    """
+    interval = query['interval']
+    start, end, since_time = query['start'], query['end'], query['since_time']
+    resync = False
+    if query['since_version'] is not None:
+        created_at = snapshot_store.created_at(query['since_version'])
+        if created_at is None:
+            resync = True
+        else:
+            since_time = np.datetime64(int(created_at), 's')
+    if since_time is not None:
+        since_time = bucket_start(since_time, INTERVALS[interval])
+        start = since_time if start is None else max(start, since_time)
     
-    # Add market statistics
-    stats = calculate_market_stats()
-    data['market_stats'] = stats
+    history = snapshot.historical.get(market_type)
+    series = history.series(symbol, interval) if history is not None else None
+    if series is None:
+        return None, resync
+    if start is not None or end is not None or query['limit'] is not None:
+        series = series.window(start, end, query['limit'])
+    records = series.to_records()
+    
+    limit = query['limit']
+    if MARKET_SEED is not None and start is not None and (limit is None or len(records) < limit):
+        held = history.series(symbol, interval)
+        oldest = held.dates[0] if len(held.dates) else np.datetime64(held.live['date'])
+        records = seeded_records(market_type, symbol, interval, oldest, start, end, budget) + records
+        if limit is not None:
+            records = records[-limit:] if limit > 0 else []
+    return records, resync
+
+def seeded_records(market_type, symbol, interval, oldest, start, end, budget):
+    """Seeded mode: records of the bars before `oldest` that start within [start, end], generated on demand
     
-    total_instruments = sum(len(v) for k, v in data.items() if k not in ['last_updated', 'market_stats'])
-    print(f"✅ Generated data for exactly {total_instruments} instruments (6 per market)")
-    return data
+    Raises GenerationLimitExceeded if that takes more 1m bars than are left in `budget`.
+    """
+    step = np.timedelta64(INTERVALS[interval], 's')
+    first = max(start, oldest - np.timedelta64(SEEDED_LOOKBACK_DAYS, 'D'), oldest - SEEDED_MAX_BARS * step)
+    last = oldest - np.timedelta64(1, date_unit(INTERVALS[interval]))
+    if end is not None:
+        last = min(last, end)
+    if first > last:
+        return []
+    minutes = seeded_minutes(first, last, interval)
+    if minutes > budget[0]:
+        raise GenerationLimitExceeded(
+            f"Request would generate more than {SEEDED_MAX_MINUTES} minutes of history; "
+            f"narrow from/to or request fewer symbols")
+    budget[0] -= minutes
+    bars = seeded_history([symbol], [get_base_price(symbol, market_type)], [get_change_range(symbol, market_type)],
+                          MARKET_SEED, first, last, interval)
+    return bars.series(0).window(start, end).to_records()
+
+def snapshot_unavailable():
+    """Response used before the first snapshot has been published"""
+    return jsonify({'error': 'Market data not ready yet'}), 503
 
 @app.route('/')
 def index():
@@ -237,182 +515,411 @@ def index():
 def get_prices():
     """API endpoint to get current market prices"""
     try:
-        data = fetch_real_data()
-        return jsonify(data)
+        snapshot = get_snapshot()
+        if snapshot is None:
+            return snapshot_unavailable()
+        
+        def build():
+            data = dict(snapshot.prices)
+            data.update({
+                'last_updated': snapshot.last_updated,
+                'market_stats': snapshot.market_stats,
+                'snapshot_version': snapshot.version
+            })
+            return data, 200, None
+        
+        return cached_json('prices', snapshot.version, build, snapshot_headers(snapshot))
     except Exception as e:
         print(f"❌ Error in /api/prices: {e}")
         return jsonify({'error': 'Failed to fetch market data'}), 500
 
+@app.route('/api/stream')
+def stream_prices():
+    """Server-Sent Events stream of price changes, one event per snapshot version"""
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    
+    return Response(
+        broadcaster.stream(last_event_id),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/historical/<market_type>/<path:symbol>')
 def get_historical_data(market_type, symbol):
-    """API endpoint to get historical OHLC data for a specific symbol"""
+    """API endpoint to get historical OHLC data for a specific symbol
+    
+    Query parameters: interval=1m|5m|1h|1d|1w, from/to (ISO date/time or epoch
+    seconds), limit (last N bars) and since=<snapshot version|timestamp> to
+    fetch only the bars that changed after what the client already holds.
+    """
     try:
-        # Ensure data is populated
-        if not historical_data.get(market_type, {}).get(symbol):
-            fetch_real_data()
+        try:
+            query = parse_history_query(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        if market_type in historical_data and symbol in historical_data[market_type]:
-            return jsonify(historical_data[market_type][symbol])
-        else:
-            return jsonify([])
+        snapshot = get_snapshot()
+        if snapshot is None:
+            return snapshot_unavailable()
+        
+        def build():
+            try:
+                records, resync = history_records(snapshot, market_type, symbol, query, [SEEDED_MAX_MINUTES])
+            except GenerationLimitExceeded as e:
+                return {'error': str(e)}, 400, None
+            return records if records is not None else [], 200, {'X-History-Resync': '1'} if resync else None
+        
+        key = ('historical', market_type, symbol, request.query_string)
+        return cached_json(key, snapshot.version, build, snapshot_headers(snapshot))
     except Exception as e:
         print(f"❌ Error in /api/historical: {e}")
         return jsonify({'error': 'Failed to fetch historical data'}), 500
 
+@app.route('/api/historical/batch', methods=['GET', 'POST'])
+def get_historical_batch():
+    """API endpoint to get historical OHLC data for many symbols in one round trip
+    
+    GET: symbols=<market>/<symbol>,... plus the /api/historical query parameters,
+    applied to every symbol. POST: JSON {"symbols": [...], ...defaults} where each
+    entry is "<market>/<symbol>" or an object with market, symbol and its own
+    interval/from/to/limit/since. Every series comes from the same snapshot.
+    """
+    try:
+        if request.method == 'POST':
+            body = request.get_json(silent=True)
+            if not isinstance(body, dict) or not isinstance(body.get('symbols'), list):
+                return jsonify({'error': "Expected a JSON object with a 'symbols' list"}), 400
+            defaults, entries = body, body['symbols']
+        else:
+            defaults = request.args
+            entries = [entry for entry in request.args.get('symbols', '').split(',') if entry]
+        
+        if not entries:
+            return jsonify({'error': 'No symbols requested'}), 400
+        if len(entries) > MAX_BATCH_SYMBOLS:
+            return jsonify({'error': f"At most {MAX_BATCH_SYMBOLS} symbols per batch"}), 400
+        
+        snapshot = get_snapshot()
+        if snapshot is None:
+            return snapshot_unavailable()
+        
+        def build():
+            results = []
+            # Shared by every entry, so a batch costs no more than one request
+            budget = [SEEDED_MAX_MINUTES]
+            for entry in entries:
+                if isinstance(entry, str):
+                    market_type, _, symbol = entry.partition('/')
+                    params = defaults
+                elif isinstance(entry, dict):
+                    market_type, symbol = entry.get('market', ''), entry.get('symbol', '')
+                    params = {key: entry.get(key, defaults.get(key)) for key in HISTORY_QUERY_PARAMS}
+                else:
+                    return {'error': f"Invalid batch entry {entry!r}"}, 400, None
+                
+                result = {'market': market_type, 'symbol': symbol}
+                if not isinstance(market_type, str) or not isinstance(symbol, str):
+                    result['error'] = 'market and symbol must be strings'
+                    results.append(result)
+                    continue
+                try:
+                    query = parse_history_query(params)
+                except (TypeError, ValueError) as e:
+                    result['error'] = str(e)
+                    results.append(result)
+                    continue
+                
+                try:
+                    records, resync = history_records(snapshot, market_type, symbol, query, budget)
+                except GenerationLimitExceeded as e:
+                    return {'error': str(e)}, 400, None
+                result['interval'] = query['interval']
+                if records is None:
+                    result['error'] = f"Unknown symbol '{symbol}' for market '{market_type}'"
+                else:
+                    result['bars'] = records
+                    if resync:
+                        result['resync'] = True
+                results.append(result)
+            
+            return {
+                'snapshot_version': snapshot.version,
+                'last_updated': snapshot.last_updated,
+                'results': results
+            }, 200, None
+        
+        key = ('batch', request.query_string, request.get_data() if request.method == 'POST' else b'')
+        return cached_json(key, snapshot.version, build, snapshot_headers(snapshot))
+    except Exception as e:
+        print(f"❌ Error in /api/historical/batch: {e}")
+        return jsonify({'error': 'Failed to fetch historical data'}), 500
+
+@app.route('/api/indicators/<market_type>/<path:symbol>')
+def get_indicators(market_type, symbol):
+    """API endpoint to get SMA, EMA, RSI, Bollinger Bands and VWAP for a symbol
+    
+    Values are maintained incrementally as bars close, so this only slices
+    stored arrays. Accepts interval, from/to and limit like /api/historical;
+    `latest` holds provisional values for the still-forming bar.
+    """
+    try:
+        interval = request.args.get('interval', DEFAULT_INTERVAL)
+        if interval not in INTERVALS:
+            return jsonify({'error': f"Unsupported interval '{interval}'", 'intervals': list(INTERVALS)}), 400
+        
+        snapshot = get_snapshot()
+        if snapshot is None:
+            return snapshot_unavailable()
+        
+        try:
+            start = parse_time_param(request.args.get('from'))
+            end = parse_time_param(request.args.get('to'))
+            limit = parse_limit(request.args.get('limit'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        history = snapshot.historical.get(market_type)
+        view, index = history.indicators(symbol, interval) if history is not None else (None, None)
+        if view is None:
+            return jsonify({'error': f"Unknown symbol '{symbol}' for market '{market_type}'"}), 404
+        
+        def build():
+            lo, hi = window_bounds(view.dates, start, end, limit)
+            return {
+                'symbol': symbol,
+                'market': market_type,
+                'interval': interval,
+                'params': INDICATOR_PARAMS,
+                'latest': view.latest(index),
+                'series': view.records(index, lo, hi)
+            }, 200, None
+        
+        key = ('indicators', market_type, symbol, request.query_string)
+        return cached_json(key, snapshot.version, build, snapshot_headers(snapshot))
+    except Exception as e:
+        print(f"❌ Error in /api/indicators: {e}")
+        return jsonify({'error': 'Failed to fetch indicators'}), 500
+
+# Mock news is dated from this fixed time, not each process's start, so every worker and replica
+# builds the same cursors and ETags
+NEWS_PUBLISHED_AT = datetime.fromisoformat(os.getenv('NEWS_PUBLISHED_AT', '2024-12-18T15:00:00+00:00'))
+
+def build_news_items():
+    """Enhanced mock news data, timestamped back from NEWS_PUBLISHED_AT (newest first)"""
+    current_time = NEWS_PUBLISHED_AT
+    
+    news_items = [
+        {
+            "id": 1,
+            "title": "Federal Reserve Maintains Interest Rates Amid Economic Uncertainty",
+            "source": "Federal Reserve",
+            "timestamp": (current_time - timedelta(hours=1)).isoformat(),
+            "summary": "The Federal Reserve decided to hold interest rates steady at 5.25%-5.50% as inflation shows signs of cooling but remains above target levels. Chair Powell emphasized data-dependent approach moving forward.",
+            "tags": ["Fed", "Interest Rates", "Economy", "Inflation"],
+            "category": "monetary_policy",
+            "importance": "high",
+            "market_impact": "positive",
+            "symbols": []
+        },
+        {
+            "id": 2,
+            "title": "Bitcoin Surges Past $115,000 as Institutional Adoption Accelerates",
+            "source": "CoinDesk",
+            "timestamp": (current_time - timedelta(hours=2)).isoformat(),
+            "summary": "Bitcoin reached a new all-time high above $115,000 driven by increased corporate treasury adoption and regulatory clarity. MicroStrategy announced additional $500M purchase plan for Q1 2025.",
+            "tags": ["Bitcoin", "Crypto", "ATH", "Institutional"],
+            "category": "cryptocurrency",
+            "importance": "high",
+            "market_impact": "positive",
+            "symbols": ["BTC/USDT"]
+        },
+        {
+            "id": 3,
+            "title": "Apple Reports Record Q4 Earnings Despite China Headwinds",
+            "source": "Apple Inc.",
+            "timestamp": (current_time - timedelta(hours=3)).isoformat(),
+            "summary": "Apple exceeded analysts' expectations with $89.5B in quarterly revenue, driven by strong iPhone 15 sales and growing services business. Stock up 3.2% in after-hours trading following the announcement.",
+            "tags": ["Apple", "Earnings", "Tech", "iPhone"],
+            "category": "earnings",
+            "importance": "medium",
+            "market_impact": "positive",
+            "symbols": ["AAPL"]
+        },
+        {
+            "id": 4,
+            "title": "Oil Prices Surge 4.2% After OPEC+ Production Cut Extension",
+            "source": "Reuters",
+            "timestamp": (current_time - timedelta(hours=4)).isoformat(),
+            "summary": "Crude oil futures jumped following OPEC+'s decision to extend production cuts through Q2 2025. Brent crude now trading above $92 per barrel amid global supply concerns and geopolitical tensions.",
+            "tags": ["Oil", "OPEC", "Energy", "Commodities"],
+            "category": "commodities",
+            "importance": "medium",
+            "market_impact": "positive",
+            "symbols": ["USOIL", "UKOIL"]
+        },
+        {
+            "id": 5,
+            "title": "European Markets Rally on ECB Rate Cut Speculation",
+            "source": "Bloomberg",
+            "timestamp": (current_time - timedelta(hours=5)).isoformat(),
+            "summary": "European stocks surged as investors bet on potential ECB rate cuts following weaker-than-expected inflation data. DAX gained 2.1%, CAC 40 up 1.8%, FTSE 100 climbed 1.5% in morning trading.",
+            "tags": ["Europe", "ECB", "Stocks", "Inflation"],
+            "category": "international",
+            "importance": "medium",
+            "market_impact": "positive",
+            "symbols": ["EUR/USD"]
+        },
+        {
+            "id": 6,
+            "title": "Gold Hits New Record High Above $2,525 Amid Dollar Weakness",
+            "source": "MarketWatch",
+            "timestamp": (current_time - timedelta(hours=6)).isoformat(),
+            "summary": "Gold prices reached a new record high as the US dollar weakened and geopolitical tensions increased. Silver also gained 2.3% to $28.90 per ounce, while platinum jumped 1.8%.",
+            "tags": ["Gold", "Precious Metals", "Dollar", "Safe Haven"],
+            "category": "commodities",
+            "importance": "medium",
+            "market_impact": "positive",
+            "symbols": ["XAUUSD", "XAGUSD", "XPTUSD"]
+        },
+        {
+            "id": 7,
+            "title": "Microsoft Azure Revenue Grows 35% Amid AI Boom",
+            "source": "Microsoft Corp.",
+            "timestamp": (current_time - timedelta(hours=7)).isoformat(),
+            "summary": "Microsoft reported strong cloud growth with Azure revenue up 35% year-over-year, driven by AI services adoption. The company's Copilot AI tools are seeing rapid enterprise uptake across multiple sectors.",
+            "tags": ["Microsoft", "Cloud", "AI", "Enterprise"],
+            "category": "earnings",
+            "importance": "medium",
+            "market_impact": "positive",
+            "symbols": ["MSFT"]
+        },
+        {
+            "id": 8,
+            "title": "Japanese Yen Weakens as Bank of Japan Holds Ultra-Low Rates",
+            "source": "Nikkei Asia",
+            "timestamp": (current_time - timedelta(hours=8)).isoformat(),
+            "summary": "The yen fell to fresh lows against the dollar after the Bank of Japan maintained its ultra-accommodative monetary policy. USD/JPY reached 150.25, prompting intervention warnings from Japanese officials.",
+            "tags": ["Yen", "BOJ", "Forex", "Intervention"],
+            "category": "forex",
+            "importance": "medium",
+            "market_impact": "negative",
+            "symbols": ["USD/JPY"]
+        },
+        {
+            "id": 9,
+            "title": "Ethereum ETF Sees Record $2.3B Weekly Inflows",
+            "source": "CryptoNews",
+            "timestamp": (current_time - timedelta(hours=9)).isoformat(),
+            "summary": "Ethereum ETFs recorded their largest weekly inflows since launch, with $2.3B in net purchases. ETH price surged 8.5% to $3,485 as institutional demand continues to grow rapidly.",
+            "tags": ["Ethereum", "ETF", "Crypto", "Institutional"],
+            "category": "cryptocurrency",
+            "importance": "medium",
+            "market_impact": "positive",
+            "symbols": ["ETH/USDT"]
+        },
+        {
+            "id": 10,
+            "title": "Tesla Reports Strong Q4 Vehicle Deliveries Beat Estimates",
+            "source": "Tesla Inc.",
+            "timestamp": (current_time - timedelta(hours=10)).isoformat(),
+            "summary": "Tesla delivered 484,507 vehicles in Q4, exceeding analyst estimates of 473,000 units. Strong Model 3 and Model Y demand drove the outperformance despite global supply chain challenges.",
+            "tags": ["Tesla", "EV", "Deliveries", "Automotive"],
+            "category": "earnings",
+            "importance": "medium",
+            "market_impact": "positive",
+            "symbols": ["TSLA"]
+        },
+        {
+            "id": 11,
+            "title": "China Manufacturing PMI Rises to 50.8, Signaling Economic Recovery",
+            "source": "Reuters",
+            "timestamp": (current_time - timedelta(hours=11)).isoformat(),
+            "summary": "China's official manufacturing PMI rose to 50.8 in December, the highest reading in 3 months, indicating economic stabilization. The services sector also showed improvement with PMI at 52.2.",
+            "tags": ["China", "Manufacturing", "PMI", "Economic Recovery"],
+            "category": "economic_data",
+            "importance": "medium",
+            "market_impact": "positive",
+            "symbols": []
+        },
+        {
+            "id": 12,
+            "title": "UK Inflation Falls to 3.9% as Energy Costs Stabilize",
+            "source": "Bank of England",
+            "timestamp": (current_time - timedelta(hours=12)).isoformat(),
+            "summary": "UK annual inflation rate dropped to 3.9% in November from 4.6% in October, moving closer to the Bank of England's 2% target. Core inflation also declined to 5.1% from 5.7%.",
+            "tags": ["UK", "Inflation", "BOE", "Economic Data"],
+            "category": "economic_data",
+            "importance": "medium",
+            "market_impact": "positive",
+            "symbols": ["GBP/USD"]
+        }
+    ]
+    return news_items
+
+# Indexed news feed; new items are added with news_feed.add()
+news_feed = NewsStore()
+for item in reversed(build_news_items()):
+    news_feed.add(item)
+
+def parse_news_query(params):
+    """Validate filters, limit, before and since for /api/news"""
+    filters = {field: [value for value in params.get(param, '').split(',') if value]
+               for field, param in FILTER_PARAMS.items()}
+    limit = params.get('limit')
+    try:
+        limit = int(limit) if limit not in (None, '') else DEFAULT_PAGE_SIZE
+    except ValueError:
+        raise ValueError(f"Invalid limit '{limit}'")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    before = params.get('before')
+    since = params.get('since')
+    if since and not is_cursor(since):
+        # A timestamp: everything published after it
+        seconds = int(parse_time_param(since).astype(np.int64))
+        since = (seconds * 1000000, float('inf'))
+    elif since:
+        since = parse_cursor(since)
+    return {
+        'filters': filters,
+        'limit': limit,
+        'before': parse_cursor(before) if before else None,
+        'since': since or None
+    }
+
 @app.route('/api/news')
 def get_news():
-    """API endpoint to get enhanced mock news data with 9 news items"""
+    """API endpoint to get news items, newest first
+    
+    Query parameters: category, tag, importance and symbol filters (comma
+    separated values match any of them), limit (page size), before=<cursor>
+    for the next page (X-Next-Cursor) and since=<cursor|timestamp> for only
+    the items added after what the client already holds (X-Latest-Cursor).
+    """
     try:
-        current_time = datetime.now()
-        
-        news_items = [
-            {
-                "id": 1,
-                "title": "Federal Reserve Maintains Interest Rates Amid Economic Uncertainty",
-                "source": "Federal Reserve",
-                "time": "1 hour ago",
-                "timestamp": (current_time - timedelta(hours=1)).isoformat(),
-                "summary": "The Federal Reserve decided to hold interest rates steady at 5.25%-5.50% as inflation shows signs of cooling but remains above target levels. Chair Powell emphasized data-dependent approach moving forward.",
-                "tags": ["Fed", "Interest Rates", "Economy", "Inflation"],
-                "category": "monetary_policy",
-                "importance": "high",
-                "market_impact": "positive"
-            },
-            {
-                "id": 2,
-                "title": "Bitcoin Surges Past $115,000 as Institutional Adoption Accelerates",
-                "source": "CoinDesk",
-                "time": "2 hours ago",
-                "timestamp": (current_time - timedelta(hours=2)).isoformat(),
-                "summary": "Bitcoin reached a new all-time high above $115,000 driven by increased corporate treasury adoption and regulatory clarity. MicroStrategy announced additional $500M purchase plan for Q1 2025.",
-                "tags": ["Bitcoin", "Crypto", "ATH", "Institutional"],
-                "category": "cryptocurrency",
-                "importance": "high",
-                "market_impact": "positive"
-            },
-            {
-                "id": 3,
-                "title": "Apple Reports Record Q4 Earnings Despite China Headwinds",
-                "source": "Apple Inc.",
-                "time": "3 hours ago",
-                "timestamp": (current_time - timedelta(hours=3)).isoformat(),
-                "summary": "Apple exceeded analysts' expectations with $89.5B in quarterly revenue, driven by strong iPhone 15 sales and growing services business. Stock up 3.2% in after-hours trading following the announcement.",
-                "tags": ["Apple", "Earnings", "Tech", "iPhone"],
-                "category": "earnings",
-                "importance": "medium",
-                "market_impact": "positive"
-            },
-            {
-                "id": 4,
-                "title": "Oil Prices Surge 4.2% After OPEC+ Production Cut Extension",
-                "source": "Reuters",
-                "time": "4 hours ago",
-                "timestamp": (current_time - timedelta(hours=4)).isoformat(),
-                "summary": "Crude oil futures jumped following OPEC+'s decision to extend production cuts through Q2 2025. Brent crude now trading above $92 per barrel amid global supply concerns and geopolitical tensions.",
-                "tags": ["Oil", "OPEC", "Energy", "Commodities"],
-                "category": "commodities",
-                "importance": "medium",
-                "market_impact": "positive"
-            },
-            {
-                "id": 5,
-                "title": "European Markets Rally on ECB Rate Cut Speculation",
-                "source": "Bloomberg",
-                "time": "5 hours ago",
-                "timestamp": (current_time - timedelta(hours=5)).isoformat(),
-                "summary": "European stocks surged as investors bet on potential ECB rate cuts following weaker-than-expected inflation data. DAX gained 2.1%, CAC 40 up 1.8%, FTSE 100 climbed 1.5% in morning trading.",
-                "tags": ["Europe", "ECB", "Stocks", "Inflation"],
-                "category": "international",
-                "importance": "medium",
-                "market_impact": "positive"
-            },
-            {
-                "id": 6,
-                "title": "Gold Hits New Record High Above $2,525 Amid Dollar Weakness",
-                "source": "MarketWatch",
-                "time": "6 hours ago",
-                "timestamp": (current_time - timedelta(hours=6)).isoformat(),
-                "summary": "Gold prices reached a new record high as the US dollar weakened and geopolitical tensions increased. Silver also gained 2.3% to $28.90 per ounce, while platinum jumped 1.8%.",
-                "tags": ["Gold", "Precious Metals", "Dollar", "Safe Haven"],
-                "category": "commodities",
-                "importance": "medium",
-                "market_impact": "positive"
-            },
-            {
-                "id": 7,
-                "title": "Microsoft Azure Revenue Grows 35% Amid AI Boom",
-                "source": "Microsoft Corp.",
-                "time": "7 hours ago",
-                "timestamp": (current_time - timedelta(hours=7)).isoformat(),
-                "summary": "Microsoft reported strong cloud growth with Azure revenue up 35% year-over-year, driven by AI services adoption. The company's Copilot AI tools are seeing rapid enterprise uptake across multiple sectors.",
-                "tags": ["Microsoft", "Cloud", "AI", "Enterprise"],
-                "category": "earnings",
-                "importance": "medium",
-                "market_impact": "positive"
-            },
-            {
-                "id": 8,
-                "title": "Japanese Yen Weakens as Bank of Japan Holds Ultra-Low Rates",
-                "source": "Nikkei Asia",
-                "time": "8 hours ago",
-                "timestamp": (current_time - timedelta(hours=8)).isoformat(),
-                "summary": "The yen fell to fresh lows against the dollar after the Bank of Japan maintained its ultra-accommodative monetary policy. USD/JPY reached 150.25, prompting intervention warnings from Japanese officials.",
-                "tags": ["Yen", "BOJ", "Forex", "Intervention"],
-                "category": "forex",
-                "importance": "medium",
-                "market_impact": "negative"
-            },
-            {
-                "id": 9,
-                "title": "Ethereum ETF Sees Record $2.3B Weekly Inflows",
-                "source": "CryptoNews",
-                "time": "9 hours ago",
-                "timestamp": (current_time - timedelta(hours=9)).isoformat(),
-                "summary": "Ethereum ETFs recorded their largest weekly inflows since launch, with $2.3B in net purchases. ETH price surged 8.5% to $3,485 as institutional demand continues to grow rapidly.",
-                "tags": ["Ethereum", "ETF", "Crypto", "Institutional"],
-                "category": "cryptocurrency",
-                "importance": "medium",
-                "market_impact": "positive"
-            },
-            {
-                "id": 10,
-                "title": "Tesla Reports Strong Q4 Vehicle Deliveries Beat Estimates",
-                "source": "Tesla Inc.",
-                "time": "10 hours ago",
-                "timestamp": (current_time - timedelta(hours=10)).isoformat(),
-                "summary": "Tesla delivered 484,507 vehicles in Q4, exceeding analyst estimates of 473,000 units. Strong Model 3 and Model Y demand drove the outperformance despite global supply chain challenges.",
-                "tags": ["Tesla", "EV", "Deliveries", "Automotive"],
-                "category": "earnings",
-                "importance": "medium",
-                "market_impact": "positive"
-            },
-            {
-                "id": 11,
-                "title": "China Manufacturing PMI Rises to 50.8, Signaling Economic Recovery",
-                "source": "Reuters",
-                "time": "11 hours ago",
-                "timestamp": (current_time - timedelta(hours=11)).isoformat(),
-                "summary": "China's official manufacturing PMI rose to 50.8 in December, the highest reading in 3 months, indicating economic stabilization. The services sector also showed improvement with PMI at 52.2.",
-                "tags": ["China", "Manufacturing", "PMI", "Economic Recovery"],
-                "category": "economic_data",
-                "importance": "medium",
-                "market_impact": "positive"
-            },
-            {
-                "id": 12,
-                "title": "UK Inflation Falls to 3.9% as Energy Costs Stabilize",
-                "source": "Bank of England",
-                "time": "12 hours ago",
-                "timestamp": (current_time - timedelta(hours=12)).isoformat(),
-                "summary": "UK annual inflation rate dropped to 3.9% in November from 4.6% in October, moving closer to the Bank of England's 2% target. Core inflation also declined to 5.1% from 5.7%.",
-                "tags": ["UK", "Inflation", "BOE", "Economic Data"],
-                "category": "economic_data",
-                "importance": "medium",
-                "market_impact": "positive"
-            }
-        ]
+        try:
+            query = parse_news_query(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        return jsonify(news_items)
+        def build():
+            entries, next_key = news_feed.query(**query)
+            headers = {}
+            latest = news_feed.latest_key()
+            if latest is not None:
+                headers['X-Latest-Cursor'] = format_cursor(latest)
+            if next_key is not None:
+                headers['X-Next-Cursor'] = format_cursor(next_key)
+            return NewsStore.encode(entries, time.time()), 200, headers
+        
+        # Relative times are refreshed with each snapshot; new items change the key at once
+        snapshot = get_snapshot()
+        version = snapshot.version if snapshot is not None else 0
+        return cached_json(('news', news_feed.version, request.query_string), version, build)
     except Exception as e:
         print(f"❌ Error in /api/news: {e}")
         return jsonify({'error': 'Failed to fetch news data'}), 500
@@ -421,25 +928,122 @@ def get_news():
 def get_market_stats():
     """API endpoint to get current market statistics"""
     try:
-        if not market_data_cache:
-            fetch_real_data()
-        
-        stats = calculate_market_stats()
-        
-        # Add additional market metrics
-        stats.update({
-            'total_volume': random.randint(80000000000, 120000000000),
-            'market_cap': random.randint(45000000000000, 55000000000000),
-            'fear_greed_index': random.randint(25, 85),
-            'vix': round(random.uniform(12.5, 35.8), 2),
-            'sentiment': "Cautiously Optimistic" if stats['gainers'] > stats['losers'] else "Mixed"
-        })
+        snapshot = get_snapshot()
+        if snapshot is None:
+            return snapshot_unavailable()
         
-        return jsonify(stats)
+        def build():
+            stats = dict(snapshot.market_stats)
+            moving = stats['gainers'] + stats['losers']
+            
+            stats.update({
+                # Share of moving instruments that advanced: 0 all falling, 100 all rising
+                'fear_greed_index': round(100 * stats['gainers'] / moving) if moving else 50,
+                'sentiment': "Cautiously Optimistic" if stats['gainers'] > stats['losers'] else "Mixed"
+            })
+            return stats, 200, None
+        
+        return cached_json('market-stats', snapshot.version, build, snapshot_headers(snapshot))
     except Exception as e:
         print(f"❌ Error in /api/market-stats: {e}")
         return jsonify({'error': 'Failed to fetch market stats'}), 500
 
+@app.route('/api/movers')
+def get_movers():
+    """API endpoint to get the top gainers, losers and most active instruments
+    
+    Query parameters: limit (entries per list) and market to rank within one
+    market type instead of across all of them.
+    """
+    try:
+        limit = request.args.get('limit', '')
+        market_type = request.args.get('market') or None
+        if limit and not (limit.isdigit() and 1 <= int(limit) <= MAX_TOP):
+            return jsonify({'error': f"limit must be between 1 and {MAX_TOP}"}), 400
+        if market_type is not None and market_type not in SYMBOLS:
+            return jsonify({'error': f"Unknown market '{market_type}'"}), 400
+        
+        snapshot = get_snapshot()
+        if snapshot is None:
+            return snapshot_unavailable()
+        
+        def build():
+            n = int(limit) if limit else DEFAULT_TOP
+            breadth = snapshot.breadth
+            return {ranking: breadth.top(ranking, n, market_type)
+                    for ranking in ('gainers', 'losers', 'most_active')}, 200, None
+        
+        return cached_json(('movers', request.query_string), snapshot.version, build, snapshot_headers(snapshot))
+    except Exception as e:
+        print(f"❌ Error in /api/movers: {e}")
+        return jsonify({'error': 'Failed to fetch top movers'}), 500
+
+@app.route('/api/analytics')
+def get_analytics():
+    """API endpoint to compare instruments: returns, realized volatility and correlation matrix
+    
+    Query parameters: symbols=<market>/<symbol>,... (or market=<type>, or
+    neither for every symbol), interval, lookback (bars of log returns) and
+    horizons (bar counts to report returns over). Computed in one vectorized
+    pass over the held closes and cached per snapshot.
+    """
+    try:
+        interval = request.args.get('interval', DEFAULT_INTERVAL)
+        if interval not in INTERVALS:
+            return jsonify({'error': f"Unsupported interval '{interval}'", 'intervals': list(INTERVALS)}), 400
+        
+        market_type = request.args.get('market') or None
+        entries = [entry for entry in request.args.get('symbols', '').split(',') if entry]
+        if market_type is not None and market_type not in SYMBOLS:
+            return jsonify({'error': f"Unknown market '{market_type}'"}), 400
+        if entries:
+            selection = [tuple(entry.partition('/')[::2]) for entry in entries]
+        else:
+            selection = [(mt, symbol) for mt, symbols in SYMBOLS.items()
+                         if market_type in (None, mt) for symbol in symbols]
+        if len(selection) > analytics.MAX_SYMBOLS:
+            return jsonify({'error': f"At most {analytics.MAX_SYMBOLS} symbols per request"}), 400
+        
+        try:
+            lookback = int(request.args.get('lookback', analytics.DEFAULT_LOOKBACK))
+            horizons = [int(h) for h in request.args.get('horizons', '').split(',') if h]
+        except ValueError:
+            return jsonify({'error': 'lookback and horizons must be integers'}), 400
+        if lookback < 2:
+            return jsonify({'error': 'lookback must be at least 2'}), 400
+        if any(h < 1 for h in horizons):
+            return jsonify({'error': 'horizons must be positive'}), 400
+        
+        snapshot = get_snapshot()
+        if snapshot is None:
+            return snapshot_unavailable()
+        
+        def build():
+            try:
+                dates, closes = analytics.close_matrix(snapshot.historical, selection, interval, lookback)
+            except KeyError as e:
+                return {'error': "Unknown symbol '{1}' for market '{0}'".format(*e.args)}, 404, None
+            if len(dates) < 3:
+                return {'error': f"Not enough {interval} history for analytics"}, 400, None
+            # Short histories clip the window; horizons beyond it are dropped
+            bars = len(dates) - 1
+            periods = sorted({h for h in horizons or (*analytics.DEFAULT_HORIZONS, bars) if h <= bars})
+            returns, volatility, correlation = analytics.analyze(closes, INTERVALS[interval], periods)
+            return analytics.encode({
+                'interval': interval,
+                'lookback': bars,
+                'from': str(dates[0]),
+                'to': str(dates[-1]),
+                'symbols': [f'{mt}/{symbol}' for mt, symbol in selection],
+                'returns': {str(h): analytics.finite(values) for h, values in returns.items()},
+                'volatility': analytics.finite(volatility)
+            }, correlation), 200, None
+        
+        return cached_json(('analytics', request.query_string), snapshot.version, build, snapshot_headers(snapshot))
+    except Exception as e:
+        print(f"❌ Error in /api/analytics: {e}")
+        return jsonify({'error': 'Failed to compute analytics'}), 500
+
 @app.route('/api/watchlist')
 def get_watchlist():
     """API endpoint to get user's watchlist (mock data)"""
@@ -456,16 +1060,114 @@ def get_watchlist():
         return jsonify({'error': 'Failed to fetch watchlist'}), 500
 
 def background_data_updater():
-    """Background thread to periodically update market data"""
+    """Background thread to periodically publish fresh market snapshots"""
     while True:
         try:
+            time.sleep(REFRESH_INTERVAL)  # Update every minute by default
             print("🔄 Background data update...")
-            fetch_real_data()
-            time.sleep(60)  # Update every minute
+            refresh_snapshot()
         except Exception as e:
             print(f"⚠️ Background update error: {e}")
             time.sleep(30)  # Retry in 30 seconds if error
 
+def shared_snapshot_worker():
+    """Follow the shared snapshot, becoming the updater whenever that role is vacant"""
+    while True:
+        try:
+            if shared_snapshots.lease.try_acquire():
+                print(f"👑 Worker {os.getpid()} elected market data updater")
+                # Continue numbering after the last version other workers have seen
+                adopt_shared_snapshot()
+                refresh_snapshot()
+                if history_pool is not None:
+                    history_pool.close()
+                background_data_updater()
+            adopt_shared_snapshot()
+            # Stream connections also open and close outside requests' after_request
+            metrics.sync()
+        except Exception as e:
+            print(f"⚠️ Shared snapshot error: {e}")
+        time.sleep(SHARED_POLL_SECONDS)
+
+def start_background_updater():
+    """Publish the initial snapshot and start the updater thread (once per process)
+    
+    With SHARED_SNAPSHOT_DIR set, every worker starts a thread that follows the
+    shared snapshot instead, and exactly one of them is elected to generate it.
+    """
+    global _updater_started
+    
+    with _updater_lock:
+        if _updater_started:
+            return
+        
+        if shared_snapshots is not None:
+            threading.Thread(target=shared_snapshot_worker, daemon=True).start()
+            _updater_started = True
+            print(f"🔄 Worker {os.getpid()} following shared snapshots in {SHARED_SNAPSHOT_DIR}")
+            return
+        
+        refresh_snapshot()
+        if history_pool is not None:
+            # History only needs generating once; don't keep the workers around
+            history_pool.close()
+        updater_thread = threading.Thread(target=background_data_updater, daemon=True)
+        updater_thread.start()
+        _updater_started = True
+        print("🔄 Background data updater started")
+
+@app.before_first_request
+def ensure_background_updater():
+    """Make sure snapshots are being published when served via `flask run`"""
+    start_background_updater()
+
+def snapshot_metric(read):
+    """Scrape-time reader for a snapshot gauge; reports nothing until the first snapshot is published"""
+    def value():
+        snapshot = get_snapshot()
+        return read(snapshot) if snapshot is not None else None
+    return value
+
+metrics.Callback('snapshot_version', 'Version of the published market snapshot',
+                 snapshot_metric(lambda snapshot: snapshot.version))
+metrics.Callback('snapshot_age_seconds', 'Seconds since the published snapshot was generated',
+                 snapshot_metric(lambda snapshot: snapshot.age()))
+metrics.Callback('market_updater', 'Processes generating snapshots (1 unless failing over)',
+                 lambda: int(shared_snapshots is None or shared_snapshots.lease.held), aggregate=True)
+metrics.Callback('stream_clients', 'Open /api/stream connections', lambda: broadcaster.clients, aggregate=True)
+metrics.Callback('response_cache_hits_total', 'Responses served from the per-snapshot cache',
+                 lambda: response_cache.hits, kind='counter', aggregate=True)
+metrics.Callback('response_cache_misses_total', 'Responses built because the cache had no entry',
+                 lambda: response_cache.misses, kind='counter', aggregate=True)
+metrics.Callback('response_cache_evictions_total', 'Cached responses dropped to stay within the byte budget',
+                 lambda: response_cache.evictions, kind='counter', aggregate=True)
+metrics.Callback('response_cache_bytes', 'Bytes of response bodies held in the cache',
+                 lambda: response_cache.bytes, aggregate=True)
+metrics.Callback('market_data_upstream_calls_total', 'HTTP calls made to the market data provider',
+                 lambda: getattr(market_provider, 'upstream_calls', None), kind='counter', aggregate=True)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Count and time every request; streamed bodies are timed to their first byte and not sized"""
+    started = g.pop('request_started', None)
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    REQUESTS_TOTAL.inc(route, request.method, response.status_code)
+    if started is not None:
+        REQUEST_DURATION.observe(time.perf_counter() - started, route)
+    if not response.is_streamed:
+        RESPONSE_SIZE.observe(response.calculate_content_length() or 0, route)
+    metrics.sync()
+    return response
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus text exposition of request, refresh, snapshot and cache metrics"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 # Error handlers
 @app.errorhandler(404)
 def not_found_error(error):
@@ -488,14 +1190,10 @@ if __name__ == '__main__':
     print("📊 Initializing market data...")
     
     try:
-        fetch_real_data()
+        # Publish the first snapshot and start background updater thread
+        start_background_updater()
         print("✅ Market data initialized successfully!")
         
-        # Start background updater thread
-        updater_thread = threading.Thread(target=background_data_updater, daemon=True)
-        updater_thread.start()
-        print("🔄 Background data updater started")
-        
         print("🌐 Server starting on http://localhost:5000")
         print("📈 Dashboard Status: Active")
         print("💡 Features: Live data, Interactive charts, Breaking news")
@@ -0,0 +1,200 @@
+"""Durable append-only log of closed bars, one fixed-width binary file per symbol and interval"""
+import os
+import time
+from urllib.parse import quote
+
+import numpy as np
+
+from ohlc import BarMatrix
+
+MAGIC = b'BARLOG1\n'
+
+# One closed bar; `time` is the bar start in epoch seconds
+RECORD = np.dtype([('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'),
+                   ('close', '<f8'), ('volume', '<i8')])
+
+HEADER = np.dtype([('magic', 'S8'), ('record_size', '<u4'), ('reserved', '<u4')])
+
+# A file is compacted to its retained tail once it holds this many times more records
+COMPACT_FACTOR = 2
+
+# Seconds between batched writes of closed bars
+FLUSH_INTERVAL = 60
+
+# Records at the end of a file checked for crash damage; everything before was fsynced earlier
+TAIL_CHECK = 65536
+
+
+def read_records(path):
+    """Memory-map the complete records of one log file, truncating a torn tail.
+
+    A crash can leave a partial record, or zero-filled space from an
+    unfinished write, after the last good record. Either is cut off here, so
+    the file is valid again before anything is appended to it.
+    """
+    try:
+        size = os.path.getsize(path)
+    except FileNotFoundError:
+        return np.empty(0, RECORD)
+    if size < HEADER.itemsize:
+        _truncate(path, 0)
+        return np.empty(0, RECORD)
+
+    header = np.fromfile(path, HEADER, count=1)[0]
+    if header['magic'] != MAGIC or header['record_size'] != RECORD.itemsize:
+        raise ValueError(f"{path} is not a bar log with {RECORD.itemsize}-byte records")
+
+    count, torn = divmod(size - HEADER.itemsize, RECORD.itemsize)
+    if count == 0:
+        if torn:
+            _truncate(path, HEADER.itemsize)
+        return np.empty(0, RECORD)
+
+    # Plain ndarray view of the mapping; np.memmap's own slicing is slow on hot paths
+    records = np.memmap(path, RECORD, 'r', offset=HEADER.itemsize, shape=(count,)).view(np.ndarray)
+    # Bar times strictly increase; the first step backwards marks the start of garbage
+    checked = max(0, count - TAIL_CHECK)
+    broken = np.flatnonzero(np.diff(records['time'][checked:]) <= 0)
+    if len(broken):
+        count = checked + int(broken[0]) + 1
+        records = records[:count]
+        torn = True
+    if torn:
+        _truncate(path, HEADER.itemsize + count * RECORD.itemsize)
+    return records
+
+
+def _truncate(path, size):
+    with open(path, 'r+b') as f:
+        f.truncate(size)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _header():
+    header = np.zeros(1, HEADER)
+    header['magic'] = MAGIC
+    header['record_size'] = RECORD.itemsize
+    return header.tobytes()
+
+
+def _records(bars, lo=0):
+    """(symbols x bars) RECORD array of a BarMatrix from column `lo` on"""
+    records = np.empty((len(bars.symbols), len(bars.dates) - lo), RECORD)
+    records['time'] = bars.dates[lo:].astype('datetime64[s]').astype(np.int64)
+    for name in ('open', 'high', 'low', 'close', 'volume'):
+        records[name] = getattr(bars, name)[:, lo:]
+    return records
+
+
+class BarLog:
+    """Closed-bar log for one market, laid out as <root>/<market>/<interval>/<symbol>.bars.
+
+    Bars are queued in memory as they close and written in batches by
+    flush(); each file gets one append per batch. Replay memory-maps a file
+    and copies only the tail it needs, so startup cost does not grow with
+    the length of the log.
+    """
+
+    def __init__(self, root, market, symbols, retain, flush_interval=FLUSH_INTERVAL, fsync=True):
+        self.directory = os.path.join(root, quote(market, safe=''))
+        self.symbols = list(symbols)
+        self.retain = dict(retain)
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._pending = {}
+        self._last_flush = time.monotonic()
+
+    def path(self, interval, symbol):
+        return os.path.join(self.directory, interval, quote(symbol, safe='') + '.bars')
+
+    def replay(self, interval, unit, before=None):
+        """Last `retain` closed bars of `interval` for every symbol as a BarMatrix, or None.
+
+        Bars starting at or after `before` (datetime64) are dropped, and so are
+        bars only some symbols got before a crash mid-flush, so every file ends
+        on the same bar and later appends stay aligned. None means the logs are
+        missing or do not line up, and history has to be rebuilt.
+        """
+        limit = self.retain[interval]
+        paths = [self.path(interval, symbol) for symbol in self.symbols]
+        logs = [read_records(path) for path in paths]
+        if before is not None:
+            cutoff = np.datetime64(before, 's').astype(np.int64)
+            logs = [records[:int(np.searchsorted(records['time'], cutoff))] for records in logs]
+        if not all(len(records) for records in logs):
+            return None
+
+        common = min(records['time'][-1] for records in logs)
+        tails = []
+        for path, records in zip(paths, logs):
+            end = int(np.searchsorted(records['time'], common, 'right'))
+            if end < (os.path.getsize(path) - HEADER.itemsize) // RECORD.itemsize:
+                _truncate(path, HEADER.itemsize + end * RECORD.itemsize)
+            tails.append(records[max(0, end - limit):end])
+
+        count = min(len(tail) for tail in tails)
+        times = np.stack([tail['time'][-count:] for tail in tails])
+        if not (times == times[0]).all():
+            return None
+
+        columns = {name: np.stack([tail[name][-count:] for tail in tails])
+                   for name in ('open', 'high', 'low', 'close', 'volume')}
+        dates = times[0].astype('datetime64[s]').astype(f'datetime64[{unit}]')
+        return BarMatrix(self.symbols, dates, **columns)
+
+    def write(self, interval, bars):
+        """Replace the logs of `interval` with the bars of a BarMatrix (e.g. after a backfill)"""
+        self._pending.pop(interval, None)
+        records = _records(bars, max(0, len(bars.dates) - self.retain[interval]))
+        for symbol, row in zip(self.symbols, records):
+            self._replace(self.path(interval, symbol), row)
+
+    def append(self, interval, bars, count=1):
+        """Queue the last `count` bars of a BarMatrix for every symbol; nothing is written until flush()"""
+        self._pending.setdefault(interval, []).append(_records(bars, len(bars.dates) - count))
+
+    def flush_if_due(self):
+        if self._pending and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write every queued bar, one append per file, and compact files that grew too long"""
+        pending, self._pending = self._pending, {}
+        self._last_flush = time.monotonic()
+        for interval, batches in pending.items():
+            records = np.concatenate(batches, axis=1)
+            for symbol, row in zip(self.symbols, records):
+                path = self.path(interval, symbol)
+                size = self._append(path, row)
+                if (size - HEADER.itemsize) // RECORD.itemsize > COMPACT_FACTOR * self.retain[interval]:
+                    self.compact(interval, symbol)
+
+    def compact(self, interval, symbol):
+        """Rewrite one file with only its retained tail"""
+        path = self.path(interval, symbol)
+        records = read_records(path)
+        self._replace(path, np.array(records[-self.retain[interval]:]))
+
+    def _append(self, path, records):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'ab') as f:
+            if f.tell() == 0:
+                f.write(_header())
+            f.write(records.tobytes())
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+            return f.tell()
+
+    def _replace(self, path, records):
+        """Atomically swap in a new file: write a temporary, fsync it, then rename over"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = path + '.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(_header())
+            f.write(records.tobytes())
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(temporary, path)
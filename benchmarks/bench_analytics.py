@@ -0,0 +1,93 @@
+"""Cost of /api/analytics: vectorized close matrix + returns/volatility/correlation vs a per-symbol loop.
+
+Usage: python benchmarks/bench_analytics.py [--symbols 100 250 500] [--markets 2] [--lookback 90] [--repeat 20]
+
+Builds `--markets` markets whose symbols add up to the largest count, then
+times the route's computation (close_matrix, analyze and encoding the JSON
+body) against what a client pulling each series through /api/historical
+would do: slice one symbol's closes at a time and correlate pair by pair.
+Both ways are checked to give the same matrix, up to the rounding of
+historical records.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analytics  # noqa: E402
+from aggregation import INTERVALS  # noqa: E402
+from market_engine import DEFAULT_CAPACITY, MarketEngine  # noqa: E402
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def vectorized(historical, selection, interval, lookback):
+    dates, closes = analytics.close_matrix(historical, selection, interval, lookback)
+    returns, volatility, correlation = analytics.analyze(closes, INTERVALS[interval], (1, 5, lookback))
+    body = analytics.encode({
+        'returns': {str(h): analytics.finite(values) for h, values in returns.items()},
+        'volatility': analytics.finite(volatility)
+    }, correlation)
+    return body, correlation
+
+
+def per_symbol(historical, selection, interval, lookback):
+    series = []
+    for market_type, symbol in selection:
+        records = historical[market_type].series(symbol, interval).to_records()[-(lookback + 1):]
+        series.append(np.diff(np.log([record['close'] for record in records])))
+    n = len(series)
+    correlation = np.empty((n, n))
+    for i in range(n):
+        for j in range(i, n):
+            correlation[i, j] = correlation[j, i] = np.corrcoef(series[i], series[j])[0, 1]
+    return correlation
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--symbols', type=int, nargs='+', default=[100, 250, 500])
+    parser.add_argument('--markets', type=int, default=2)
+    parser.add_argument('--lookback', type=int, default=90)
+    parser.add_argument('--interval', default='1d', choices=list(INTERVALS))
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    per_market = -(-max(args.symbols) // args.markets)
+    days = max(30, args.lookback * INTERVALS[args.interval] // 86400 + 2)
+    # Only the benchmarked level needs to hold the whole window
+    capacity = {args.interval: max(args.lookback + 2, DEFAULT_CAPACITY[args.interval])}
+    historical = {}
+    start = time.perf_counter()
+    for m in range(args.markets):
+        symbols = [f'M{m}SYM{i}' for i in range(per_market)]
+        engine = MarketEngine(symbols, [100.0] * per_market, (-0.03, 0.03), capacity=capacity,
+                              backfill_days=days, rng=m)
+        historical[f'market{m}'] = engine.tick()
+    print(f'backfill: {args.markets} markets x {per_market} symbols, {days} days in '
+          f'{time.perf_counter() - start:.2f}s')
+
+    everything = [(market_type, symbol) for market_type, view in historical.items() for symbol in view.symbols]
+    print(f"{'symbols':>8}{'vectorized ms':>16}{'per-symbol ms':>16}{'speedup':>10}{'body KB':>10}")
+    for count in sorted(args.symbols):
+        # Interleave markets so every count spans all of them
+        selection = sorted(everything, key=lambda entry: int(entry[1].rpartition('SYM')[2]))[:count]
+        fast_ms, (body, fast) = timed(lambda: vectorized(historical, selection, args.interval, args.lookback),
+                                      args.repeat)
+        slow_ms, slow = timed(lambda: per_symbol(historical, selection, args.interval, args.lookback), 1)
+        # Historical records round closes to 4 decimals
+        assert np.allclose(fast, slow, atol=1e-3), 'correlation mismatch'
+        print(f'{count:>8}{fast_ms:>16.2f}{slow_ms:>16.2f}{slow_ms / fast_ms:>9.1f}x{len(body) / 1024:>10.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Startup cost: regenerating history vs replaying the durable bar log.
+
+Usage: python benchmarks/bench_bar_log.py [--symbols 24] [--days 30] [--years 3]
+
+Times a cold start (backfill `--days` of 1m bars, write the log), a warm
+start from that log, and a warm start after every 1m file has been padded
+with `--years` of older bars, which replay must not have to read.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bar_log import HEADER, RECORD, BarLog, _header, read_records  # noqa: E402
+from market_engine import DEFAULT_CAPACITY, MarketEngine  # noqa: E402
+
+
+def start(root, symbols, days, now):
+    log = BarLog(root, 'bench', symbols, DEFAULT_CAPACITY, fsync=False)
+    engine = MarketEngine(symbols, [100.0] * len(symbols), (-0.03, 0.03), backfill_days=days, rng=1,
+                          bar_log=log)
+    began = time.perf_counter()
+    engine.tick(now)
+    return (time.perf_counter() - began) * 1000, engine
+
+
+def pad(path, years):
+    """Prepend `years` of older 1m records to one log file"""
+    records = np.array(read_records(path))
+    count = years * 365 * 1440
+    older = np.zeros(count, RECORD)
+    older['time'] = records['time'][0] - 60 * np.arange(count, 0, -1)
+    for name in ('open', 'high', 'low', 'close'):
+        older[name] = records[name][0]
+    with open(path, 'wb') as f:
+        f.write(_header())
+        f.write(older.tobytes())
+        f.write(records.tobytes())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--symbols', type=int, default=24)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--years', type=int, default=3)
+    args = parser.parse_args()
+
+    symbols = [f'SYM{i}' for i in range(args.symbols)]
+    now = np.datetime64('now', 's')
+    root = tempfile.mkdtemp(prefix='bar_log_bench_')
+    try:
+        cold_ms, engine = start(root, symbols, args.days, now)
+        warm_ms, _ = start(root, symbols, args.days, now)
+        for symbol in symbols:
+            pad(engine.bar_log.path('1m', symbol), args.years)
+        size = sum(os.path.getsize(engine.bar_log.path('1m', symbol)) for symbol in symbols)
+        padded_ms, restored = start(root, symbols, args.days, now)
+
+        records = (size - HEADER.itemsize * len(symbols)) // RECORD.itemsize
+        print(f'{args.symbols} symbols, {args.days} days of 1m history')
+        print(f'cold start (generate + write log): {cold_ms:8.1f} ms')
+        print(f'warm start (replay log):           {warm_ms:8.1f} ms')
+        print(f'warm start, {records / 1e6:.1f}M 1m records ({size >> 20} MB): {padded_ms:8.1f} ms')
+        print(f"restored 1m bars per symbol: {len(restored.levels['1m'].buffer)}")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
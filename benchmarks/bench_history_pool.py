@@ -0,0 +1,54 @@
+"""Startup history generation for a large market: in-process vs sharded across a process pool.
+
+Usage: python benchmarks/bench_history_pool.py [--symbols 2000] [--days 30] [--workers 1 2 4 8]
+
+Times MarketEngine.backfill for one market of `--symbols` instruments with
+each worker count (1 = in-process, no pool). The pool is started before
+timing, so the numbers are generation plus the shared memory hand-back.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_pool import HistoryPool  # noqa: E402
+from market_engine import MarketEngine  # noqa: E402
+
+
+def backfill(symbols, days, now, pool):
+    engine = MarketEngine(symbols, [100.0] * len(symbols), (-0.03, 0.03), backfill_days=days, rng=1,
+                          history_pool=pool)
+    began = time.perf_counter()
+    engine.backfill(now)
+    return time.perf_counter() - began
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--symbols', type=int, default=2000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    symbols = [f'SYM{i}' for i in range(args.symbols)]
+    now = np.datetime64('now', 'm')
+    print(f'{args.symbols} symbols, {args.days} days of 1m history, {os.cpu_count()} CPUs')
+    baseline = None
+    for workers in args.workers:
+        pool = HistoryPool(workers) if workers > 1 else None
+        if pool is not None:
+            # Warm the pool up so process start-up is not timed
+            backfill(symbols[:2 * 64], 1, now, pool)
+        elapsed = backfill(symbols, args.days, now, pool)
+        baseline = baseline or elapsed
+        print(f'workers {workers:>3}: {elapsed:8.2f} s  speedup {baseline / elapsed:5.2f}x')
+        if pool is not None:
+            pool.close()
+
+
+if __name__ == '__main__':
+    main()
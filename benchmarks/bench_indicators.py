@@ -0,0 +1,102 @@
+"""Cost of keeping indicators current: incremental update per closed bar vs full recompute.
+
+Usage: python benchmarks/bench_indicators.py [--symbols 2000] [--bars 1440] [--updates 200]
+
+Fills one level with `--bars` closed bars for `--symbols` symbols, then closes
+`--updates` more bars, timing IndicatorSet.update() against recomputing every
+indicator over the whole window with compute_indicators(), and checks the
+two agree on the final bar. Also checks that a level with nothing to
+backfill starts updating on its first closed bar; exits non-zero if not.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from indicators import INDICATOR_COLUMNS, WINDOW, IndicatorSet, compute_indicators  # noqa: E402
+from ohlc import BarBuffer, generate_ohlc_batch  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--symbols', type=int, default=2000)
+    parser.add_argument('--bars', type=int, default=1440)
+    parser.add_argument('--updates', type=int, default=200)
+    args = parser.parse_args()
+
+    symbols = [f'SYM{i}' for i in range(args.symbols)]
+    total = args.bars + args.updates
+    bars = generate_ohlc_batch(symbols, [100.0] * len(symbols), [(-0.03, 0.03)] * len(symbols),
+                               n_bars=total, rng=1, interval=60)
+
+    buffer = BarBuffer(symbols, args.bars, 'm')
+    indicators = IndicatorSet(symbols, args.bars, 'm')
+    buffer.extend(bars.slice(0, args.bars))
+    start = time.perf_counter()
+    indicators.backfill(buffer.view())
+    backfill_ms = (time.perf_counter() - start) * 1000
+
+    incremental = recompute = 0.0
+    for k in range(args.bars, total):
+        before = buffer.view()
+        buffer.append(bars.dates[k], bars.open[:, k], bars.high[:, k], bars.low[:, k],
+                      bars.close[:, k], bars.volume[:, k])
+        start = time.perf_counter()
+        indicators.update(before, bars.dates[k], bars.close[:, k], bars.high[:, k], bars.low[:, k],
+                          bars.volume[:, k])
+        incremental += time.perf_counter() - start
+
+        start = time.perf_counter()
+        full, _ = compute_indicators(buffer.view())
+        recompute += time.perf_counter() - start
+
+    incremental_ms = incremental / args.updates * 1000
+    recompute_ms = recompute / args.updates * 1000
+    print(f'{args.symbols} symbols x {args.bars} bars, backfill {backfill_ms:.1f} ms')
+    print(f'incremental update: {incremental_ms:.3f} ms/bar')
+    print(f'full recompute:     {recompute_ms:.3f} ms/bar')
+    print(f'speedup:            {recompute_ms / incremental_ms:.0f}x')
+
+    _, values = indicators.buffer.view_values()
+    for name in INDICATOR_COLUMNS:
+        if name in ('ema', 'rsi'):
+            # The recompute restarts smoothing at the window edge, so only windowed values compare exactly
+            continue
+        error = np.nanmax(np.abs(values[name][:, -1] - full[name][:, -1]))
+        print(f'  max |{name}| difference on last bar: {error:.2e}')
+
+    problems = check_empty_backfill(bars)
+    print(f"{'❌' if problems else '✅'} empty backfill starts on the first closed bar")
+    for problem in problems:
+        print(f'    {problem}')
+    return 1 if problems else 0
+
+
+def check_empty_backfill(bars):
+    """Indicators of a level backfilled with no bars, after 2 * WINDOW updates, vs a full computation"""
+    n = 2 * WINDOW
+    buffer = BarBuffer(bars.symbols, n, 'm')
+    indicators = IndicatorSet(bars.symbols, n, 'm')
+    indicators.backfill(buffer.view())
+    for k in range(n):
+        before = buffer.view()
+        buffer.append(bars.dates[k], bars.open[:, k], bars.high[:, k], bars.low[:, k],
+                      bars.close[:, k], bars.volume[:, k])
+        indicators.update(before, bars.dates[k], bars.close[:, k], bars.high[:, k], bars.low[:, k],
+                          bars.volume[:, k])
+
+    dates, values = indicators.buffer.view_values()
+    if len(dates) != n:
+        return [f'{len(dates)} of {n} closed bars have indicators']
+    # Both start smoothing at the first bar, so every column compares
+    full, _ = compute_indicators(buffer.view())
+    return [f'{name} differs from a full computation' for name in INDICATOR_COLUMNS
+            if not np.allclose(values[name], full[name], equal_nan=True)]
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""News feed query cost as the store grows: indexed NewsStore pages vs filtering a list.
+
+Usage: python benchmarks/bench_news_store.py [--sizes 1000 10000 100000 300000] [--repeat 200]
+
+Fills a NewsStore with synthetic items spread over categories, tags,
+importance levels and symbols, then times one page (20 items) for each
+query shape, plus the same filters applied by scanning a plain list.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from news_store import NewsStore  # noqa: E402
+
+CATEGORIES = ['monetary_policy', 'cryptocurrency', 'earnings', 'commodities', 'international', 'forex',
+              'economic_data']
+TAGS = [f'tag{i}' for i in range(200)]
+SYMBOLS = [f'SYM{i}' for i in range(500)]
+IMPORTANCE = ['high', 'medium', 'low']
+
+QUERIES = {
+    'first page': {},
+    'category': {'filters': {'category': ['earnings']}},
+    'rare symbol': {'filters': {'symbols': ['SYM7']}},
+    'tag + importance': {'filters': {'tags': ['tag3', 'tag4'], 'importance': ['high']}},
+}
+
+
+def synthetic_items(count, rng):
+    start = datetime(2020, 1, 1)
+    for i in range(count):
+        yield {
+            'id': i,
+            'title': f'Headline {i}',
+            'source': 'Synthetic',
+            'timestamp': (start + timedelta(seconds=60 * i)).isoformat(),
+            'summary': 'x' * 200,
+            'tags': rng.sample(TAGS, 3),
+            'category': rng.choice(CATEGORIES),
+            'importance': rng.choices(IMPORTANCE, weights=(1, 5, 10))[0],
+            'market_impact': 'positive',
+            'symbols': rng.sample(SYMBOLS, 2)
+        }
+
+
+def timed(fn, repeat):
+    began = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - began) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 300000])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    store = NewsStore()
+    items = []
+    print(f"{'items':>8} " + ' '.join(f'{name:>18}' for name in QUERIES) + f" {'deep page':>12} {'list scan':>12}  (µs)")
+    for size in sorted(args.sizes):
+        for item in synthetic_items(size - len(items), rng):
+            item['id'] += len(items)
+            store.add(item)
+            items.append(item)
+        now = time.time()
+        costs = [timed(lambda: NewsStore.encode(store.query(**query)[0], now), args.repeat)
+                 for query in QUERIES.values()]
+
+        # Page 50 of the category feed, reached through its cursor
+        before = None
+        for _ in range(50):
+            _, before = store.query({'category': ['earnings']}, before=before)
+        deep = timed(lambda: store.query({'category': ['earnings']}, before=before), args.repeat)
+
+        scan = timed(lambda: [item for item in items if item['category'] == 'earnings'][-20:],
+                     max(1, args.repeat // 50))
+        print(f'{size:>8} ' + ' '.join(f'{cost:>18.1f}' for cost in costs) + f' {deep:>12.1f} {scan:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Compare the row-by-row mock OHLC generator with the vectorized batch generator.
+
+Usage: python benchmarks/bench_ohlc.py [--symbols 1000] [--bars 2520] [--seed 7]
+
+Reports bars/sec for each generator and the memory held per bar by the
+list-of-dicts representation versus the columnar BarMatrix.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as dashboard  # noqa: E402
+from ohlc import generate_ohlc_batch  # noqa: E402
+
+
+def deep_sizeof(records):
+    """Approximate bytes held by a list of bar dicts, including keys' values"""
+    total = sys.getsizeof(records)
+    for record in records:
+        total += sys.getsizeof(record)
+        total += sum(sys.getsizeof(value) for value in record.values())
+    return total
+
+
+def bench_legacy(n_symbols):
+    """generate_mock_ohlc_data always produces 30 bars per call"""
+    symbols = [('BTC/USDT', 'crypto')] * n_symbols
+    start = time.perf_counter()
+    series = [dashboard.generate_mock_ohlc_data(symbol, market) for symbol, market in symbols]
+    elapsed = time.perf_counter() - start
+    n_bars = sum(len(s) for s in series)
+    return n_bars / elapsed, deep_sizeof(series[0]) / len(series[0])
+
+
+def bench_batch(n_symbols, n_bars, seed):
+    symbols = [f'SYM{i}' for i in range(n_symbols)]
+    base = [100.0] * n_symbols
+    ranges = [dashboard.DAILY_CHANGE_RANGES['crypto']] * n_symbols
+    start = time.perf_counter()
+    bars = generate_ohlc_batch(symbols, base, ranges, n_bars=n_bars, rng=seed)
+    elapsed = time.perf_counter() - start
+    total_bytes = sum(getattr(bars, name).nbytes for name in ('open', 'high', 'low', 'close', 'volume'))
+    total_bytes += bars.dates.nbytes
+    return n_symbols * n_bars / elapsed, total_bytes / (n_symbols * n_bars)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--symbols', type=int, default=1000)
+    parser.add_argument('--bars', type=int, default=2520, help='bars per symbol (2520 = ~10 trading years)')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    legacy_rate, legacy_bytes = bench_legacy(min(args.symbols, 2000))
+    batch_rate, batch_bytes = bench_batch(args.symbols, args.bars, args.seed)
+
+    print(f"{'generator':<28}{'bars/sec':>16}{'bytes/bar':>12}")
+    print(f"{'generate_mock_ohlc_data':<28}{legacy_rate:>16,.0f}{legacy_bytes:>12.1f}")
+    print(f"{'generate_ohlc_batch':<28}{batch_rate:>16,.0f}{batch_bytes:>12.1f}")
+    print(f"speedup: {batch_rate / legacy_rate:.1f}x, memory: {legacy_bytes / batch_bytes:.1f}x smaller")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Request throughput with and without the per-snapshot response cache.
+
+Usage: python benchmarks/bench_response_cache.py [--seconds 2]
+
+Drives each route through the Flask test client for `--seconds` per mode:
+  uncached  - payload rebuilt and JSON-encoded on every request (previous behaviour)
+  cached    - encoded body reused until the next snapshot
+  gzip      - cached, client sends Accept-Encoding: gzip, br
+  304       - cached, client revalidates with If-None-Match
+
+Then checks that the cache stays within its byte budget, counting
+compressed variants, while distinct queries keep missing it; exits
+non-zero if not.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as dashboard  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+
+ROUTES = ['/api/prices', '/api/market-stats', '/api/news', '/api/historical/stocks/AAPL?interval=1h',
+          '/api/historical/batch?interval=1h&limit=24&symbols=forex/EUR/USD,crypto/BTC/USDT,stocks/AAPL']
+
+
+def drive(client, route, seconds, headers):
+    count = size = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        response = client.get(route, headers=headers)
+        size = len(response.data)
+        count += 1
+    return count / (time.perf_counter() - start), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=2)
+    args = parser.parse_args()
+
+    dashboard.refresh_snapshot()
+    client = dashboard.app.test_client()
+    cache = dashboard.response_cache
+
+    print(f"{'route':<48}{'mode':<10}{'req/s':>10}{'bytes':>9}{'speedup':>9}")
+    for route in ROUTES:
+        etag = client.get(route).headers['ETag']
+        modes = [('uncached', False, {}), ('cached', True, {}),
+                 ('gzip', True, {'Accept-Encoding': 'gzip, br'}), ('304', True, {'If-None-Match': etag})]
+        baseline = None
+        for mode, enabled, headers in modes:
+            cache.enabled = enabled
+            rate, size = drive(client, route, args.seconds, headers)
+            baseline = baseline or rate
+            print(f'{route[:47]:<48}{mode:<10}{rate:>10.0f}{size:>9}{rate / baseline:>8.1f}x')
+    cache.enabled = True
+
+    results = check_byte_budget() + check_app_budget(client)
+    for description, ok in results:
+        print(f"{'✅' if ok else '❌'} {description}")
+    return 0 if all(ok for _, ok in results) else 1
+
+
+def held_bytes(cache):
+    return sum(len(body) for entry in cache._entries.values() for body in entry.variants.values())
+
+
+def check_byte_budget():
+    """Many distinct ~40 KB bodies, half also fetched gzipped, through a 256 KB cache"""
+    cache = ResponseCache(max_bytes=256 << 10, max_entry_bytes=64 << 10)
+    cache.evict(1)
+    rng = np.random.default_rng(1)
+    hot_hits = 0
+    for i in range(200):
+        entry = cache.get(('body', i), 1, lambda: (rng.random(2000).round(6).tolist(), 200, None))
+        if i % 2:
+            entry.variant('gzip')
+        # One key stays in use throughout and must never be the one evicted
+        hot_hits += cache.get(('hot',), 1, lambda: ([0.5] * 2000, 200, None)) is not None
+    oversized = cache.get(('big',), 1, lambda: (rng.random(20000).tolist(), 200, None))
+    return [
+        ('cache stays within its byte budget', 0 < cache.bytes <= cache.max_bytes),
+        ('counted bytes match the bodies and variants held', cache.bytes == held_bytes(cache)),
+        ('least recently used responses are evicted first', ('hot',) in cache._entries and cache.evictions > 0),
+        ('bodies over the per-entry limit are served but not cached',
+         len(oversized.body) > cache.max_entry_bytes and ('big',) not in cache._entries),
+    ]
+
+
+def check_app_budget(client):
+    """Distinct from= queries on long histories, gzipped, against the app's cache shrunk to 1 MB"""
+    cache = dashboard.response_cache
+    cache.max_bytes = 1 << 20
+    for start in range(200):
+        client.get(f'/api/historical/crypto/BTC/USDT?interval=1m&from={1_700_000_000 + start}',
+                   headers={'Accept-Encoding': 'gzip'})
+    ok = 0 < cache.bytes <= cache.max_bytes and cache.bytes == held_bytes(cache) and cache.evictions > 0
+    return [('app cache stays within 1 MB under distinct long-history queries', ok)]
+
+
+if __name__ == '__main__':
+    sys.exit(main())
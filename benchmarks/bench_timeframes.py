@@ -0,0 +1,58 @@
+"""Latency of coarse-interval history queries: precomputed pyramid vs re-aggregating raw bars.
+
+Usage: python benchmarks/bench_timeframes.py [--days 180] [--symbols 6] [--repeat 50]
+
+Builds one market with `--days` of 1m history (all raw bars retained so the
+on-request rollup has something to scan) and times how long it takes to
+produce each interval's records for one symbol both ways.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aggregation import INTERVALS, rollup  # noqa: E402
+from market_engine import MarketEngine  # noqa: E402
+from ohlc import BarMatrix  # noqa: E402
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, default=180)
+    parser.add_argument('--symbols', type=int, default=6)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    symbols = [f'SYM{i}' for i in range(args.symbols)]
+    capacity = {name: args.days * 86400 // seconds + 2 for name, seconds in INTERVALS.items()}
+    engine = MarketEngine(symbols, [100.0] * len(symbols), (-0.03, 0.03),
+                          capacity=capacity, backfill_days=args.days, rng=1)
+    start = time.perf_counter()
+    view = engine.tick()
+    print(f'backfill: {args.days} days x {args.symbols} symbols of 1m bars in '
+          f'{time.perf_counter() - start:.2f}s')
+
+    # Raw 1m bars of the first symbol, as an on-request aggregator would scan them
+    bars = view.levels['1m'].bars
+    raw = BarMatrix(bars.symbols[:1], bars.dates, bars.open[:1], bars.high[:1], bars.low[:1],
+                    bars.close[:1], bars.volume[:1])
+    row = 0
+
+    print(f"{'interval':<10}{'bars':>8}{'pyramid ms':>14}{'rollup ms':>14}{'speedup':>10}")
+    for name, seconds in INTERVALS.items():
+        pyramid_ms, records = timed(lambda: view.series(symbols[row], name).to_records(), args.repeat)
+        rollup_ms, _ = timed(lambda: rollup(raw, seconds).series(row).to_records(), max(1, args.repeat // 10))
+        print(f'{name:<10}{len(records):>8}{pyramid_ms:>14.3f}{rollup_ms:>14.3f}{rollup_ms / pyramid_ms:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Restart an engine from its bar log across bucket boundaries and check no open bucket is lost.
+
+Usage: python benchmarks/check_bar_log.py
+
+Each case ticks a random-walk engine minute by minute up to a shutdown
+time, flushes its log, restores a second engine from it at a later time and
+ticks once. Every level's bucket that was open at the last logged bar must
+come back: closed with the same OHLCV as rolling up the 1m bars that were
+logged for it (where the 1m log still covers it), or still live with the
+same open if the restart is inside it, with no bucket closed twice.
+Exits non-zero if any check fails.
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aggregation import bucket_start, rollup  # noqa: E402
+from bar_log import BarLog  # noqa: E402
+from market_engine import DEFAULT_CAPACITY, MarketEngine  # noqa: E402
+
+SYMBOLS = [f'SYM{i}' for i in range(8)]
+COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+# (description, first tick, shutdown tick, restart)
+CASES = [
+    ('restart across a day boundary', '2024-03-06T23:00', '2024-03-06T23:49', '2024-03-07T00:10'),
+    ('restart across an hour boundary', '2024-03-06T10:00', '2024-03-06T10:37', '2024-03-06T11:05'),
+    ('restart inside the same hour', '2024-03-06T10:00', '2024-03-06T10:37', '2024-03-06T10:52'),
+    ('restart right after an hour closed', '2024-03-06T11:30', '2024-03-06T12:00', '2024-03-06T12:03'),
+]
+
+
+def engine(root):
+    log = BarLog(root, 'check', SYMBOLS, DEFAULT_CAPACITY, fsync=False)
+    return MarketEngine(SYMBOLS, [100.0] * len(SYMBOLS), (-0.03, 0.03), backfill_days=3, rng=1, bar_log=log)
+
+
+def run_case(first, shutdown, restart):
+    """Problems found when restoring at `restart` from a log written up to `shutdown`"""
+    root = tempfile.mkdtemp(prefix='bar_log_check_')
+    try:
+        before = engine(root)
+        for moment in np.arange(np.datetime64(first, 's'), np.datetime64(shutdown, 's') + 1, 60):
+            before.tick(moment)
+        before.bar_log.flush()
+        logged = before.levels['1m'].buffer.view()
+        last_logged = logged.dates[-1]
+
+        after = engine(root)
+        restart = np.datetime64(restart, 's')
+        view = after.tick(restart)
+    finally:
+        shutil.rmtree(root)
+
+    problems = []
+    for name, level in after.levels.items():
+        if name == '1m':
+            continue
+        bucket = bucket_start(last_logged, level.interval)
+        expected = rollup(logged.slice(int(np.searchsorted(logged.dates, bucket.astype(logged.dates.dtype)))),
+                          level.interval)
+        closed = level.buffer.view()
+        if not (np.diff(closed.dates.astype(np.int64)) > 0).all():
+            problems.append(f'{name}: a bucket was closed twice')
+        if bucket_start(restart, level.interval) > bucket:
+            at = np.flatnonzero(closed.dates == bucket)
+            if not len(at):
+                problems.append(f'{name}: bar {bucket} missing')
+            elif expected.dates[0] == bucket and not all(
+                    np.allclose(getattr(closed, column)[:, at[0]], getattr(expected, column)[:, 0])
+                    for column in COLUMNS):
+                problems.append(f'{name}: bar {bucket} differs from the logged 1m bars')
+        elif level.live['date'] != bucket or not np.allclose(level.live['open'], before.levels[name].live['open']):
+            problems.append(f'{name}: live bar {bucket} not continued')
+
+    # The daily change must be measured against the day that was open at shutdown
+    day = bucket_start(last_logged, after.levels['1d'].interval)
+    if bucket_start(restart, after.levels['1d'].interval) > day:
+        closes = logged.close[:, logged.dates < (day + np.timedelta64(1, 'D')).astype(logged.dates.dtype)]
+        if not np.allclose(view.previous_close, closes[:, -1]):
+            problems.append('previous close is not the last logged close of the open day')
+    return problems
+
+
+def main():
+    failures = 0
+    for description, first, shutdown, restart in CASES:
+        problems = run_case(first, shutdown, restart)
+        failures += bool(problems)
+        print(f"{'❌' if problems else '✅'} {description} ({shutdown} -> {restart})")
+        for problem in problems:
+            print(f'    {problem}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""Exercise the HTTP market data provider against a local stub upstream.
+
+Usage: python benchmarks/check_providers.py
+
+Starts a threaded stub quote server on a free localhost port and checks
+single-flight coalescing, concurrent fetching, the quote cache, rate
+limiting, retry/backoff on server errors and a full app refresh through
+the provider. Exits non-zero if any check fails.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import unquote
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import providers  # noqa: E402
+from providers import HttpProvider  # noqa: E402
+
+
+class Upstream:
+    """State shared with the stub handler: call counts, latency and forced failures"""
+    calls = Counter()
+    delay = 0.0
+    failing = set()
+    lock = threading.Lock()
+
+
+def stub_price(symbol):
+    return 100.0 + sum(map(ord, symbol)) % 50
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        _, _, market, symbol = self.path.split('/', 3)
+        symbol = unquote(symbol)
+        with Upstream.lock:
+            Upstream.calls[(unquote(market), symbol)] += 1
+        time.sleep(Upstream.delay)
+        if symbol in Upstream.failing:
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = f'{{"price": {stub_price(symbol)}, "volume": 1000}}'.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    # The default backlog of 5 makes bursts of connections wait for SYN retries
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def reset(delay=0.0, failing=()):
+    Upstream.calls.clear()
+    Upstream.delay = delay
+    Upstream.failing = set(failing)
+
+
+def engines(markets, per_market):
+    return {market: SimpleNamespace(symbols=[f'{market.upper()}{i}' for i in range(per_market)],
+                                    last_close=np.full(per_market, 1.0))
+            for market in markets}
+
+
+def check_single_flight(url, results):
+    reset(delay=0.2)
+    provider = HttpProvider(url)
+    callers = 50
+    barrier = threading.Barrier(callers)
+    answers = []
+
+    def call():
+        barrier.wait()
+        answers.append(provider.quote('stocks', 'AAPL'))
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    upstream = Upstream.calls[('stocks', 'AAPL')]
+    results.append((f'{callers} concurrent misses for one symbol -> {upstream} upstream call(s)',
+                    upstream == 1 and len(set(answers)) == 1 and answers[0] is not None))
+    provider.close()
+
+
+def check_concurrency_and_cache(url, results):
+    reset(delay=0.1)
+    provider = HttpProvider(url, workers=32, cache_ttl=30)
+    markets = engines(['forex', 'crypto', 'stocks', 'commodities'], 6)
+    start = time.perf_counter()
+    quotes = provider.quotes(markets, time.time())
+    elapsed = time.perf_counter() - start
+    prices_ok = all(np.allclose(quotes[m][0], [stub_price(s) for s in e.symbols]) for m, e in markets.items())
+    # Serially this would take 2.4 s
+    results.append((f'24 symbols at 100 ms each fetched in {elapsed * 1000:.0f} ms',
+                    prices_ok and elapsed < 0.6 and sum(Upstream.calls.values()) == 24))
+
+    before = sum(Upstream.calls.values())
+    provider.quotes(markets, time.time())
+    results.append(('repeat within cache TTL makes no upstream calls', sum(Upstream.calls.values()) == before))
+    provider.close()
+
+
+def check_rate_limit(url, results):
+    reset()
+    provider = HttpProvider(url, workers=16, rate=20, burst=1, cache_ttl=0)
+    markets = engines(['stocks'], 40)
+    start = time.perf_counter()
+    provider.quotes(markets, time.time())
+    elapsed = time.perf_counter() - start
+    results.append((f'40 calls at 20 req/s took {elapsed:.2f} s', 1.8 < elapsed < 3.0))
+    provider.close()
+
+
+def check_backoff(url, results):
+    reset(failing={'BAD'})
+    providers.BACKOFF_BASE, base = 0.01, providers.BACKOFF_BASE
+    provider = HttpProvider(url, cache_ttl=0)
+    markets = {'stocks': SimpleNamespace(symbols=['BAD', 'GOOD'], last_close=np.array([42.0, 1.0]))}
+    close, volume = provider.quotes(markets, time.time())['stocks']
+    attempts = Upstream.calls[('stocks', 'BAD')]
+    results.append((f'failing symbol retried {attempts} times and keeps its previous price',
+                    attempts == providers.RETRIES + 1 and close[0] == 42.0 and close[1] == stub_price('GOOD')))
+    provider.quotes(markets, time.time())
+    results.append(('failing symbol is skipped during its cooldown', Upstream.calls[('stocks', 'BAD')] == attempts))
+    providers.BACKOFF_BASE = base
+    provider.close()
+
+
+def check_app_refresh(url, results):
+    reset()
+    import app as dashboard
+    dashboard.refresh_snapshot()
+    dashboard.market_provider = HttpProvider(url)
+    snapshot = dashboard.refresh_snapshot()
+    current = {symbol: item['current'] for market in snapshot.prices.values() for symbol, item in market.items()}
+    expected = {symbol: stub_price(symbol) for symbols in dashboard.SYMBOLS.values() for symbol in symbols}
+    results.append(('app refresh takes its prices from the provider', current == expected))
+    dashboard.market_provider.close()
+
+
+def main():
+    server = StubServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}'
+
+    results = []
+    for check in (check_single_flight, check_concurrency_and_cache, check_rate_limit, check_backoff,
+                  check_app_refresh):
+        check(url, results)
+    server.shutdown()
+
+    for description, ok in results:
+        print(f"{'✅' if ok else '❌'} {description}")
+    return 0 if all(ok for _, ok in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
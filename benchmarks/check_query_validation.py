@@ -0,0 +1,76 @@
+"""Send malformed query parameters and batch entries to the API and check each is rejected cleanly.
+
+Usage: python benchmarks/check_query_validation.py
+
+Every malformed request must get a 400 (or, inside a batch, a per-entry
+error next to the valid entries' bars), never a 500 or a silently
+ignored parameter. Runs in seeded mode, where a batch reaching far back
+must be refused before it generates more than SEEDED_MAX_MINUTES of
+history. Exits non-zero if any check fails.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.update(MARKET_DATA_MODE='seeded', MARKET_DATA_SEED='42')
+
+import app as dashboard  # noqa: E402
+
+# (route, expected status)
+QUERIES = [
+    ('/api/historical/stocks/AAPL?from=99999999999999999999', 400),
+    ('/api/historical/stocks/AAPL?since=-5', 400),
+    ('/api/historical/stocks/AAPL?to=%2B5', 400),
+    ('/api/historical/stocks/AAPL?limit=-5', 400),
+    ('/api/historical/stocks/AAPL?limit=abc', 400),
+    ('/api/indicators/stocks/AAPL?limit=abc', 400),
+    ('/api/indicators/stocks/AAPL?from=-5', 400),
+    ('/api/news?since=-5', 400),
+    ('/api/historical/stocks/AAPL?from=1700000000&limit=5', 200),
+]
+
+VALID = {'market': 'stocks', 'symbol': 'AAPL', 'limit': 2}
+
+# Malformed entries of a POST batch, each sent alongside VALID
+ENTRIES = [
+    {'market': ['stocks'], 'symbol': 'AAPL'},
+    {'market': 'stocks', 'symbol': {'x': 1}},
+    {'market': 'stocks', 'symbol': None},
+    {'market': 'stocks', 'symbol': 'AAPL', 'from': -5},
+    {'market': 'stocks', 'symbol': 'AAPL', 'from': 1e30},
+    {'market': 'stocks', 'symbol': 'AAPL', 'interval': ['1d']},
+    {'market': 'stocks', 'symbol': 'AAPL', 'limit': 'abc'},
+]
+
+
+def main():
+    dashboard.refresh_snapshot()
+    client = dashboard.app.test_client()
+    results = []
+    for route, status in QUERIES:
+        response = client.get(route)
+        results.append((f'GET {route} -> {status}', response.status_code == status))
+
+    for entry in ENTRIES:
+        response = client.post('/api/historical/batch', json={'symbols': [entry, VALID]})
+        body = response.get_json() if response.status_code == 200 else {}
+        bad, good = body.get('results', [{}, {}])
+        ok = 'error' in bad and 'bars' not in bad and len(good.get('bars', [])) == VALID['limit']
+        results.append((f'batch entry {entry!r} -> per-entry error, other entries served', ok))
+
+    pairs = [f'{market}/{symbol}' for market, symbols in dashboard.SYMBOLS.items() for symbol in symbols]
+    for count, status in ((1, 200), (len(pairs), 400)):
+        started = time.process_time()
+        response = client.get(f"/api/historical/batch?interval=1w&from=0&symbols={','.join(pairs[:count])}")
+        seconds = time.process_time() - started
+        results.append((f'seeded batch of {count} from=0 -> {status} in {seconds:.2f}s CPU',
+                        response.status_code == status and seconds < 2))
+
+    for description, ok in results:
+        print(f"{'✅' if ok else '❌'} {description}")
+    return 0 if all(ok for _, ok in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""Run the production server with several workers and check they share one updater's snapshots.
+
+Usage: python benchmarks/check_shared_snapshot.py [--workers 3] [--requests 300]
+
+Starts gunicorn with gunicorn.conf.py on a free localhost port, a 1 s refresh
+interval and a private SHARED_SNAPSHOT_DIR holding a stale snapshot pointer
+and metrics left by a previous run, then checks that neither is picked up,
+that exactly one worker is elected updater, that generation work does not grow with the
+number of workers, that every response for a given snapshot version is
+byte-identical (with the same ETag and news cursors) whichever worker served it, that /metrics totals cover
+every worker and never go backwards, and that another worker takes over
+(with versions still increasing and the same history) when the updater is
+killed, whose metrics file is folded into the retired totals. Exits
+non-zero if any check fails.
+"""
+import argparse
+import os
+import re
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import metrics  # noqa: E402
+from shared_snapshot import CONTROL_FILE  # noqa: E402
+
+# Server refresh interval in seconds; consistency runs last at least two of them
+REFRESH_SECONDS = 1
+
+# Closed bars served before a failover must be served unchanged after it
+HISTORY_ROUTE = '/api/historical/crypto/BTC/USDT?interval=1h'
+
+# Left in the directory as if by a previous run; a new server must not start from them
+STALE_VERSION = 10 ** 6
+STALE_REQUESTS = 10 ** 9
+
+# Series that must only grow, whichever worker answers the scrape
+COUNTERS = ('http_requests_total', 'response_cache_hits_total', 'response_cache_misses_total',
+            'market_refresh_duration_seconds_count')
+
+ROUTES = ['/api/prices', '/api/market-stats', '/api/movers?limit=5', '/api/historical/stocks/AAPL?interval=1m&limit=5',
+          '/api/indicators/crypto/BTC/USDT?interval=5m&limit=3', '/api/analytics?interval=1h', '/api/news?limit=5']
+
+# Headers that must match whichever worker served a version, besides the body
+SHARED_HEADERS = ('ETag', 'X-Latest-Cursor', 'X-Next-Cursor')
+
+
+class ServerLog:
+    """Collects the server's output lines from a background thread"""
+
+    def __init__(self, stream):
+        self.lines = []
+        threading.Thread(target=self._read, args=(stream,), daemon=True).start()
+
+    def _read(self, stream):
+        for line in stream:
+            self.lines.append(line.rstrip('\n'))
+
+    def elected(self):
+        return [int(m.group(1)) for line in list(self.lines) for m in [re.search(r'Worker (\d+) elected', line)] if m]
+
+    def count(self, text):
+        return sum(text in line for line in list(self.lines))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for(predicate, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def latest_version(url):
+    try:
+        return int(requests.get(url + '/api/prices', timeout=2).headers.get('X-Snapshot-Version', 0))
+    except requests.RequestException:
+        return 0
+
+
+def check_consistency(url, count, results, min_versions=1, seconds=0):
+    """Fresh connections spread requests over the workers; one version must mean one body.
+
+    Sends at least `count` requests and keeps going for at least `seconds`,
+    so a fast machine still spans several refreshes.
+    """
+    bodies = defaultdict(set)
+    failures = 0
+    deadline = time.monotonic() + seconds
+    i = 0
+    while i < count or time.monotonic() < deadline:
+        route = ROUTES[i % len(ROUTES)]
+        i += 1
+        try:
+            response = requests.get(url + route, timeout=5)
+        except requests.RequestException:
+            failures += 1
+            continue
+        if response.status_code != 200:
+            failures += 1
+            continue
+        # News is not tied to a snapshot: it must be the same on every worker at any version
+        version = response.headers.get('X-Snapshot-Version', 'any')
+        bodies[(route, version)].add((response.content,) + tuple(map(response.headers.get, SHARED_HEADERS)))
+    mismatched = [key for key, variants in bodies.items() if len(variants) > 1]
+    versions = {version for _, version in bodies if version != 'any'}
+    results.append((f'{i} requests over {len(versions)} versions: {len(mismatched)} inconsistent, '
+                    f'{failures} failed', not mismatched and not failures and len(versions) >= min_versions))
+
+
+def scrape(url):
+    """{series name: value summed over its label sets} from one /metrics response, or None"""
+    try:
+        response = requests.get(url + '/metrics', timeout=5)
+    except requests.RequestException:
+        return None
+    totals = defaultdict(float)
+    for line in response.text.splitlines():
+        if line and not line.startswith('#'):
+            series, _, value = line.rpartition(' ')
+            totals[series.partition('{')[0]] += float(value)
+    return totals
+
+
+def check_metrics(url, count, results, floor=None):
+    """Scrapes land on any worker: totals must cover every worker and never go backwards"""
+    previous = floor or {}
+    backwards = failed = 0
+    updaters = set()
+    for _ in range(count):
+        totals = scrape(url)
+        if totals is None:
+            failed += 1
+            continue
+        backwards += any(totals[name] < previous.get(name, 0) for name in COUNTERS)
+        updaters.add(totals['market_updater'])
+        previous = {name: totals[name] for name in COUNTERS}
+    refreshes = previous.get('market_refresh_duration_seconds_count', 0)
+    results.append((f'{count} scrapes: {backwards} went backwards, {failed} failed, '
+                    f'updaters reported {sorted(updaters)}, {refreshes:.0f} refreshes counted',
+                    not backwards and not failed and updaters == {1.0} and refreshes > 0))
+    return previous
+
+
+def leave_stale_files(directory):
+    """A control file pointing at a version that is gone and an exited worker's request count"""
+    with open(os.path.join(directory, CONTROL_FILE), 'wb') as f:
+        f.write(STALE_VERSION.to_bytes(8, 'little'))
+    os.makedirs(os.path.join(directory, 'metrics'))
+    metrics._write_values(os.path.join(directory, 'metrics', '1-1.metrics'),
+                          [('http_requests_total', ('/api/prices', 'GET', '200'), '', STALE_REQUESTS)])
+
+
+def worker_files(directory, pid):
+    return [entry for entry in os.listdir(os.path.join(directory, 'metrics')) if entry.startswith(f'{pid}-')]
+
+
+def closed_bars(url, route):
+    """{date: bar} of the closed bars one history route serves (the live bar is left out)"""
+    return {bar['date']: bar for bar in requests.get(url + route, timeout=5).json()[:-1]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--requests', type=int, default=300)
+    args = parser.parse_args()
+
+    port = free_port()
+    url = f'http://127.0.0.1:{port}'
+    directory = tempfile.mkdtemp(prefix='shared-snapshot-', dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+    env = dict(os.environ, SHARED_SNAPSHOT_DIR=directory, REFRESH_INTERVAL=str(REFRESH_SECONDS), APP_HOST='127.0.0.1',
+               APP_PORT=str(port), WEB_CONCURRENCY=str(args.workers), BACKFILL_WORKERS='1', PYTHONUNBUFFERED='1')
+    env.pop('BAR_LOG_DIR', None)
+    leave_stale_files(directory)
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', 'app:app'],
+                              cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    log = ServerLog(server.stdout)
+    results = []
+    try:
+        if not wait_for(lambda: latest_version(url) >= 2, 60):
+            print('\n'.join(log.lines[-20:]))
+            raise RuntimeError('server did not start publishing snapshots')
+
+        totals = scrape(url) or {}
+        results.append((f"previous run's files cleared: version {latest_version(url)}, "
+                        f"{totals.get('http_requests_total', 0):.0f} requests counted",
+                        latest_version(url) < STALE_VERSION and totals.get('http_requests_total', 0) < STALE_REQUESTS))
+
+        time.sleep(3)
+        elected = log.elected()
+        results.append((f'{args.workers} workers, {len(elected)} elected updater', len(elected) == 1))
+        version = latest_version(url)
+        fetches = log.count('Fetching fresh market data')
+        results.append((f'{fetches} generations for {version} versions', fetches <= version + 1))
+
+        check_consistency(url, args.requests, results, min_versions=2, seconds=3 * REFRESH_SECONDS)
+        counted = check_metrics(url, 30, results)
+
+        before = latest_version(url)
+        history = closed_bars(url, HISTORY_ROUTE)
+        os.kill(elected[0], signal.SIGKILL)
+        took_over = wait_for(lambda: len(log.elected()) > 1, 30)
+        resumed = wait_for(lambda: latest_version(url) > before + 2, 60)
+        results.append((f'updater {elected[0]} killed: taken over by {log.elected()[1:]}, '
+                        f'versions {before} -> {latest_version(url)}', took_over and resumed))
+        # The new updater carries on the same random walk instead of regenerating history
+        after = closed_bars(url, HISTORY_ROUTE)
+        changed = sum(after.get(date) != bar for date, bar in history.items())
+        results.append((f'{len(history)} closed bars of {HISTORY_ROUTE} before failover, {changed} changed after',
+                        bool(history) and not changed))
+        check_consistency(url, args.requests // 3, results)
+        # The killed worker's counts stay in the totals, but its file goes
+        retired = wait_for(lambda: not worker_files(directory, elected[0]), 10)
+        results.append((f'metrics file of killed worker {elected[0]} folded into the retired totals', retired))
+        check_metrics(url, 30, results, floor=counted)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        shutil.rmtree(directory, ignore_errors=True)
+
+    for description, ok in results:
+        print(f"{'✅' if ok else '❌'} {description}")
+    return 0 if all(ok for _, ok in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Compare two run_suite.py result files and fail on regressions.
+
+Usage: python benchmarks/compare_results.py BASELINE CURRENT [--tolerance 0.25]
+                                            [--metric p95_ms=0.5 ...]
+
+A metric regresses when it is worse than the baseline by more than its
+tolerance (a fraction: 0.25 allows 25%). Times and latencies must not grow,
+req/s must not drop, and a route that had no errors must stay error free.
+Metrics present in only one file are listed but never fail the check.
+Exits 1 if anything regressed.
+"""
+import argparse
+import json
+import sys
+
+# Per-call / per-request numbers compared; everything else in the files is informational
+LOWER_IS_BETTER = ('median_us', 'p50_ms', 'p95_ms', 'p99_ms')
+HIGHER_IS_BETTER = ('rps',)
+
+
+def flatten(results):
+    """{(section, name, metric): value} for every compared metric"""
+    metrics = {}
+    for section, entries in results.items():
+        if section == 'meta':
+            continue
+        for name, values in entries.items():
+            for metric, value in values.items():
+                if metric in LOWER_IS_BETTER + HIGHER_IS_BETTER + ('errors',):
+                    metrics[(section, name, metric)] = value
+    return metrics
+
+
+def regressed(metric, baseline, current, tolerance):
+    if metric == 'errors':
+        return baseline == 0 and current > 0
+    if metric in HIGHER_IS_BETTER:
+        return current < baseline * (1 - tolerance)
+    return current > baseline * (1 + tolerance)
+
+
+def parse_tolerances(values):
+    tolerances = {}
+    for value in values:
+        metric, _, fraction = value.partition('=')
+        tolerances[metric] = float(fraction)
+    return tolerances
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed fractional regression')
+    parser.add_argument('--metric', action='append', default=[], metavar='NAME=FRACTION',
+                        help='tolerance override for one metric, e.g. p99_ms=0.5')
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = flatten(json.load(f))
+    with open(args.current) as f:
+        current = flatten(json.load(f))
+    tolerances = parse_tolerances(args.metric)
+
+    failures = 0
+    for key in sorted(baseline.keys() | current.keys()):
+        section, name, metric = key
+        label = f'{section} {name[:56]} {metric}'
+        if key not in baseline or key not in current:
+            print(f"➖ {label:<84} only in {'current' if key in current else 'baseline'}")
+            continue
+        before, after = baseline[key], current[key]
+        change = (after - before) / before * 100 if before else 0.0
+        bad = regressed(metric, before, after, tolerances.get(metric, args.tolerance))
+        failures += bad
+        print(f"{'❌' if bad else '✅'} {label:<84}{before:>12.2f} -> {after:>12.2f} ({change:+.1f}%)")
+
+    print(f'{failures} regression(s)')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""Reproducible benchmark and load suite; writes one JSON file per run.
+
+Usage: python benchmarks/run_suite.py [--output results.json] [--seconds 3] [--threads 8]
+                                      [--skip-micro] [--skip-client] [--skip-server]
+
+Three parts, each optional:
+  micro   - per-call time of generate_mock_ohlc_data, fetch_real_data,
+            MarketBreadth and JSON encoding of the main payloads
+  client  - concurrent load through the Flask test client (app cost only)
+  server  - concurrent load over HTTP against the app launched in a
+            separate process on a free localhost port
+
+Load results give requests, errors, req/s and p50/p95/p99 latency per route.
+Generation is seeded and the bar log is disabled so runs are comparable;
+compare two result files with benchmarks/compare_results.py.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Fixed seed and no durable log, here and in the launched server
+os.environ['MARKET_DATA_SEED'] = os.getenv('MARKET_DATA_SEED', '42')
+os.environ.pop('BAR_LOG_DIR', None)
+
+import app as dashboard  # noqa: E402
+
+ROUTES = [
+    '/api/prices',
+    '/api/historical/stocks/AAPL',
+    '/api/historical/crypto/BTC/USDT?interval=1m&limit=500',
+    '/api/historical/batch?interval=1h&limit=24&symbols=forex/EUR/USD,crypto/BTC/USDT,stocks/AAPL,commodities/XAUUSD',
+    '/api/news',
+    '/api/market-stats',
+    '/api/movers',
+    '/api/analytics?lookback=90',
+    '/api/watchlist',
+]
+
+SERVER = '''
+import sys
+sys.path.insert(0, sys.argv[2])
+import app
+from werkzeug.serving import make_server
+app.start_background_updater()
+make_server('127.0.0.1', int(sys.argv[1]), app.app, threaded=True).serve_forever()
+'''
+
+
+def measure(fn, rounds=7, min_round=0.05):
+    """Median and best per-call time in microseconds over `rounds` timed loops"""
+    fn()
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        if time.perf_counter() - start >= min_round:
+            break
+        loops *= 2
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - start) / loops * 1e6)
+    return {'median_us': round(float(np.median(samples)), 3), 'min_us': round(min(samples), 3), 'loops': loops}
+
+
+def micro_benchmarks():
+    snapshot = dashboard.get_snapshot()
+    query = dashboard.parse_history_query({'interval': '1h'})
+    history, _ = dashboard.history_records(snapshot, 'stocks', 'AAPL', query, [dashboard.SEEDED_MAX_MINUTES])
+    versions = iter(range(snapshot.version + 1, dashboard.MAX_SNAPSHOT_VERSION))
+    breadth = snapshot.breadth
+    breadth_columns = {market_type: (view.symbols, *(column[breadth.market == i]
+                                                     for column in (breadth.price, breadth.change, breadth.volume)))
+                       for i, (market_type, view) in enumerate(snapshot.historical.items())}
+    cases = {
+        'generate_mock_ohlc_data': lambda: dashboard.generate_mock_ohlc_data('AAPL', 'stocks'),
+        'fetch_real_data': lambda: dashboard.fetch_real_data(next(versions)),
+        'market_breadth': lambda: dashboard.MarketBreadth(breadth_columns),
+        'json_prices': lambda: json.dumps(dict(snapshot.prices, market_stats=snapshot.market_stats)),
+        'json_historical_1h': lambda: json.dumps(history),
+        'json_news': lambda: dashboard.NewsStore.encode(dashboard.news_feed.query()[0], time.time()),
+    }
+    results = {}
+    for name, fn in cases.items():
+        # fetch_real_data logs every call; keep the output but not the terminal
+        with open(os.devnull, 'w') as sink, contextlib.redirect_stdout(sink):
+            results[name] = measure(fn)
+        print(f"  {name:<28}{results[name]['median_us']:>12.1f} us")
+    return results
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0.0, 0.0, 0.0)
+    return {'requests': len(latencies), 'errors': errors, 'rps': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(float(p50), 3), 'p95_ms': round(float(p95), 3), 'p99_ms': round(float(p99), 3)}
+
+
+def drive(make_get, route, seconds, threads):
+    """Hit one route from `threads` threads for `seconds`; make_get() gives each thread its own client"""
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads + 1)
+    deadline = [0.0]
+
+    def worker():
+        get = make_get()
+        mine, failed = [], 0
+        barrier.wait()
+        while time.perf_counter() < deadline[0]:
+            start = time.perf_counter()
+            status = get(route)
+            mine.append(time.perf_counter() - start)
+            failed += status != 200
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    deadline[0] = time.perf_counter() + seconds
+    start = time.perf_counter()
+    barrier.wait()
+    for t in workers:
+        t.join()
+    return summarize(latencies, errors[0], time.perf_counter() - start)
+
+
+def load(make_get, seconds, threads):
+    results = {}
+    for route in ROUTES:
+        results[route] = result = drive(make_get, route, seconds, threads)
+        print(f"  {route[:60]:<62}{result['rps']:>9.0f} req/s  p50 {result['p50_ms']:7.2f}  "
+              f"p95 {result['p95_ms']:7.2f}  p99 {result['p99_ms']:7.2f} ms  errors {result['errors']}")
+    return results
+
+
+def client_get():
+    client = dashboard.app.test_client()
+    return lambda route: client.get(route).status_code
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def launch_server(timeout=30):
+    """Start the app in a child process and wait until it answers /api/prices"""
+    port = free_port()
+    process = subprocess.Popen([sys.executable, '-c', SERVER, str(port), ROOT],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited with status {process.returncode}')
+        try:
+            if requests.get(url + '/api/prices', timeout=1).status_code == 200:
+                return process, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f'server did not start within {timeout} s')
+
+
+def server_get(url):
+    def make_get():
+        session = requests.Session()
+
+        def get(route):
+            try:
+                return session.get(url + route, timeout=10).status_code
+            except requests.RequestException:
+                return 0
+        return get
+    return make_get
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--seconds', type=float, default=3, help='load duration per route')
+    parser.add_argument('--threads', type=int, default=8, help='concurrent clients per route')
+    parser.add_argument('--skip-micro', action='store_true')
+    parser.add_argument('--skip-client', action='store_true')
+    parser.add_argument('--skip-server', action='store_true')
+    args = parser.parse_args()
+
+    results = {'meta': {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'seconds': args.seconds,
+        'threads': args.threads,
+    }}
+
+    dashboard.refresh_snapshot()
+    if not args.skip_micro:
+        print('micro-benchmarks')
+        results['micro'] = micro_benchmarks()
+        dashboard.refresh_snapshot()
+    if not args.skip_client:
+        print('load: Flask test client')
+        results['client'] = load(client_get, args.seconds, args.threads)
+    if not args.skip_server:
+        process, url = launch_server()
+        try:
+            print(f'load: HTTP server at {url}')
+            results['server'] = load(server_get(url), args.seconds, args.threads)
+        finally:
+            process.terminate()
+            process.wait()
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
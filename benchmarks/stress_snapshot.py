@@ -0,0 +1,150 @@
+"""Hammer every /api/* route while snapshots are being refreshed and check for torn reads.
+
+Usage: python benchmarks/stress_snapshot.py [--seconds 10] [--threads 16]
+
+Every response is tagged with the snapshot version that served it. A read is
+torn if the data returned under one version disagrees with itself (a price that
+does not match its own latest bar, stats that do not match the prices) or with
+another route served from the same version, or if one route returns two
+different bodies under the same version.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as dashboard  # noqa: E402
+
+ROUTES = ['/api/prices', '/api/market-stats', '/api/news', '/api/watchlist', '/api/movers?limit=50',
+          '/api/analytics?lookback=5']
+
+
+def historical_routes():
+    pairs = [f'{market}/{symbol}' for market, symbols in dashboard.SYMBOLS.items() for symbol in symbols]
+    return [f'/api/historical/{pair}' for pair in pairs] + [f'/api/indicators/{pair}?limit=1' for pair in pairs] + [
+        f"/api/historical/batch?limit=1&symbols={','.join(pairs)}"]
+
+
+def refresher(stop, counter):
+    while not stop.is_set():
+        dashboard.refresh_snapshot()
+        counter[0] += 1
+
+
+def worker(stop, routes, results, errors):
+    client = dashboard.app.test_client()
+    i = 0
+    while not stop.is_set():
+        route = routes[i % len(routes)]
+        i += 1
+        response = client.get(route)
+        if response.status_code != 200:
+            errors.append(f'{route}: HTTP {response.status_code}')
+            continue
+        results.append((route, response.headers.get('X-Snapshot-Version'), response.get_json()))
+
+
+def check(results):
+    problems = []
+    closes = defaultdict(dict)   # version -> symbol -> current price
+    changes = defaultdict(dict)  # version -> symbol -> daily change (%)
+    stats = {}                   # version -> (gainers, losers)
+    bodies = {}                  # (route, version) -> first body served
+    histories = defaultdict(dict)  # version -> symbol -> daily bars
+
+    for route, version, body in results:
+        if route == '/api/prices':
+            gainers = losers = 0
+            for market in dashboard.SYMBOLS:
+                for symbol, item in body[market].items():
+                    if item['current'] != item['ohlc']['close']:
+                        problems.append(f'v{version} {symbol}: current does not match latest bar')
+                    gainers += item['change'] > 0
+                    losers += item['change'] < 0
+                    closes[version][symbol] = item['current']
+                    changes[version][symbol] = item['change']
+            if (gainers, losers) != (body['market_stats']['gainers'], body['market_stats']['losers']):
+                problems.append(f'v{version}: market_stats do not match prices')
+            stats[version] = (gainers, losers)
+
+    for route, version, body in results:
+        if bodies.setdefault((route, version), body) != body:
+            problems.append(f'v{version} {route}: two different bodies under one version')
+        if route.startswith('/api/historical/batch'):
+            for result in body['results']:
+                expected = closes.get(version, {}).get(result['symbol'])
+                if expected is not None and result['bars'][-1]['close'] != expected:
+                    problems.append(f"v{version} {result['symbol']}: batch history does not match prices")
+        elif route.startswith('/api/historical/'):
+            symbol = route.split('/', 4)[4]
+            expected = closes.get(version, {}).get(symbol)
+            if expected is not None and body and body[-1]['close'] != expected:
+                problems.append(f'v{version} {symbol}: history does not match prices')
+            histories[version][symbol] = body
+        elif route == '/api/market-stats':
+            expected = stats.get(version)
+            if expected is not None and expected != (body['gainers'], body['losers']):
+                problems.append(f'v{version}: /api/market-stats does not match prices')
+        elif route.startswith('/api/movers'):
+            for ranking, entries in body.items():
+                for entry in entries:
+                    expected = closes.get(version, {}).get(entry['symbol'])
+                    if expected is not None and entry['price'] != expected:
+                        problems.append(f"v{version} {entry['symbol']}: {ranking} price does not match prices")
+        elif route.startswith('/api/analytics'):
+            # The 1d return over one bar is the daily change /api/prices reports from prices rounded to 4 decimals
+            for pair, change in zip(body['symbols'], body['returns']['1']):
+                symbol = pair.split('/', 1)[1]
+                expected = changes.get(version, {}).get(symbol)
+                if expected is not None and abs(change - expected) > 0.005 + 0.01 / closes[version][symbol] + 1e-6:
+                    problems.append(f'v{version} {pair}: analytics return does not match prices')
+
+    for route, version, body in results:
+        if route.startswith('/api/indicators/'):
+            # The live moving average is the mean of the last `window` daily closes
+            symbol = route.split('?')[0].split('/', 4)[4]
+            bars = histories.get(version, {}).get(symbol)
+            window = body['params']['window']
+            if bars and len(bars) >= window and abs(
+                    sum(bar['close'] for bar in bars[-window:]) / window - body['latest']['sma']) > 1e-3:
+                problems.append(f'v{version} {symbol}: indicators do not match history')
+
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--threads', type=int, default=16)
+    args = parser.parse_args()
+
+    dashboard.refresh_snapshot()
+    routes = ROUTES + historical_routes()
+    stop = threading.Event()
+    refreshes = [0]
+    results, errors = [], []
+
+    threads = [threading.Thread(target=refresher, args=(stop, refreshes))]
+    threads += [threading.Thread(target=worker, args=(stop, routes, results, errors))
+                for _ in range(args.threads)]
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    problems = check(results)
+    print(f'{len(results)} responses across {refreshes[0]} refreshes, '
+          f'{len(errors)} errors, {len(problems)} torn reads')
+    for line in (errors + problems)[:20]:
+        print(f'  {line}')
+    return 1 if errors or problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
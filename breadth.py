@@ -0,0 +1,86 @@
+"""Market breadth and top movers, computed once per tick from each market's arrays"""
+import numpy as np
+
+DEFAULT_TOP = 10
+MAX_TOP = 100
+
+# Ranking -> (column, descending); gainers and losers only list symbols that moved that way
+RANKINGS = {
+    'gainers': ('change', True),
+    'losers': ('change', False),
+    'most_active': ('volume', True)
+}
+
+
+class MarketBreadth:
+    """Price, change and volume of every symbol, with breadth counts and top-N rankings.
+
+    Built from the arrays a refresh already holds, so requests never rescan
+    the prices mapping. Every tick moves every symbol, so counts are one
+    vectorized pass over each market; rankings pick the top N with
+    np.argpartition and sort only those N.
+    """
+
+    __slots__ = ('markets', 'symbols', 'market', 'price', 'change', 'volume', 'summary')
+
+    def __init__(self, markets):
+        """`markets` maps market type -> (symbols, price, change %, volume) arrays of one tick"""
+        self.markets = list(markets)
+        self.symbols = [symbol for symbols, *_ in markets.values() for symbol in symbols]
+        self.market = np.repeat(np.arange(len(self.markets)), [len(symbols) for symbols, *_ in markets.values()])
+        self.price = np.concatenate([np.asarray(price, dtype=np.float64) for _, price, _, _ in markets.values()])
+        self.change = np.concatenate([np.asarray(change, dtype=np.float64) for _, _, change, _ in markets.values()])
+        self.volume = np.concatenate([np.asarray(volume, dtype=np.int64) for _, _, _, volume in markets.values()])
+        self.summary = self._summarize()
+
+    def _summarize(self):
+        per_market = {}
+        for index, market_type in enumerate(self.markets):
+            rows = self.market == index
+            per_market[market_type] = _counts(self.change[rows], self.volume[rows])
+        stats = _counts(self.change, self.volume)
+        if stats['gainers'] > stats['losers']:
+            stats['trend'] = 'Bullish'
+        elif stats['losers'] > stats['gainers']:
+            stats['trend'] = 'Bearish'
+        else:
+            stats['trend'] = 'Neutral'
+        stats['markets'] = per_market
+        return stats
+
+    def top(self, ranking, n=DEFAULT_TOP, market_type=None):
+        """Top `n` records of a ranking ('gainers', 'losers', 'most_active'), optionally in one market"""
+        column, descending = RANKINGS[ranking]
+        rows = np.arange(len(self.symbols))
+        if market_type is not None:
+            rows = rows[self.market == self.markets.index(market_type)]
+        values = getattr(self, column)[rows]
+        if ranking == 'gainers':
+            rows, values = rows[values > 0], values[values > 0]
+        elif ranking == 'losers':
+            rows, values = rows[values < 0], values[values < 0]
+        keys = -values if descending else values
+        if len(keys) > n:
+            picked = np.argpartition(keys, n - 1)[:n]
+            rows, keys = rows[picked], keys[picked]
+        # Stable on ties: equal values keep registry order
+        rows = rows[np.lexsort((rows, keys))]
+        return [self.record(i) for i in rows.tolist()]
+
+    def record(self, i):
+        return {
+            'market': self.markets[self.market[i]],
+            'symbol': self.symbols[i],
+            'price': float(self.price[i]),
+            'change': float(self.change[i]),
+            'volume': int(self.volume[i])
+        }
+
+
+def _counts(change, volume):
+    return {
+        'gainers': int(np.count_nonzero(change > 0)),
+        'losers': int(np.count_nonzero(change < 0)),
+        'unchanged': int(np.count_nonzero(change == 0)),
+        'total_volume': int(volume.sum())
+    }
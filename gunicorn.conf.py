@@ -0,0 +1,47 @@
+"""Production server: several gevent workers behind one listener sharing one market snapshot.
+
+Usage: gunicorn --config gunicorn.conf.py app:app
+
+Every worker follows the snapshot published in SHARED_SNAPSHOT_DIR; the
+worker holding the updater lock generates it, and another worker takes
+over if that one exits. The directory is cleared when the server starts,
+since files in /dev/shm outlive it.
+"""
+import multiprocessing
+import os
+
+bind = f"{os.getenv('APP_HOST', '0.0.0.0')}:{os.getenv('APP_PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = os.getenv('WORKER_CLASS', 'gevent')
+worker_connections = int(os.getenv('WORKER_CONNECTIONS', 10000))
+# SSE streams stay open; gevent workers heartbeat on their own, so this only bounds stuck sync workers
+timeout = int(os.getenv('WORKER_TIMEOUT', 120))
+graceful_timeout = 30
+
+# Workers import the app themselves, so none of them inherits another's threads or locks
+preload_app = False
+
+os.environ.setdefault('SHARED_SNAPSHOT_DIR', '/dev/shm/financial-dashboard')
+
+
+def post_worker_init(worker):
+    """Start following (or generating) snapshots as soon as the worker boots"""
+    from app import start_background_updater
+    start_background_updater()
+
+
+def on_starting(server):
+    """Clear the snapshots and metrics a previous run left in SHARED_SNAPSHOT_DIR"""
+    import metrics
+    from shared_snapshot import clear_directory
+    directory = os.environ['SHARED_SNAPSHOT_DIR']
+    if clear_directory(directory):
+        metrics.clear_multiprocess(os.path.join(directory, 'metrics'))
+    else:
+        server.log.warning(f"Another server is publishing snapshots in {directory}; sharing its files")
+
+
+def child_exit(server, worker):
+    """Fold an exited worker's metrics into the retired totals so its file does not pile up"""
+    import metrics
+    metrics.mark_process_dead(worker.pid, os.path.join(os.environ['SHARED_SNAPSHOT_DIR'], 'metrics'))
@@ -0,0 +1,137 @@
+"""Parallel history backfill: symbol shards generated in worker processes, returned through shared memory"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from market_engine import MarketEngine
+from ohlc import BarMatrix
+
+# Shards smaller than this cost more to ship than to generate in-process
+MIN_SHARD_SYMBOLS = 64
+
+COLUMNS = {'open': np.float64, 'high': np.float64, 'low': np.float64, 'close': np.float64, 'volume': np.int64}
+
+
+def _array(block, offset, shape, dtype):
+    return np.ndarray(shape, dtype, buffer=block.buf, offset=offset)
+
+
+def generate_shard(symbols, base_prices, change_range, capacity, backfill_days, seed, now, market_seed=None):
+    """Worker: backfill one shard of symbols and copy every level into a new shared memory block.
+
+    Each level is stored as its closed bars followed by the live bar, dates
+    first and then one (symbols x bars) matrix per column. Returns the block
+    name and [(interval, bars, date dtype)]; the caller unlinks the block.
+    `market_seed` is a seeded engine's model seed (`seed` drives the random walk).
+    """
+    engine = MarketEngine(symbols, base_prices, change_range, capacity=capacity, backfill_days=backfill_days,
+                          rng=seed, seed=market_seed)
+    engine.generate(now)
+    rows = len(symbols)
+    views = {name: (level.buffer.view(), level.live) for name, level in engine.levels.items()}
+    size = sum((len(bars.dates) + 1) * 8 * (1 + rows * len(COLUMNS)) for bars, _ in views.values())
+
+    block = shared_memory.SharedMemory(create=True, size=size)
+    layout = []
+    offset = 0
+    for name, (bars, live) in views.items():
+        n = len(bars.dates) + 1
+        _array(block, offset, n, bars.dates.dtype)[:] = np.r_[bars.dates, [live['date']]]
+        offset += n * 8
+        for column, dtype in COLUMNS.items():
+            target = _array(block, offset, (rows, n), dtype)
+            target[:, :-1] = getattr(bars, column)
+            target[:, -1] = live[column]
+            del target
+            offset += rows * n * 8
+        layout.append((name, n, bars.dates.dtype.str))
+    block.close()
+    return block.name, layout
+
+
+class HistoryPool:
+    """Process pool that generates a market's startup history in symbol shards.
+
+    Shards are independent random walks seeded from the engine's generator,
+    so the result is reproducible for a given seed and worker count (and for
+    seeded engines, identical for any worker count). Workers
+    hand bars back through shared memory rather than pickling arrays; the
+    pool starts on first use and close() releases its processes.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = None
+
+    def shards(self, count):
+        """[lo, hi) symbol ranges, at most one per worker and none below MIN_SHARD_SYMBOLS"""
+        shards = max(1, min(self.workers, count // MIN_SHARD_SYMBOLS))
+        edges = np.linspace(0, count, shards + 1).astype(int)
+        return list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+
+    def backfill(self, engine, now):
+        """Generate `engine`'s history across the pool and load it; False if it is too small to shard"""
+        bounds = self.shards(len(engine.symbols))
+        if len(bounds) < 2:
+            return False
+        if self._executor is None:
+            # spawn: the app's threads must not be forked mid-flight
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        seeds = engine.rng.integers(2 ** 63, size=len(bounds))
+        futures = [self._executor.submit(generate_shard, engine.symbols[lo:hi], engine.base_prices[lo:hi],
+                                         engine.change_range[lo:hi], engine.capacity, engine.backfill_days,
+                                         int(seed), now, engine.seed)
+                   for (lo, hi), seed in zip(bounds, seeds)]
+
+        blocks = []
+        try:
+            try:
+                for future in futures:
+                    name, layout = future.result()
+                    blocks.append((shared_memory.SharedMemory(name=name), layout))
+            except (BrokenProcessPool, OSError) as e:
+                print(f"⚠️ History pool failed, generating in-process: {e}")
+                self.close()
+                return False
+            self._load(engine, bounds, blocks)
+        finally:
+            for block, _ in blocks:
+                block.close()
+                block.unlink()
+        return True
+
+    def _load(self, engine, bounds, blocks):
+        """Stitch the shards of every level back together and load them into the engine"""
+        offsets = [0] * len(blocks)
+        for level_index, (name, level) in enumerate(engine.levels.items()):
+            dates = columns = None
+            for shard, ((lo, hi), (block, layout)) in enumerate(zip(bounds, blocks)):
+                interval, n, dtype = layout[level_index]
+                if interval != name:
+                    raise RuntimeError(f"Shard {shard} returned level {interval}, expected {name}")
+                offset = offsets[shard]
+                shard_dates = _array(block, offset, n, np.dtype(dtype))
+                offset += n * 8
+                if dates is None:
+                    dates = shard_dates.copy()
+                    columns = {column: np.empty((len(engine.symbols), n), dtype)
+                               for column, dtype in COLUMNS.items()}
+                elif not np.array_equal(dates, shard_dates):
+                    raise RuntimeError(f"Shard {shard} generated different {name} dates")
+                del shard_dates
+                for column, column_dtype in COLUMNS.items():
+                    source = _array(block, offset, (hi - lo, n), column_dtype)
+                    columns[column][lo:hi] = source
+                    del source
+                    offset += (hi - lo) * n * 8
+                offsets[shard] = offset
+            level.load(BarMatrix(engine.symbols, dates, **columns), final=True)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
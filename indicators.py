@@ -0,0 +1,251 @@
+"""Incremental technical indicators (SMA, EMA, RSI, Bollinger Bands, VWAP)"""
+import numpy as np
+
+from ohlc import ColumnBuffer
+
+# SMA, Bollinger Bands and VWAP share one trailing window
+WINDOW = 20
+EMA_PERIOD = 20
+RSI_PERIOD = 14
+BOLLINGER_STDDEV = 2.0
+
+INDICATOR_COLUMNS = ('sma', 'ema', 'rsi', 'bb_upper', 'bb_middle', 'bb_lower', 'vwap')
+
+INDICATOR_PARAMS = {'window': WINDOW, 'ema_period': EMA_PERIOD, 'rsi_period': RSI_PERIOD,
+                    'bollinger_stddev': BOLLINGER_STDDEV}
+
+# Running sums are rebuilt from the bar window this often to cancel float drift
+RESYNC_EVERY = 1024
+
+# Block length for the vectorized exponential smoothing; keeps (1 - alpha)^-n finite
+EWM_BLOCK = 128
+
+EMA_ALPHA = 2.0 / (EMA_PERIOD + 1)
+RSI_ALPHA = 1.0 / RSI_PERIOD
+
+
+def ewm(values, alpha, initial):
+    """Exponentially weighted mean along axis 1, continuing from `initial`, without a loop per bar.
+
+    Within a block y[t] = d^(t+1) * carry + alpha * d^t * cumsum(x[k] * d^-k),
+    with d = 1 - alpha; the carry chains blocks so the weights never overflow.
+    """
+    decay = 1.0 - alpha
+    out = np.empty(values.shape)
+    carry = np.asarray(initial, dtype=np.float64)
+    for block_start in range(0, values.shape[1], EWM_BLOCK):
+        block = values[:, block_start:block_start + EWM_BLOCK]
+        steps = np.arange(block.shape[1])
+        shrink = decay ** steps
+        out[:, block_start:block_start + block.shape[1]] = (
+            carry[:, None] * shrink * decay + alpha * shrink * np.cumsum(block / shrink, axis=1)
+        )
+        carry = out[:, block_start + block.shape[1] - 1]
+    return out
+
+
+def rolling_sum(values, period):
+    """Trailing `period` sum along axis 1 (NaN until the window is full)"""
+    cumulative = np.cumsum(values, axis=1)
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] >= period:
+        out[:, period - 1] = cumulative[:, period - 1]
+        out[:, period:] = cumulative[:, period:] - cumulative[:, :-period]
+    return out
+
+
+def rsi_from_averages(avg_gain, avg_loss):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+
+
+def bollinger(total, total_sq, count):
+    """(upper, middle, lower) from a window's sum and sum of squares"""
+    mean = total / count
+    band = BOLLINGER_STDDEV * np.sqrt(np.maximum(total_sq / count - mean * mean, 0.0))
+    return mean + band, mean, mean - band
+
+
+def window_sums(bars):
+    """Exact running sums over the last WINDOW bars of a BarMatrix"""
+    close = bars.close[:, -WINDOW:]
+    volume = bars.volume[:, -WINDOW:].astype(np.float64)
+    typical = (bars.high[:, -WINDOW:] + bars.low[:, -WINDOW:] + close) / 3.0
+    return {
+        'sum': close.sum(axis=1),
+        'sumsq': (close * close).sum(axis=1),
+        'pv': (typical * volume).sum(axis=1),
+        'vol': volume.sum(axis=1)
+    }
+
+
+def compute_indicators(bars):
+    """Every indicator for every bar of a BarMatrix in one vectorized pass.
+
+    Returns ({column: matrix}, state) where state is what the incremental
+    update needs to continue from the last bar.
+    """
+    close = bars.close
+    volume = bars.volume.astype(np.float64)
+    rows, n = close.shape
+    if n == 0:
+        return {name: np.empty((rows, 0)) for name in INDICATOR_COLUMNS}, None
+
+    total = rolling_sum(close, WINDOW)
+    upper, middle, lower = bollinger(total, rolling_sum(close * close, WINDOW), WINDOW)
+    typical = (bars.high + bars.low + close) / 3.0
+    vwap = rolling_sum(typical * volume, WINDOW) / rolling_sum(volume, WINDOW)
+
+    ema = ewm(close[:, 1:], EMA_ALPHA, close[:, 0])
+    ema = np.concatenate([close[:, :1], ema], axis=1)
+    delta = np.diff(close, axis=1)
+    avg_gain = np.concatenate([np.zeros((rows, 1)), ewm(np.maximum(delta, 0.0), RSI_ALPHA, np.zeros(rows))], axis=1)
+    avg_loss = np.concatenate([np.zeros((rows, 1)), ewm(np.maximum(-delta, 0.0), RSI_ALPHA, np.zeros(rows))], axis=1)
+
+    state = dict(window_sums(bars), ema=ema[:, -1], avg_gain=avg_gain[:, -1], avg_loss=avg_loss[:, -1],
+                 count=n, updates=0)
+
+    rsi = rsi_from_averages(avg_gain, avg_loss)
+    ema = ema.copy()
+    ema[:, :EMA_PERIOD - 1] = np.nan
+    rsi[:, :RSI_PERIOD] = np.nan
+    values = {'sma': total / WINDOW, 'ema': ema, 'rsi': rsi, 'bb_upper': upper,
+              'bb_middle': middle, 'bb_lower': lower, 'vwap': vwap}
+    return values, state
+
+
+def step(state, bars, close, high, low, volume):
+    """Indicator values and new state after one more bar; O(1) per symbol.
+
+    `bars` is the closed window *before* the new bar; the bar WINDOW back
+    leaves the running sums. Nothing in `state` is modified in place.
+    """
+    n = state['count']
+    typical = (high + low + close) / 3.0
+    volume = np.asarray(volume, dtype=np.float64)
+    if n >= WINDOW:
+        out_close = bars.close[:, -WINDOW]
+        out_volume = bars.volume[:, -WINDOW].astype(np.float64)
+        out_typical = (bars.high[:, -WINDOW] + bars.low[:, -WINDOW] + out_close) / 3.0
+    else:
+        out_close = out_volume = out_typical = 0.0
+
+    delta = close - bars.close[:, -1]
+    new_state = {
+        'sum': state['sum'] + close - out_close,
+        'sumsq': state['sumsq'] + close * close - out_close * out_close,
+        'pv': state['pv'] + typical * volume - out_typical * out_volume,
+        'vol': state['vol'] + volume - out_volume,
+        'ema': state['ema'] + EMA_ALPHA * (close - state['ema']),
+        'avg_gain': state['avg_gain'] + RSI_ALPHA * (np.maximum(delta, 0.0) - state['avg_gain']),
+        'avg_loss': state['avg_loss'] + RSI_ALPHA * (np.maximum(-delta, 0.0) - state['avg_loss']),
+        'count': n + 1,
+        'updates': state['updates'] + 1
+    }
+
+    count = n + 1
+    nan = np.full(len(close), np.nan)
+    full = count >= WINDOW
+    upper, middle, lower = bollinger(new_state['sum'], new_state['sumsq'], WINDOW)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vwap = new_state['pv'] / new_state['vol']
+    values = {
+        'sma': new_state['sum'] / WINDOW if full else nan,
+        'ema': new_state['ema'] if count >= EMA_PERIOD else nan,
+        'rsi': rsi_from_averages(new_state['avg_gain'], new_state['avg_loss']) if count > RSI_PERIOD else nan,
+        'bb_upper': upper if full else nan,
+        'bb_middle': middle if full else nan,
+        'bb_lower': lower if full else nan,
+        'vwap': vwap if full else nan
+    }
+    return values, new_state
+
+
+class IndicatorSet:
+    """Indicator history for one timeframe level, updated as each bar closes"""
+
+    def __init__(self, symbols, capacity, date_unit, allocate=np.empty):
+        self.buffer = ColumnBuffer(symbols, capacity, dict.fromkeys(INDICATOR_COLUMNS, np.float64), date_unit,
+                                   allocate)
+        self.state = None
+
+    def backfill(self, bars):
+        """Vectorized computation over a level's existing closed bars"""
+        values, self.state = compute_indicators(bars)
+        if len(bars.dates):
+            self.buffer.extend_values(bars.dates, values)
+
+    def update(self, bars, date, close, high, low, volume):
+        """Incorporate one newly closed bar; `bars` is the window before it was appended"""
+        if self.state is None:
+            # Nothing had closed at backfill: start from the window including this bar
+            values, self.state = compute_indicators(_Window(
+                np.c_[bars.close, close], np.c_[bars.high, high], np.c_[bars.low, low], np.c_[bars.volume, volume]
+            ))
+            self.buffer.append_values(date, {name: column[:, -1] for name, column in values.items()})
+            return
+        values, state = step(self.state, bars, close, high, low, volume)
+        if state['updates'] % RESYNC_EVERY == 0:
+            # Replace drifting float sums with exact ones over the window incl. the new bar
+            keep = WINDOW - 1
+            state.update(window_sums(_Window(
+                np.c_[bars.close[:, -keep:], close],
+                np.c_[bars.high[:, -keep:], high],
+                np.c_[bars.low[:, -keep:], low],
+                np.c_[bars.volume[:, -keep:], volume]
+            )))
+        self.buffer.append_values(date, values)
+        self.state = state
+
+    def view(self, bars, live):
+        dates, values = self.buffer.view_values()
+        return IndicatorView(dates, values, self.state, bars, live)
+
+
+class _Window:
+    """Minimal BarMatrix stand-in for window_sums()"""
+
+    __slots__ = ('close', 'high', 'low', 'volume')
+
+    def __init__(self, close, high, low, volume):
+        self.close = close
+        self.high = high
+        self.low = low
+        self.volume = volume
+
+
+class IndicatorView:
+    """Immutable indicator history for one level plus what is needed for live values"""
+
+    __slots__ = ('dates', 'values', 'state', 'bars', 'live')
+
+    def __init__(self, dates, values, state, bars, live):
+        self.dates = dates
+        self.values = values
+        self.state = state
+        self.bars = bars
+        self.live = live
+
+    def records(self, index, lo=0, hi=None):
+        """Indicator rows for symbol row `index` between positions lo and hi"""
+        hi = len(self.dates) if hi is None else hi
+        dates = np.datetime_as_string(self.dates[lo:hi]).tolist()
+        columns = [np.round(self.values[name][index, lo:hi], 4).tolist() for name in INDICATOR_COLUMNS]
+        return [
+            dict(zip(('date',) + INDICATOR_COLUMNS, (date,) + tuple(None if v != v else v for v in row)))
+            for date, *row in zip(dates, *columns)
+        ]
+
+    def latest(self, index):
+        """Provisional indicators for symbol row `index` as if the live bar closed now"""
+        if self.live is None or self.state is None:
+            return None
+        live, bars = self.live, self.bars
+        pick = slice(index, index + 1)
+        state = {key: value[pick] if isinstance(value, np.ndarray) else value for key, value in self.state.items()}
+        window = _Window(bars.close[pick], bars.high[pick], bars.low[pick], bars.volume[pick])
+        values, _ = step(state, window, live['close'][pick], live['high'][pick], live['low'][pick],
+                         live['volume'][pick])
+        row = {name: float(values[name][0]) for name in INDICATOR_COLUMNS}
+        row = {name: None if value != value else round(value, 4) for name, value in row.items()}
+        return dict(date=str(live['date']), **row)
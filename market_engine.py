@@ -0,0 +1,333 @@
+"""Incremental bar engine: appends new bars instead of regenerating history"""
+import math
+
+import numpy as np
+
+from aggregation import INTERVALS, WEEK_OFFSET, TimeframeLevel, bucket_seconds, bucket_start, rollup
+from ohlc import SECONDS_PER_DAY, VOLUME_RANGE, BarMatrix, date_unit, generate_ohlc_batch
+from seeded_ohlc import generate_seeded_ohlc
+
+# Closed bars kept per interval
+DEFAULT_CAPACITY = {
+    '1m': 1440,
+    '5m': 2016,
+    '1h': 720,
+    '1d': 365,
+    '1w': 260
+}
+
+BASE_INTERVAL = '1m'
+
+# Backfill is generated a week of 1m bars at a time to bound memory
+BACKFILL_CHUNK = 7 * SECONDS_PER_DAY
+
+
+def _minute_end(now):
+    """Epoch seconds at the end of the minute containing `now`"""
+    return int(np.datetime64(now, 'm').astype('datetime64[s]').astype(np.int64)) + 60
+
+
+class MarketView:
+    """Immutable per-market result of one engine tick"""
+
+    __slots__ = ('symbols', 'index', 'levels', 'live', 'previous_close', 'high_window', 'low_window')
+
+    def __init__(self, symbols, levels, previous_close, high_window, low_window):
+        self.symbols = symbols
+        self.index = {symbol: i for i, symbol in enumerate(symbols)}
+        self.levels = levels
+        self.live = levels['1d'].live
+        self.previous_close = previous_close
+        self.high_window = high_window
+        self.low_window = low_window
+
+    def indicators(self, symbol, interval='1d'):
+        """(IndicatorView, symbol row) for one symbol at one interval, or (None, None)"""
+        i = self.index.get(symbol)
+        level = self.levels.get(interval)
+        if i is None or level is None:
+            return None, None
+        return level.indicators, i
+
+    def series(self, symbol, interval='1d'):
+        """BarSeries for one symbol at one interval (live bar last), or None"""
+        i = self.index.get(symbol)
+        level = self.levels.get(interval)
+        if i is None or level is None:
+            return None
+        bars, live = level.bars, level.live
+        live_record = {
+            'date': str(live['date']),
+            'open': round(float(live['open'][i]), 4),
+            'high': round(float(live['high'][i]), 4),
+            'low': round(float(live['low'][i]), 4),
+            'close': round(float(live['close'][i]), 4),
+            'volume': int(live['volume'][i])
+        }
+        return bars.series(i, live_record)
+
+
+class MarketEngine:
+    """Keeps a multi-timeframe pyramid of bars plus a live bar for every symbol in a market.
+
+    Each tick moves every symbol one random step from its last close and feeds
+    that step to every level (1m, 5m, 1h, 1d, 1w). A level whose bucket rolled
+    over closes its live bar into its ring buffer, dropping the oldest bar, and
+    opens a new one, so every interval is kept up to date in O(1) per symbol
+    per tick and nothing is re-aggregated on request. High/low over the trailing
+    daily window is cached when a daily bar closes.
+
+    With a `bar_log`, closed bars are also persisted and the first tick
+    restores history from the log instead of generating it. With a
+    `history_pool`, generating that history is split across processes.
+    `allocate` creates the bar and indicator buffers (see ColumnBuffer).
+
+    With a `seed`, bars come from the seeded model instead (see
+    seeded_ohlc): history starts on a Monday so every bucket is complete,
+    and each tick merges the model's bars up to the current minute, so
+    engines started at different times agree on every bar they both hold.
+    """
+
+    def __init__(self, symbols, base_prices, change_range, capacity=None, window=7,
+                 tick_seconds=60, backfill_days=30, rng=None, bar_log=None, history_pool=None,
+                 allocate=np.empty, seed=None):
+        self.symbols = list(symbols)
+        self.base_prices = np.asarray(base_prices, dtype=np.float64)
+        # (min, max) daily change per symbol; one pair applies to every symbol
+        self.change_range = np.broadcast_to(np.asarray(change_range, dtype=np.float64), (len(self.symbols), 2))
+        self.capacity = dict(DEFAULT_CAPACITY, **(capacity or {}))
+        self.window = window
+        self.backfill_days = backfill_days
+        self.rng = rng if isinstance(rng, np.random.Generator) else np.random.default_rng(rng)
+        self.levels = {name: TimeframeLevel(self.symbols, seconds, self.capacity[name], allocate)
+                       for name, seconds in INTERVALS.items()}
+        self.bar_log = bar_log
+        self.history_pool = history_pool
+        self.seed = seed
+        self.last_close = None
+        # Seeded mode: epoch seconds up to which the model's 1m bars have been merged
+        self._generated_end = None
+        self._closed_high = None
+        self._closed_low = None
+        self.set_tick_seconds(tick_seconds)
+
+    def set_tick_seconds(self, tick_seconds):
+        """Scale per-tick moves so a full day of ticks matches the daily change range"""
+        fraction = tick_seconds / SECONDS_PER_DAY
+        drift = (self.change_range[:, 0] + self.change_range[:, 1]) / 2
+        half_range = (self.change_range[:, 1] - self.change_range[:, 0]) / 2
+        self._tick_drift = drift * fraction
+        self._tick_noise = half_range * math.sqrt(fraction)
+        self._tick_volume = max(1, int(VOLUME_RANGE[1] * fraction))
+
+    def backfill(self, now=None):
+        """Generate `backfill_days` of history for every level, in a process pool when one is set"""
+        now = np.datetime64(now if now is not None else 'now', 'm')
+        if self.history_pool is None or not self.history_pool.backfill(self, now):
+            self.generate(now)
+        self._generated_end = _minute_end(now)
+
+        for name, level in self.levels.items():
+            level.backfill_indicators()
+            if self.bar_log is not None:
+                self.bar_log.write(name, level.buffer.view())
+        self.last_close = self.levels[BASE_INTERVAL].live['close'].copy()
+        self._update_closed_extremes()
+
+    def generate(self, now=None):
+        """Generate `backfill_days` of 1m bars and roll them up into every level.
+
+        Chunks end on Monday 00:00 UTC so no bucket of any level straddles two
+        chunks; only the final chunk leaves its last bucket open as the live bar.
+        Seeded engines start on the Monday before, so their first buckets are
+        whole too.
+        """
+        end = _minute_end(now if now is not None else 'now')
+        start = end - self.backfill_days * SECONDS_PER_DAY
+        if self.seed is not None:
+            start = bucket_seconds(start, INTERVALS['1w'])
+        prices = self.base_prices
+
+        chunk_start = start
+        while chunk_start < end:
+            week = (chunk_start - WEEK_OFFSET) // BACKFILL_CHUNK * BACKFILL_CHUNK + WEEK_OFFSET
+            chunk_end = min(week + BACKFILL_CHUNK, end)
+            final = chunk_end == end
+            if self.seed is not None:
+                base = self._seeded_bars(chunk_start, chunk_end)
+            else:
+                base = generate_ohlc_batch(
+                    self.symbols, prices, self.change_range,
+                    n_bars=(chunk_end - chunk_start) // 60, end_date=np.datetime64(chunk_end - 60, 's'),
+                    rng=self.rng, interval=INTERVALS[BASE_INTERVAL]
+                )
+            for name, level in self.levels.items():
+                level.load(base if name == BASE_INTERVAL else rollup(base, level.interval), final)
+            prices = base.close[:, -1]
+            chunk_start = chunk_end
+
+    def _seeded_bars(self, start, end):
+        return generate_seeded_ohlc(self.symbols, self.base_prices, self.change_range,
+                                    start, end, self.seed)
+
+    def _catch_up(self, now):
+        """Seeded mode: merge the model's 1m bars from the last one merged through `now`'s minute"""
+        end = _minute_end(now)
+        while self._generated_end < end:
+            # A day at a time bounds memory after a long pause
+            chunk_end = min(self._generated_end + SECONDS_PER_DAY, end)
+            base = self._seeded_bars(self._generated_end, chunk_end)
+            for name, level in self.levels.items():
+                closed = level.merge(base if name == BASE_INTERVAL else rollup(base, level.interval))
+                if closed:
+                    if name == '1d':
+                        self._update_closed_extremes()
+                    if self.bar_log is not None:
+                        self.bar_log.append(name, level.buffer.view(), closed)
+            self._generated_end = chunk_end
+        self.last_close = self.levels[BASE_INTERVAL].live['close'].copy()
+
+    def restore(self, now=None):
+        """Load closed bars of every level from the bar log; False if it has no usable history.
+
+        Only closed bars are logged, so each level's bucket that was still
+        open at the last logged bar is rebuilt by rolling up the finer level's
+        bars since it started; the first tick after a restart closes it.
+        """
+        if self.bar_log is None:
+            return False
+        now = np.datetime64(now if now is not None else 'now', 's')
+        try:
+            history = {name: self.bar_log.replay(name, date_unit(level.interval),
+                                                 before=bucket_start(now, level.interval))
+                       for name, level in self.levels.items()}
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Bar log unreadable, regenerating history: {e}")
+            return False
+        if history[BASE_INTERVAL] is None:
+            return False
+
+        last_logged = history[BASE_INTERVAL].dates[-1]
+        finer = None
+        for name, level in self.levels.items():
+            if history[name] is not None:
+                level.buffer.extend(history[name])
+            level.backfill_indicators()
+            if finer is not None:
+                self._reopen_bucket(level, finer, last_logged)
+            finer = level
+        self.last_close = history[BASE_INTERVAL].close[:, -1].copy()
+        self._generated_end = _minute_end(last_logged)
+        self._update_closed_extremes()
+        return True
+
+    def resume(self, view):
+        """Carry on from a MarketView another engine published, instead of generating history.
+
+        Every level's closed bars and live bar are copied, so a process that
+        takes over generating snapshots continues the same prices and charts.
+        False (nothing loaded) if `view` is for a different symbol list.
+        """
+        if list(view.symbols) != self.symbols or set(view.levels) != set(self.levels):
+            return False
+        for name, level in self.levels.items():
+            bars, live = view.levels[name][:2]
+            level.buffer.extend(bars)
+            level.live = {column: value.copy() for column, value in live.items()}
+            level.backfill_indicators()
+            if self.bar_log is not None:
+                self.bar_log.write(name, level.buffer.view())
+        live = self.levels[BASE_INTERVAL].live
+        self.last_close = live['close'].copy()
+        self._generated_end = _minute_end(live['date'])
+        self._update_closed_extremes()
+        return True
+
+    def _reopen_bucket(self, level, finer, moment):
+        """Rebuild `level`'s live bar from the `finer` level's bars inside the bucket containing `moment`"""
+        bars = finer.buffer.view()
+        start = bucket_start(moment, level.interval).astype(bars.dates.dtype)
+        closed = level.buffer.view().dates
+        if len(closed) and closed[-1] >= start:
+            # That bucket closed (and was logged) before the shutdown
+            return
+        bars = bars.slice(int(np.searchsorted(bars.dates, start)))
+        live = finer.live
+        if live is not None:
+            bars = BarMatrix(bars.symbols, np.r_[bars.dates, [live['date']]],
+                             *(np.c_[getattr(bars, name), live[name]]
+                               for name in ('open', 'high', 'low', 'close', 'volume')))
+        if len(bars.dates):
+            level.load(rollup(bars, level.interval), final=True)
+
+    def _update_closed_extremes(self):
+        closed = self.levels['1d'].buffer.view()
+        span = min(self.window - 1, len(closed.dates))
+        if span:
+            self._closed_high = closed.high[:, -span:].max(axis=1)
+            self._closed_low = closed.low[:, -span:].min(axis=1)
+        else:
+            self._closed_high = np.full(len(self.symbols), -np.inf)
+            self._closed_low = np.full(len(self.symbols), np.inf)
+
+    def prepare(self, now=None):
+        """Load history on first use; True once ticks can be applied on top of it.
+
+        History is restored from the bar log when possible. A fresh backfill
+        already ends in a live bar at `now`, so it returns False for that tick.
+        """
+        if self.last_close is not None:
+            return True
+        now = np.datetime64(now if now is not None else 'now', 's')
+        if self.restore(now):
+            return True
+        self.backfill(now)
+        return False
+
+    def simulate(self):
+        """Random-walk (close, volume) for the next tick of every symbol"""
+        n = len(self.symbols)
+        close = self.last_close * (1.0 + self._tick_drift + self.rng.uniform(-self._tick_noise, self._tick_noise, n))
+        volume = self.rng.integers(0, self._tick_volume, n, endpoint=True)
+        return close, volume
+
+    def tick(self, now=None, close=None, volume=None):
+        """Advance every symbol to `close` (simulated, or seeded, if None) and return the resulting MarketView"""
+        now = np.datetime64(now if now is not None else 'now', 's')
+        if not self.prepare(now):
+            return self.view()
+
+        if close is None and self.seed is not None:
+            self._catch_up(now)
+            if self.bar_log is not None:
+                self.bar_log.flush_if_due()
+            return self.view()
+
+        previous = self.last_close
+        if close is None:
+            close, volume = self.simulate()
+
+        for name, level in self.levels.items():
+            if level.update(now, previous, close, volume):
+                if name == '1d':
+                    self._update_closed_extremes()
+                if self.bar_log is not None:
+                    self.bar_log.append(name, level.buffer.view())
+        self.last_close = close
+        if self.bar_log is not None:
+            self.bar_log.flush_if_due()
+
+        return self.view()
+
+    def view(self):
+        """Freeze the current state into a MarketView"""
+        levels = {name: level.view() for name, level in self.levels.items()}
+        closed_daily, live = levels['1d'].bars, levels['1d'].live
+        previous_close = closed_daily.close[:, -1] if len(closed_daily.dates) else live['open']
+        return MarketView(
+            self.symbols,
+            levels,
+            previous_close,
+            np.maximum(self._closed_high, live['high']),
+            np.minimum(self._closed_low, live['low'])
+        )
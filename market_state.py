@@ -0,0 +1,80 @@
+"""Versioned market snapshots shared between the updater and request handlers"""
+import threading
+import time
+from collections import deque
+
+# Recent snapshot versions whose publish time is remembered for `since=` queries
+VERSION_HISTORY = 4096
+
+
+class MarketSnapshot:
+    """One published view of the market; never modified after creation.
+
+    Readers grab a snapshot once per request and use only that object, so every
+    field they read belongs to the same refresh.
+    """
+
+    __slots__ = ('version', 'created_at', 'last_updated', 'prices', 'historical', 'market_stats', 'breadth')
+
+    def __init__(self, version, prices, historical, market_stats, created_at=None, breadth=None):
+        created_at = created_at if created_at is not None else time.time()
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'created_at', created_at)
+        object.__setattr__(self, 'last_updated', time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(created_at)))
+        object.__setattr__(self, 'prices', prices)
+        object.__setattr__(self, 'historical', historical)
+        object.__setattr__(self, 'market_stats', market_stats)
+        object.__setattr__(self, 'breadth', breadth)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('MarketSnapshot is immutable; build a new snapshot instead')
+
+    def age(self):
+        """Seconds since this snapshot was published"""
+        return max(0.0, time.time() - self.created_at)
+
+
+class SnapshotStore:
+    """Holds the latest snapshot; readers never block and never see a partial refresh.
+
+    Publishing is a single reference assignment. Only writers take the lock, to
+    keep versions monotonic if two refreshes ever finish out of order. Versions
+    reserved after publishing a snapshot built elsewhere (another worker's
+    updater) continue above it.
+    """
+
+    def __init__(self, history=VERSION_HISTORY):
+        self._current = None
+        self._next_version = 1
+        self._publish_lock = threading.Lock()
+        self._created_at = {}
+        self._history = deque()
+        self._history_size = history
+
+    def next_version(self):
+        """Reserve the version number for the snapshot being built"""
+        with self._publish_lock:
+            version = self._next_version
+            self._next_version += 1
+            return version
+
+    def publish(self, snapshot):
+        """Make a fully built snapshot visible to every reader"""
+        with self._publish_lock:
+            current = self._current
+            if current is None or snapshot.version > current.version:
+                self._created_at[snapshot.version] = snapshot.created_at
+                self._history.append(snapshot.version)
+                if len(self._history) > self._history_size:
+                    self._created_at.pop(self._history.popleft(), None)
+                self._current = snapshot
+                self._next_version = max(self._next_version, snapshot.version + 1)
+            return self._current
+
+    def current(self):
+        """Return the latest snapshot, or None before the first publish"""
+        return self._current
+
+    def created_at(self, version):
+        """Publish time of a recent snapshot version, or None if it is unknown"""
+        return self._created_at.get(version)
@@ -0,0 +1,344 @@
+"""Minimal Prometheus metrics: counters, histograms and scrape-time gauges in text format"""
+import bisect
+import fcntl
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+# Request latency buckets in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Response size buckets in bytes
+SIZE_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152)
+
+REGISTRY = []
+
+# Multi-worker mode: this process's values file, or None when metrics stay in-process
+_store = None
+
+# Values file layout: used bytes, then records of key length, UTF-8 key padded to 8 bytes, float64 value
+_USED = struct.Struct('<Q')
+_KEY_LENGTH = struct.Struct('<I')
+_VALUE = struct.Struct('<d')
+_INITIAL_FILE_SIZE = 1 << 16
+
+# Totals of exited workers, folded into one file so theirs can be removed
+_RETIRED_FILE = 'retired.metrics'
+
+# Shared while scrapes read the values files, exclusive while an exited worker's are folded in
+_MERGE_LOCK = 'merge.lock'
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Held only for a dict lookup and a few additions; never while formatting or doing I/O
+        self._lock = threading.Lock()
+        self._series = {}
+        registry.append(self)
+
+    def header(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(_Metric):
+    """Monotonic count per label set"""
+
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            value = self._series[labels] = self._series.get(labels, 0) + amount
+            if _store is not None:
+                _store.set(self.name, labels, '', value)
+
+    def render(self, merged=None):
+        if merged is not None:
+            series = [(labels, fields['']) for labels, fields in merged.items()]
+        else:
+            with self._lock:
+                series = list(self._series.items())
+        return self.header() + [f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}'
+                                for labels, value in series]
+
+
+class Histogram(_Metric):
+    """Bucketed observations per label set; cumulative counts are built at scrape time"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=REGISTRY):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+            if _store is not None:
+                _store.set(self.name, labels, index, series[0][index])
+                _store.set(self.name, labels, 'sum', series[1])
+
+    def render(self, merged=None):
+        if merged is not None:
+            series = [(labels, [fields.get(i, 0) for i in range(len(self.buckets) + 1)], fields.get('sum', 0))
+                      for labels, fields in merged.items()]
+        else:
+            with self._lock:
+                series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        lines = self.header()
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _number(bound)
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, ("le", le))} {_number(cumulative)}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {_number(cumulative)}')
+        return lines
+
+
+class Callback(_Metric):
+    """Value read from application state when scraped, so the hot path does no work.
+
+    `fn` returns a number, or a {label values tuple: number} mapping. With
+    `aggregate`, multi-worker scrapes sum the value over workers: every worker
+    that ever ran for counters, running ones for gauges. Workers publish it on
+    sync(); otherwise each worker reports its own value.
+    """
+
+    def __init__(self, name, documentation, fn, kind='gauge', labelnames=(), registry=REGISTRY, aggregate=False):
+        super().__init__(name, documentation, labelnames, registry)
+        self.kind = kind
+        self.fn = fn
+        self.aggregate = aggregate
+
+    def series(self):
+        value = self.fn()
+        if value is None:
+            return []
+        return list(value.items()) if isinstance(value, dict) else [((), value)]
+
+    def render(self, merged=None):
+        if merged is not None:
+            series = [(labels, fields['']) for labels, fields in merged.items()]
+        else:
+            series = self.series()
+        return self.header() + [f'{self.name}{_labels(self.labelnames, labels)} {_number(number)}'
+                                for labels, number in series]
+
+
+class _ValuesFile:
+    """One process's metric values in a memory-mapped file that other workers read when scraped.
+
+    Only the owner writes it: records are appended (key, then value, then the
+    used-bytes header) and values are overwritten in place, so readers never
+    see a partial record. The owner holds an exclusive flock for its lifetime,
+    which tells readers whether the process is still running.
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f'{os.getpid()}-{time.time_ns()}.metrics')
+        self._file = open(self.path, 'w+b')
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+        self._file.truncate(_INITIAL_FILE_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), _INITIAL_FILE_SIZE)
+        self._used = _USED.size
+        _USED.pack_into(self._map, 0, self._used)
+        self._offsets = {}
+        self._lock = threading.Lock()
+
+    def set(self, name, labels, field, value):
+        key = (name, labels, field)
+        with self._lock:
+            offset = self._offsets.get(key)
+            if offset is None:
+                offset = self._offsets[key] = self._append(json.dumps([name, [str(label) for label in labels], field]))
+            _VALUE.pack_into(self._map, offset, value)
+
+    def _append(self, key):
+        encoded = key.encode('utf-8')
+        padded = _key_size(len(encoded))
+        end = self._used + padded + _VALUE.size
+        if end > len(self._map):
+            size = max(end, 2 * len(self._map))
+            self._file.truncate(size)
+            self._map.resize(size)
+        _KEY_LENGTH.pack_into(self._map, self._used, len(encoded))
+        self._map[self._used + _KEY_LENGTH.size:self._used + _KEY_LENGTH.size + len(encoded)] = encoded
+        offset = self._used + padded
+        _VALUE.pack_into(self._map, offset, 0.0)
+        self._used = end
+        _USED.pack_into(self._map, 0, end)
+        return offset
+
+
+def _key_size(length):
+    """Bytes taken by a key of `length` bytes and its length prefix, keeping values 8-byte aligned"""
+    return -(-(_KEY_LENGTH.size + length) // 8) * 8
+
+
+def _read_values(path):
+    """(running, [(name, labels, field, value)]) from one worker's values file"""
+    with open(path, 'rb') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            running = False
+        except BlockingIOError:
+            running = True
+        data = f.read()
+    records = []
+    used = min(_USED.unpack_from(data)[0], len(data)) if len(data) >= _USED.size else 0
+    position = _USED.size
+    while position < used:
+        length = _KEY_LENGTH.unpack_from(data, position)[0]
+        start = position + _KEY_LENGTH.size
+        name, labels, field = json.loads(data[start:start + length])
+        position += _key_size(length)
+        records.append((name, tuple(labels), field, _VALUE.unpack_from(data, position)[0]))
+        position += _VALUE.size
+    return running, records
+
+
+def _write_values(path, records):
+    """Write [(name, labels, field, value)] as a values file no process holds, replacing `path` atomically"""
+    chunks = []
+    for name, labels, field, value in records:
+        encoded = json.dumps([name, list(labels), field]).encode('utf-8')
+        padding = _key_size(len(encoded)) - _KEY_LENGTH.size - len(encoded)
+        chunks += [_KEY_LENGTH.pack(len(encoded)), encoded, bytes(padding), _VALUE.pack(value)]
+    body = b''.join(chunks)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(_USED.pack(_USED.size + len(body)) + body)
+    os.replace(path + '.tmp', path)
+
+
+def _merge_lock(directory, operation):
+    """Open file holding the directory's merge lock in `operation` mode; closing it releases the lock"""
+    f = open(os.path.join(directory, _MERGE_LOCK), 'a+b')
+    fcntl.flock(f, operation)
+    return f
+
+
+def enable_multiprocess(directory):
+    """Share counters, histograms and aggregated callbacks with the other workers using `directory`.
+
+    Call in every worker before anything is recorded. The server's master
+    calls mark_process_dead() as each worker exits, so summed counters
+    keep that worker's totals without its file piling up.
+    """
+    global _store
+    _store = _ValuesFile(directory)
+
+
+def clear_multiprocess(directory):
+    """Remove every values file, e.g. left in shared memory by a previous server, before workers start"""
+    os.makedirs(directory, exist_ok=True)
+    for entry in os.listdir(directory):
+        if entry.endswith(('.metrics', '.metrics.tmp')):
+            try:
+                os.unlink(os.path.join(directory, entry))
+            except FileNotFoundError:
+                pass
+
+
+def mark_process_dead(pid, directory):
+    """Fold an exited worker's values into the retired totals and remove its file.
+
+    Retired values are summed like any exited worker's: counters and
+    histograms stay in the totals, gauges are ignored.
+    """
+    if not os.path.isdir(directory):
+        return
+    with _merge_lock(directory, fcntl.LOCK_EX):
+        dead = [os.path.join(directory, entry) for entry in os.listdir(directory)
+                if entry.startswith(f'{pid}-') and entry.endswith('.metrics')]
+        totals = {}
+        for path in [os.path.join(directory, _RETIRED_FILE)] + dead:
+            try:
+                running, records = _read_values(path)
+            except (OSError, ValueError, struct.error):
+                continue
+            if running:
+                continue
+            for name, labels, field, value in records:
+                key = (name, labels, field)
+                totals[key] = totals.get(key, 0) + value
+        if not dead:
+            return
+        _write_values(os.path.join(directory, _RETIRED_FILE), [key + (value,) for key, value in totals.items()])
+        for path in dead:
+            os.unlink(path)
+
+
+def sync(registry=REGISTRY):
+    """Publish this worker's aggregated callback values; a no-op without multi-worker mode"""
+    if _store is None:
+        return
+    for metric in registry:
+        if isinstance(metric, Callback) and metric.aggregate:
+            for labels, value in metric.series():
+                _store.set(metric.name, labels, '', value)
+
+
+def _merge(registry):
+    """{metric name: {labels: {field: value summed over workers}}} for the shared metrics"""
+    shared = {metric.name: not isinstance(metric, Callback) or metric.kind == 'counter'
+              for metric in registry if not isinstance(metric, Callback) or metric.aggregate}
+    merged = {name: {} for name in shared}
+    directory = os.path.dirname(_store.path)
+    with _merge_lock(directory, fcntl.LOCK_SH):
+        files = []
+        for entry in os.listdir(directory):
+            if not entry.endswith('.metrics'):
+                continue
+            try:
+                files.append(_read_values(os.path.join(directory, entry)))
+            except (OSError, ValueError, struct.error):
+                continue
+    for running, records in files:
+        for name, labels, field, value in records:
+            # Gauges only count running workers; counters keep every worker's total
+            if name in shared and (running or shared[name]):
+                fields = merged[name].setdefault(labels, {})
+                fields[field] = fields.get(field, 0) + value
+    return merged
+
+
+def render(registry=REGISTRY):
+    """Every registered metric in the Prometheus text exposition format"""
+    merged = None
+    if _store is not None:
+        sync(registry)
+        merged = _merge(registry)
+    lines = []
+    for metric in registry:
+        if merged is not None and metric.name in merged:
+            lines.extend(metric.render(merged[metric.name]))
+        else:
+            lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
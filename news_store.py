@@ -0,0 +1,155 @@
+"""In-memory news feed with inverted indexes and cursor pagination"""
+import bisect
+import heapq
+import itertools
+import json
+import threading
+from datetime import datetime
+
+# Item fields with an inverted index, and the query parameter that filters on each
+FILTER_PARAMS = {
+    'category': 'category',
+    'tags': 'tag',
+    'importance': 'importance',
+    'symbols': 'symbol'
+}
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 200
+
+# Longest unit first: (seconds, singular name)
+TIME_UNITS = ((86400, 'day'), (3600, 'hour'), (60, 'minute'))
+
+
+def relative_time(seconds):
+    """Human "N units ago" for an age in seconds"""
+    for size, name in TIME_UNITS:
+        if seconds >= size:
+            count = int(seconds // size)
+            return f"{count} {name}{'s' if count != 1 else ''} ago"
+    return 'just now'
+
+
+def format_cursor(key):
+    return f'{key[0]}_{key[1]}'
+
+
+def is_cursor(value):
+    return value.count('_') == 1 and value.replace('_', '').isdigit()
+
+
+def parse_cursor(value):
+    """(timestamp in microseconds, sequence) key from a cursor string"""
+    try:
+        timestamp, sequence = value.split('_')
+        return int(timestamp), int(sequence)
+    except ValueError:
+        raise ValueError(f"Invalid cursor '{value}'")
+
+
+class NewsEntry:
+    """One stored item: its sort key, indexed values and JSON encoded at insert"""
+
+    __slots__ = ('key', 'timestamp', 'fields', 'body')
+
+    def __init__(self, key, timestamp, fields, body):
+        self.key = key
+        self.timestamp = timestamp
+        self.fields = fields
+        self.body = body
+
+
+class NewsStore:
+    """News items ordered by timestamp, filterable by category, tag, importance and symbol.
+
+    Every indexed value maps to a sorted posting list of item keys, so a
+    page is found by binary search into the smallest posting list among the
+    filters and walking it newest first; the other filters are checked per
+    item. Query cost depends on the page size, not on how many items are
+    stored. Items are JSON encoded once when added; only the relative
+    "time" field is filled in per response.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._entries = {}
+        self._index = {field: {} for field in FILTER_PARAMS}
+        self._sequence = itertools.count(1)
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, item):
+        """Index a news item (with an ISO `timestamp`) and return its key"""
+        item = {name: value for name, value in item.items() if name != 'time'}
+        timestamp = datetime.fromisoformat(item['timestamp']).timestamp()
+        fields = {}
+        for field in FILTER_PARAMS:
+            value = item.get(field)
+            values = value if isinstance(value, list) else [] if value is None else [value]
+            fields[field] = frozenset(values)
+        body = json.dumps(item, separators=(',', ':')).encode('utf-8')
+
+        with self._lock:
+            key = (int(timestamp * 1e6), next(self._sequence))
+            self._entries[key] = NewsEntry(key, timestamp, fields, body)
+            # Items normally arrive newest last, so these are appends
+            bisect.insort(self._keys, key)
+            for field, values in fields.items():
+                for value in values:
+                    bisect.insort(self._index[field].setdefault(value, []), key)
+            self.version += 1
+        return key
+
+    def latest_key(self):
+        """Key of the newest item (a client's next `since`), or None when empty"""
+        with self._lock:
+            return self._keys[-1] if self._keys else None
+
+    def query(self, filters=None, since=None, before=None, limit=DEFAULT_PAGE_SIZE):
+        """(entries newest first, `before` key of the next page or None) for one page.
+
+        `filters` maps an indexed field to accepted values (any of them
+        matches); fields are combined with AND. Only items after the `since`
+        key and before the `before` key are returned.
+        """
+        filters = {field: set(values) for field, values in (filters or {}).items() if values}
+        with self._lock:
+            if filters:
+                # Drive the walk from the field whose posting lists are shortest
+                driver = min(filters, key=lambda field: sum(len(self._index[field].get(value, ()))
+                                                           for value in filters[field]))
+                postings = [self._index[driver].get(value, []) for value in filters.pop(driver)]
+            else:
+                postings = [self._keys]
+
+            def newest_first(keys):
+                lo = 0 if since is None else bisect.bisect_right(keys, since)
+                hi = len(keys) if before is None else bisect.bisect_left(keys, before)
+                return (keys[i] for i in range(hi - 1, lo - 1, -1))
+
+            page = []
+            previous = None
+            for key in heapq.merge(*map(newest_first, postings), reverse=True):
+                if key == previous:
+                    continue
+                previous = key
+                entry = self._entries[key]
+                if all(entry.fields[field] & values for field, values in filters.items()):
+                    page.append(entry)
+                    if len(page) > limit:
+                        break
+
+        more = len(page) > limit
+        page = page[:limit]
+        return page, page[-1].key if more and page else None
+
+    @staticmethod
+    def encode(entries, now):
+        """JSON array of entries, each with its "time" relative to `now` (epoch seconds)"""
+        return b'[' + b','.join(
+            entry.body[:-1] + b',"time":"' + relative_time(max(0.0, now - entry.timestamp)).encode() + b'"}'
+            for entry in entries
+        ) + b']'
@@ -0,0 +1,289 @@
+"""Columnar OHLC storage and a vectorized mock bar generator"""
+import numpy as np
+
+# Intraday range multipliers applied on top of the open/close envelope
+HIGH_WICK = (1.001, 1.025)
+LOW_WICK = (0.975, 0.999)
+
+# Mock volume range per daily bar (inclusive); shorter bars get a pro-rata share
+VOLUME_RANGE = (1000000, 50000000)
+
+SECONDS_PER_DAY = 86400
+
+
+COLUMNS = ('dates', 'open', 'high', 'low', 'close', 'volume')
+
+
+class BarSeries:
+    """OHLCV bars for one symbol stored as parallel NumPy arrays plus a date index.
+
+    The arrays hold closed bars only. `live` optionally carries the still-forming
+    bar as an API record; it is kept apart so that updating it never touches
+    arrays a reader may hold.
+    """
+
+    __slots__ = COLUMNS + ('live',)
+
+    def __init__(self, dates, open, high, low, close, volume, live=None):
+        self.dates = dates
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.live = live
+
+    def __len__(self):
+        return len(self.close)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the column arrays"""
+        return sum(getattr(self, name).nbytes for name in COLUMNS)
+
+    def window(self, start=None, end=None, limit=None):
+        """Bars starting within [start, end], keeping only the last `limit` of them.
+
+        `start`/`end` are datetime64 values. The date index is sorted, so the
+        bounds are found by binary search and the result is a zero-copy slice;
+        the cost after that scales with the window, not the full history.
+        """
+        dates = self.dates
+        live = self.live
+        if live is not None:
+            live_date = np.datetime64(live['date'])
+            if ((start is not None and live_date < _ceil_to(start, dates.dtype))
+                    or (end is not None and live_date > _floor_to(end, dates.dtype))
+                    or (limit is not None and limit <= 0)):
+                live = None
+
+        lo, hi = window_bounds(dates, start, end, limit, reserve=live is not None)
+        return BarSeries(dates[lo:hi], self.open[lo:hi], self.high[lo:hi], self.low[lo:hi],
+                         self.close[lo:hi], self.volume[lo:hi], live)
+
+    def record(self, index):
+        """Return one bar in the API's dict format"""
+        return {
+            'date': str(self.dates[index]),
+            'open': round(float(self.open[index]), 4),
+            'high': round(float(self.high[index]), 4),
+            'low': round(float(self.low[index]), 4),
+            'close': round(float(self.close[index]), 4),
+            'volume': int(self.volume[index])
+        }
+
+    def to_records(self):
+        """Return every bar in the API's list-of-dicts format"""
+        columns = zip(
+            np.datetime_as_string(self.dates).tolist(),
+            self.open.round(4).tolist(),
+            self.high.round(4).tolist(),
+            self.low.round(4).tolist(),
+            self.close.round(4).tolist(),
+            self.volume.tolist()
+        )
+        records = [
+            {'date': d, 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+            for d, o, h, l, c, v in columns
+        ]
+        if self.live is not None:
+            records.append(self.live)
+        return records
+
+
+def window_bounds(dates, start=None, end=None, limit=None, reserve=0):
+    """Binary-search [lo, hi) of a sorted date index for dates within [start, end].
+
+    Only the last `limit - reserve` dates are kept when `limit` is given.
+    """
+    lo = 0 if start is None else int(np.searchsorted(dates, _ceil_to(start, dates.dtype), 'left'))
+    hi = len(dates) if end is None else int(np.searchsorted(dates, _floor_to(end, dates.dtype), 'right'))
+    if limit is not None:
+        lo = max(lo, hi - max(0, limit - reserve))
+    return min(lo, hi), hi
+
+
+def _floor_to(moment, dtype):
+    """Latest value of `dtype` at or before `moment`"""
+    return np.datetime64(moment).astype(dtype)
+
+
+def _ceil_to(moment, dtype):
+    """Earliest value of `dtype` at or after `moment`"""
+    moment = np.datetime64(moment)
+    floored = moment.astype(dtype)
+    return floored if floored == moment else floored + 1
+
+
+class BarMatrix:
+    """Bars for many symbols at once, one (symbols x bars) matrix per column"""
+
+    __slots__ = ('symbols', 'dates', 'open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, symbols, dates, open, high, low, close, volume):
+        self.symbols = symbols
+        self.dates = dates
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def slice(self, lo=None, hi=None):
+        """Zero-copy BarMatrix of bar columns lo:hi for every symbol"""
+        index = slice(lo, hi)
+        return BarMatrix(self.symbols, self.dates[index], self.open[:, index], self.high[:, index],
+                         self.low[:, index], self.close[:, index], self.volume[:, index])
+
+    def series(self, index, live=None):
+        """Zero-copy per-symbol view of row `index`"""
+        return BarSeries(self.dates, self.open[index], self.high[index], self.low[index],
+                         self.close[index], self.volume[index], live)
+
+    def items(self):
+        """Iterate (symbol, BarSeries) pairs"""
+        for index, symbol in enumerate(self.symbols):
+            yield symbol, self.series(index)
+
+
+class ColumnBuffer:
+    """Fixed-capacity window of named per-symbol columns sharing one date index.
+
+    Backing arrays are twice the capacity and only ever written past the current
+    end, so a view handed to a reader is never modified afterwards. When the
+    backing fills up the window is copied into fresh arrays, which keeps appends
+    amortized O(1) and leaves older views intact. `allocate(shape, dtype)`
+    creates the backing arrays, e.g. in shared memory.
+    """
+
+    def __init__(self, symbols, capacity, columns, date_unit='D', allocate=np.empty):
+        self.symbols = list(symbols)
+        self.capacity = capacity
+        self.columns = dict(columns)
+        self.date_unit = date_unit
+        self.allocate = allocate
+        self._start = 0
+        self._end = 0
+        self._allocate()
+
+    def __len__(self):
+        return self._end - self._start
+
+    def _allocate(self):
+        size = 2 * self.capacity
+        rows = len(self.symbols)
+        self._dates = self.allocate(size, np.dtype(f'datetime64[{self.date_unit}]'))
+        self._data = {name: self.allocate((rows, size), np.dtype(dtype)) for name, dtype in self.columns.items()}
+
+    def _make_room(self, n):
+        """Ensure `n` more columns fit past the end, compacting into new arrays if needed"""
+        if self._end + n <= self._dates.shape[0]:
+            return
+        keep = min(len(self), self.capacity - n)
+        old_dates, old_data, old_end = self._dates, self._data, self._end
+        self._allocate()
+        self._dates[:keep] = old_dates[old_end - keep:old_end]
+        for name, column in self._data.items():
+            column[:, :keep] = old_data[name][:, old_end - keep:old_end]
+        self._start, self._end = 0, keep
+
+    def append_values(self, date, values):
+        """Append one value per symbol for every column, dropping the oldest beyond capacity"""
+        self._make_room(1)
+        end = self._end
+        self._dates[end] = date
+        for name, column in self._data.items():
+            column[:, end] = values[name]
+        self._end = end + 1
+        self._start = max(self._start, self._end - self.capacity)
+
+    def extend_values(self, dates, values):
+        """Append many dates at once; `values` maps column name to a (symbols x dates) matrix"""
+        n = min(len(dates), self.capacity)
+        self._make_room(n)
+        end = self._end
+        self._dates[end:end + n] = dates[-n:]
+        for name, column in self._data.items():
+            column[:, end:end + n] = values[name][:, -n:]
+        self._end = end + n
+        self._start = max(self._start, self._end - self.capacity)
+
+    def view_values(self):
+        """Zero-copy (dates, {column: matrix}) over the current window"""
+        s, e = self._start, self._end
+        return self._dates[s:e], {name: column[:, s:e] for name, column in self._data.items()}
+
+
+class BarBuffer(ColumnBuffer):
+    """ColumnBuffer of closed OHLCV bars"""
+
+    BAR_COLUMNS = {'open': np.float64, 'high': np.float64, 'low': np.float64,
+                   'close': np.float64, 'volume': np.int64}
+
+    def __init__(self, symbols, capacity, date_unit='D', allocate=np.empty):
+        super().__init__(symbols, capacity, self.BAR_COLUMNS, date_unit, allocate)
+
+    def append(self, date, open, high, low, close, volume):
+        """Append one closed bar per symbol, dropping the oldest beyond capacity"""
+        self.append_values(date, {'open': open, 'high': high, 'low': low, 'close': close, 'volume': volume})
+
+    def extend(self, bars):
+        """Append every column of a BarMatrix (used to backfill history)"""
+        self.extend_values(bars.dates, {name: getattr(bars, name) for name in self.BAR_COLUMNS})
+
+    def view(self):
+        """Zero-copy BarMatrix over the current window"""
+        dates, data = self.view_values()
+        return BarMatrix(self.symbols, dates, data['open'], data['high'], data['low'],
+                         data['close'], data['volume'])
+
+
+def date_unit(interval):
+    """datetime64 unit used to index bars of `interval` seconds"""
+    return 'D' if interval % SECONDS_PER_DAY == 0 else 'm'
+
+
+def time_index(n_bars, end=None, interval=SECONDS_PER_DAY):
+    """Index of `n_bars` bar start times, `interval` seconds apart, ending at `end` (now by default)"""
+    unit = date_unit(interval)
+    step = interval // SECONDS_PER_DAY if unit == 'D' else interval // 60
+    end = np.datetime64(end if end is not None else 'now', unit)
+    return end - np.arange(n_bars - 1, -1, -1) * np.timedelta64(step, unit)
+
+
+def generate_ohlc_batch(symbols, base_prices, change_ranges, n_bars=30, end_date=None, rng=None,
+                        interval=SECONDS_PER_DAY):
+    """Generate a random-walk OHLCV matrix for many symbols in one vectorized pass.
+
+    `base_prices` holds one starting price per symbol and `change_ranges` one
+    (min, max) fractional daily change per symbol. Bars shorter than a day keep
+    the daily drift and scale the noise by sqrt(interval / day), so any number
+    of intraday bars adds up to the same daily behaviour. `rng` may be a
+    numpy Generator or a seed; the same seed always produces the same bars.
+    """
+    rng = rng if isinstance(rng, np.random.Generator) else np.random.default_rng(rng)
+    base = np.asarray(base_prices, dtype=np.float64).reshape(-1, 1)
+    ranges = np.asarray(change_ranges, dtype=np.float64).reshape(-1, 2)
+    shape = (base.shape[0], n_bars)
+    fraction = interval / SECONDS_PER_DAY
+    noise = np.sqrt(fraction)
+
+    drift = ranges.mean(axis=1, keepdims=True)
+    half_range = (ranges[:, 1:] - ranges[:, :1]) / 2
+    change = drift * fraction + rng.uniform(-half_range, half_range, shape) * noise
+    close = base * np.cumprod(1.0 + change, axis=1)
+    open_ = np.empty(shape)
+    open_[:, 0] = base[:, 0]
+    open_[:, 1:] = close[:, :-1]
+
+    high_wick = rng.uniform(1 + (HIGH_WICK[0] - 1) * noise, 1 + (HIGH_WICK[1] - 1) * noise, shape)
+    low_wick = rng.uniform(1 - (1 - LOW_WICK[0]) * noise, 1 - (1 - LOW_WICK[1]) * noise, shape)
+    high = np.maximum(open_, close) * high_wick
+    low = np.minimum(open_, close) * low_wick
+    volume = rng.integers(max(1, int(VOLUME_RANGE[0] * fraction)), max(1, int(VOLUME_RANGE[1] * fraction)),
+                          shape, endpoint=True)
+
+    return BarMatrix(list(symbols), time_index(n_bars, end_date, interval), open_, high, low, close, volume)
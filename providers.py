@@ -0,0 +1,239 @@
+"""Market data providers: the mock random walk and an HTTP quote backend"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+# Upstream path for one quote; the response is JSON {"price": float, "volume": int}
+QUOTE_PATH = '/quote/{market}/{symbol}'
+
+DEFAULT_WORKERS = 16
+DEFAULT_TIMEOUT = 5.0
+DEFAULT_RATE = 50.0
+DEFAULT_BURST = 50
+
+# Quotes younger than this are served from memory instead of going upstream
+DEFAULT_CACHE_TTL = 1.0
+
+# Retries within one fetch, then per-symbol cooldown growing up to MAX_BACKOFF seconds
+RETRIES = 2
+BACKOFF_BASE = 0.2
+MAX_BACKOFF = 60.0
+
+
+class MarketDataProvider:
+    """Source of each tick's prices; fetch_real_data() asks it once per refresh"""
+
+    name = 'base'
+
+    def quotes(self, engines, now):
+        """{market_type: (close, volume)} arrays aligned with each engine's symbols"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MockProvider(MarketDataProvider):
+    """Each engine's own random walk, as before providers existed"""
+
+    name = 'mock'
+
+    def quotes(self, engines, now):
+        # Seeded engines compute their own bars from the clock
+        return {market_type: engine.simulate() if engine.seed is None else (None, None)
+                for market_type, engine in engines.items()}
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, at most `capacity` banked"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one execution.
+
+    The first caller runs the function; callers arriving while it is in
+    flight wait for and share its result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class HttpProvider(MarketDataProvider):
+    """Quotes fetched per symbol from an HTTP API.
+
+    All fetches share one pooled requests.Session and run concurrently on a
+    thread pool. Identical in-flight fetches are coalesced, fresh quotes are
+    served from a short-lived cache, upstream calls are rate limited by a
+    token bucket, and a failing symbol is retried with exponential backoff
+    and then left alone for a growing cooldown. A symbol without a quote
+    keeps its previous price for the tick.
+    """
+
+    name = 'http'
+
+    def __init__(self, base_url, api_token=None, workers=DEFAULT_WORKERS, timeout=DEFAULT_TIMEOUT,
+                 rate=DEFAULT_RATE, burst=DEFAULT_BURST, cache_ttl=DEFAULT_CACHE_TTL):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if api_token:
+            self.session.headers['Authorization'] = f'Bearer {api_token}'
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='quote')
+        self.limiter = TokenBucket(rate, burst)
+        self.flights = SingleFlight()
+        self.upstream_calls = 0
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._failures = {}
+
+    def quote(self, market_type, symbol):
+        """(price, volume) for one symbol, or None if it is unavailable right now"""
+        key = (market_type, symbol)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        if time.monotonic() < self._failures.get(key, (0, 0.0))[1]:
+            return None
+        try:
+            # Re-check inside the flight: a fetch may have finished since the miss above
+            return self.flights.do(key, lambda: self._cached(key) or self._fetch(key))
+        except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+            print(f"❌ Quote fetch failed for {market_type}/{symbol}: {e}")
+            return None
+
+    def _cached(self, key):
+        cached = self._cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.cache_ttl:
+            return cached[1]
+        return None
+
+    def quotes(self, engines, now):
+        futures = {
+            market_type: [self.executor.submit(self.quote, market_type, symbol) for symbol in engine.symbols]
+            for market_type, engine in engines.items()
+        }
+        result = {}
+        for market_type, engine in engines.items():
+            fetched = [future.result() for future in futures[market_type]]
+            close = engine.last_close.copy()
+            volume = np.zeros(len(engine.symbols), dtype=np.int64)
+            for i, item in enumerate(fetched):
+                if item is not None:
+                    close[i], volume[i] = item
+            result[market_type] = (close, volume)
+        return result
+
+    def _fetch(self, key):
+        market_type, symbol = key
+        url = self.base_url + QUOTE_PATH.format(market=quote(market_type, safe=''), symbol=quote(symbol, safe=''))
+        for attempt in range(RETRIES + 1):
+            self.limiter.acquire()
+            with self._lock:
+                self.upstream_calls += 1
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+                if response.status_code == 429 or response.status_code >= 500:
+                    raise requests.HTTPError(f'HTTP {response.status_code}', response=response)
+            except requests.RequestException:
+                # Transient: connection problems, throttling and server errors are retried
+                if attempt == RETRIES:
+                    self._record_failure(key)
+                    raise
+                time.sleep(BACKOFF_BASE * 2 ** attempt * random.uniform(0.5, 1.5))
+                continue
+
+            try:
+                response.raise_for_status()
+                body = response.json()
+                item = (float(body['price']), int(body.get('volume', 0)))
+            except (requests.RequestException, ValueError, KeyError, TypeError):
+                self._record_failure(key)
+                raise
+            with self._lock:
+                self._failures.pop(key, None)
+                self._cache[key] = (time.monotonic(), item)
+            return item
+
+    def _record_failure(self, key):
+        with self._lock:
+            failures = self._failures.get(key, (0, 0.0))[0] + 1
+            cooldown = min(MAX_BACKOFF, BACKOFF_BASE * 2 ** (RETRIES + failures))
+            self._failures[key] = (failures, time.monotonic() + cooldown)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+
+PROVIDERS = {provider.name: provider for provider in (MockProvider, HttpProvider)}
+
+
+def create_provider(name, **options):
+    """Instantiate a provider by name ('mock' or 'http')"""
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown market data provider '{name}'; choose from {', '.join(PROVIDERS)}")
+    return PROVIDERS[name](**options)
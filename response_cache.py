@@ -0,0 +1,156 @@
+"""Per-snapshot cache of encoded and compressed JSON responses"""
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from functools import partial
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip and identity are always served
+    brotli = None
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 512
+
+# Bytes of bodies (identity plus compressed variants) kept per process; least recently used go first
+MAX_BYTES = 32 << 20
+
+# Larger bodies are served but never cached, so one long history cannot push out everything else
+MAX_ENTRY_BYTES = 2 << 20
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _compressors():
+    compressors = {'gzip': lambda body: gzip.compress(body, GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        compressors['br'] = lambda body: brotli.compress(body, quality=BROTLI_QUALITY)
+    return compressors
+
+
+COMPRESSORS = _compressors()
+
+# Server preference when the client accepts several encodings equally
+ENCODING_PREFERENCE = [name for name in ('br', 'gzip') if name in COMPRESSORS]
+
+
+class CachedResponse:
+    """One JSON body encoded once, plus its compressed variants.
+
+    Compressed variants are produced the first time a client asks for them;
+    two requests racing to build one only duplicate work, never corrupt it.
+    Once cached, `on_grow` tells the cache the size of each new variant.
+    """
+
+    __slots__ = ('version', 'body', 'etag', 'status', 'headers', 'variants', 'on_grow')
+
+    def __init__(self, version, payload, status=200, headers=None):
+        self.version = version
+        # A bytes payload is JSON that was already encoded
+        if isinstance(payload, bytes):
+            self.body = payload
+        else:
+            self.body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        # Sent as a weak validator: one ETag covers every content-coding of the body
+        self.etag = hashlib.blake2b(self.body, digest_size=12).hexdigest()
+        self.status = status
+        self.headers = headers or {}
+        self.variants = {'identity': self.body}
+        self.on_grow = None
+
+    def variant(self, encoding):
+        body = self.variants.get(encoding)
+        if body is None:
+            body = COMPRESSORS[encoding](self.body)
+            # Only the racer whose variant is kept accounts for it
+            if self.variants.setdefault(encoding, body) is body and self.on_grow is not None:
+                self.on_grow(self, len(body))
+        return body
+
+
+class ResponseCache:
+    """Encoded responses for the current snapshot version, dropped wholesale on publish.
+
+    Lookups read a dict that is replaced, not cleared, when a new snapshot is
+    published. Within a version the bodies held are bounded by `max_bytes`:
+    the least recently used responses are dropped to make room, and bodies
+    over `max_entry_bytes` are not cached at all. The lock only guards that
+    bookkeeping, never building or compressing a body.
+    """
+
+    def __init__(self, max_bytes=MAX_BYTES, max_entry_bytes=MAX_ENTRY_BYTES, enabled=True):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self.enabled = enabled
+        self._version = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def evict(self, version):
+        """Forget every response built for versions older than `version`"""
+        with self._lock:
+            if version > self._version:
+                self._version = version
+                self._entries = OrderedDict()
+                self._sizes = {}
+                self.bytes = 0
+
+    def get(self, key, version, build):
+        """Cached response for `key` at `version`, built with build() -> (payload, status, headers) on a miss"""
+        entries = self._entries
+        entry = entries.get(key) if self.enabled else None
+        if entry is not None and entry.version == version:
+            self.hits += 1
+            with self._lock:
+                if key in entries:
+                    entries.move_to_end(key)
+            return entry
+
+        self.misses += 1
+        entry = CachedResponse(version, *build())
+        # Only cache successful responses for the version currently being served
+        if self.enabled and entry.status == 200 and len(entry.body) <= self.max_entry_bytes:
+            with self._lock:
+                if version == self._version and entries is self._entries and key not in entries:
+                    # No other request can see the entry yet, so every variant is counted through _grow
+                    entry.on_grow = partial(self._grow, entries, key)
+                    self._sizes[key] = len(entry.body)
+                    self.bytes += len(entry.body)
+                    entries[key] = entry
+                    self._shrink()
+        return entry
+
+    def _grow(self, entries, key, entry, size):
+        """Account for a compressed variant of `entry`, if it is still cached"""
+        with self._lock:
+            if entries is self._entries and entries.get(key) is entry:
+                self._sizes[key] += size
+                self.bytes += size
+                self._shrink()
+
+    def _shrink(self):
+        """Drop least recently used responses until the cached bytes fit; the lock is held"""
+        while self.bytes > self.max_bytes and self._entries:
+            key, _ = self._entries.popitem(last=False)
+            self.bytes -= self._sizes.pop(key)
+            self.evictions += 1
+
+
+def negotiate(accept_encodings, size):
+    """Best content-coding for a werkzeug Accept-Encoding header and body size"""
+    if size < MIN_COMPRESS_SIZE:
+        return 'identity'
+    best = None
+    for name in ENCODING_PREFERENCE:
+        quality = accept_encodings[name]
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (name, quality)
+    return best[0] if best else 'identity'
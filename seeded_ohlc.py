@@ -0,0 +1,121 @@
+"""Seeded mock bars: every 1m bar is a pure function of (symbol, minute, seed)"""
+import hashlib
+
+import numpy as np
+
+from aggregation import INTERVALS, bucket_seconds, rollup
+from ohlc import HIGH_WICK, LOW_WICK, SECONDS_PER_DAY, VOLUME_RANGE, BarMatrix
+
+# Log-price noise is a sum of octaves whose lattices are OCTAVE_BASE ** k minutes
+# apart, from one minute up to ~45 days
+OCTAVES = 9
+OCTAVE_BASE = 4
+
+# Hash streams for per-bar draws; the octaves use streams 0..OCTAVES-1
+HIGH_STREAM = OCTAVES
+LOW_STREAM = OCTAVES + 1
+VOLUME_STREAM = OCTAVES + 2
+
+MINUTES_PER_DAY = SECONDS_PER_DAY // 60
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _mix(x):
+    """splitmix64 finalizer over a uint64 array; arithmetic wraps"""
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def symbol_keys(symbols, seed):
+    """(symbols x 1) uint64 hash keys; stable across processes, unlike hash()"""
+    keys = [int.from_bytes(hashlib.blake2b(f'{seed}:{symbol}'.encode('utf-8'), digest_size=8).digest(), 'little')
+            for symbol in symbols]
+    return np.array(keys, dtype=np.uint64).reshape(-1, 1)
+
+
+def uniform(keys, stream, index):
+    """(symbols x len(index)) uniform [0, 1) draws, one per (key, stream, index)"""
+    counter = np.asarray(index, dtype=np.int64).astype(np.uint64) * _GOLDEN + np.uint64(stream)
+    with np.errstate(over='ignore'):
+        bits = _mix(keys ^ _mix(counter.reshape(1, -1)))
+    return (bits >> np.uint64(11)) * 2.0 ** -53
+
+
+def log_noise(keys, half_range, minutes):
+    """Log-price offset from the base price at each epoch minute.
+
+    Every octave interpolates linearly between uniform(-1, 1) lattice values,
+    scaled by sqrt(spacing) like a random walk, so the minute-to-minute and
+    day-to-day spread match the market's daily change range. Only the lattice
+    points the range touches are hashed, so the cost is O(len(minutes)).
+    """
+    total = np.zeros((keys.shape[0], len(minutes)))
+    for octave in range(OCTAVES):
+        spacing = OCTAVE_BASE ** octave
+        cell, remainder = np.divmod(minutes, spacing)
+        lattice = uniform(keys, octave, np.arange(cell[0], cell[-1] + 2)) * 2 - 1
+        left = lattice[:, cell - cell[0]]
+        right = lattice[:, cell - cell[0] + 1]
+        amplitude = half_range * np.sqrt(spacing / MINUTES_PER_DAY)
+        total += amplitude * (left + (right - left) * (remainder / spacing))
+    return total
+
+
+def generate_seeded_ohlc(symbols, base_prices, change_ranges, start, end, seed):
+    """1m bars for the epoch seconds [start, end) of many symbols, reproducible anywhere.
+
+    The price at each minute boundary is base * exp(noise), a bar opens at
+    its minute's price and closes at the next one's, and wicks and volume
+    are drawn per bar with the same ranges as generate_ohlc_batch. Nothing
+    depends on earlier bars, so any range can be generated on its own and
+    agrees with every other range that overlaps it. The walk has no drift:
+    prices wander around their base instead of compounding it.
+    """
+    keys = symbol_keys(symbols, seed)
+    base = np.asarray(base_prices, dtype=np.float64).reshape(-1, 1)
+    ranges = np.asarray(change_ranges, dtype=np.float64).reshape(-1, 2)
+    half_range = (ranges[:, 1:] - ranges[:, :1]) / 2
+    minutes = np.arange(start // 60, end // 60, dtype=np.int64)
+
+    prices = base * np.exp(log_noise(keys, half_range, np.r_[minutes, minutes[-1:] + 1]))
+    open_, close = prices[:, :-1], prices[:, 1:]
+
+    fraction = 60 / SECONDS_PER_DAY
+    noise = np.sqrt(fraction)
+    high_wick = 1 + noise * (HIGH_WICK[0] - 1 + (HIGH_WICK[1] - HIGH_WICK[0]) * uniform(keys, HIGH_STREAM, minutes))
+    low_wick = 1 - noise * (1 - LOW_WICK[0] - (LOW_WICK[1] - LOW_WICK[0]) * uniform(keys, LOW_STREAM, minutes))
+    low_volume = max(1, int(VOLUME_RANGE[0] * fraction))
+    high_volume = max(1, int(VOLUME_RANGE[1] * fraction))
+    volume = low_volume + (uniform(keys, VOLUME_STREAM, minutes) * (high_volume - low_volume + 1)).astype(np.int64)
+
+    return BarMatrix(list(symbols), minutes.astype('datetime64[m]'), open_, np.maximum(open_, close) * high_wick,
+                     np.minimum(open_, close) * low_wick, close, volume)
+
+
+def seeded_history(symbols, base_prices, change_ranges, seed, start, end, interval):
+    """Complete `interval` bars covering the datetime64 range [start, end], generated on demand.
+
+    The range is widened to whole buckets, so each bar equals the one a
+    seeded MarketEngine holding that period would serve.
+    """
+    seconds = INTERVALS[interval]
+    first, stop = _bucket_range(start, end, seconds)
+    bars = generate_seeded_ohlc(symbols, base_prices, change_ranges, first, stop, seed)
+    return bars if interval == '1m' else rollup(bars, seconds)
+
+
+def seeded_minutes(start, end, interval):
+    """1m bars per symbol seeded_history() generates for the same range; its cost grows with this"""
+    first, stop = _bucket_range(start, end, INTERVALS[interval])
+    return (stop - first) // 60
+
+
+def _bucket_range(start, end, seconds):
+    """Epoch seconds [first, stop) of the whole buckets covering the datetime64 range [start, end]"""
+    first = bucket_seconds(int(np.datetime64(start, 's').astype(np.int64)), seconds)
+    last = bucket_seconds(int(np.datetime64(end, 's').astype(np.int64)), seconds)
+    return first, last + seconds
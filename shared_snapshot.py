@@ -0,0 +1,373 @@
+"""Market snapshots shared by every worker process through files in shared memory (e.g. /dev/shm)"""
+import bisect
+import fcntl
+import itertools
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import weakref
+from collections import deque
+
+import numpy as np
+
+from aggregation import LevelView
+from breadth import MarketBreadth
+from indicators import IndicatorView
+from market_engine import MarketView
+from market_state import MarketSnapshot
+from ohlc import BarMatrix
+
+SEGMENT_MAGIC = b'SNAPSEG1'
+
+# Segment file prefix: magic, then the byte length of the JSON header that follows
+SEGMENT_PREFIX = struct.Struct('<8sQ')
+
+# Inline arrays start on this boundary
+ALIGNMENT = 64
+
+# Published segments (and the buffers they reference) kept for readers that are behind
+KEEP_VERSIONS = 8
+
+CONTROL_FILE = 'current'
+LEASE_FILE = 'updater.lock'
+
+BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+# MarketBreadth columns, in its constructor's order
+BREADTH_COLUMNS = ('price', 'change', 'volume')
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _open_mapping(path, size=0, writable=False):
+    fd = os.open(path, os.O_RDWR | os.O_CREAT if writable else os.O_RDONLY, 0o600)
+    try:
+        if writable and size:
+            os.ftruncate(fd, size)
+        return mmap.mmap(fd, size, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+    finally:
+        os.close(fd)
+
+
+class SharedArena:
+    """Allocator for engine buffers backed by files in the shared memory directory.
+
+    A published segment refers to arrays allocated here by file and offset
+    instead of copying them, so a snapshot costs O(symbols) to publish
+    however much history the engines hold. A file is removed once the last
+    array using it is dropped; readers that mapped it keep their mapping.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.prefix = f'{os.getpid()}-{os.urandom(4).hex()}-'
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._starts = []
+        self._regions = {}
+
+    def empty(self, shape, dtype):
+        """Uninitialized array in a new shared file; a drop-in for np.empty"""
+        dtype = np.dtype(dtype)
+        count = int(np.prod(shape))
+        size = max(1, count * dtype.itemsize)
+        name = f'{self.prefix}{next(self._counter)}.arr'
+        path = os.path.join(self.directory, name)
+        buffer = _open_mapping(path, size, writable=True)
+        array = np.frombuffer(buffer, dtype, count).reshape(shape)
+        start = array.__array_interface__['data'][0]
+        with self._lock:
+            bisect.insort(self._starts, start)
+            self._regions[start] = (start + size, name)
+        weakref.finalize(buffer, self._release, start, path)
+        return array
+
+    def _release(self, start, path):
+        with self._lock:
+            self._regions.pop(start, None)
+            i = bisect.bisect_left(self._starts, start)
+            if i < len(self._starts) and self._starts[i] == start:
+                del self._starts[i]
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    def locate(self, array):
+        """(file name, byte offset) of an array that lives in one of this arena's files, or None"""
+        address = array.__array_interface__['data'][0]
+        with self._lock:
+            i = bisect.bisect_right(self._starts, address) - 1
+            if i < 0:
+                return None
+            start = self._starts[i]
+            end, name = self._regions[start]
+        return (name, address - start) if address < end else None
+
+
+class UpdaterLease:
+    """Exclusive lock held by the one process that generates snapshots.
+
+    flock() is released by the kernel when its holder exits, so a surviving
+    worker can take over.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    @property
+    def held(self):
+        return self._fd is not None
+
+    def try_acquire(self):
+        """True if this process holds the lease (acquiring it if vacant); never blocks"""
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def clear_directory(directory):
+    """Remove the segments, buffers and control file a previous server left in `directory`.
+
+    Files in shared memory outlive the server, so without this a new one
+    would start from the last run's snapshot. Returns False, leaving the
+    files in place, if a running server's updater still holds the lease.
+    """
+    os.makedirs(directory, exist_ok=True)
+    lease = UpdaterLease(os.path.join(directory, LEASE_FILE))
+    if not lease.try_acquire():
+        return False
+    try:
+        for name in os.listdir(directory):
+            if name == CONTROL_FILE or name.endswith(('.seg', '.seg.tmp', '.arr')):
+                try:
+                    os.unlink(os.path.join(directory, name))
+                except FileNotFoundError:
+                    pass
+    finally:
+        lease.release()
+    return True
+
+
+class _SegmentWriter:
+    """Collects array references and the arrays that have to be copied inline"""
+
+    def __init__(self, arena):
+        self.arena = arena
+        self.inline = []
+        self.size = 0
+
+    def ref(self, array):
+        array = np.asarray(array)
+        located = self.arena.locate(array) if array.size else None
+        if located is None:
+            # ascontiguousarray would turn a 0-d array (the live bar's date) into 1-d
+            array = np.ascontiguousarray(array).reshape(array.shape)
+            offset = _aligned(self.size)
+            self.inline.append((offset, array))
+            self.size = offset + array.nbytes
+            located = (None, offset)
+        name, offset = located
+        return {'file': name, 'offset': offset, 'dtype': array.dtype.str, 'shape': list(array.shape),
+                'strides': list(array.strides)}
+
+    def view(self, view):
+        return {
+            'symbols': view.symbols,
+            'previous_close': self.ref(view.previous_close),
+            'high_window': self.ref(view.high_window),
+            'low_window': self.ref(view.low_window),
+            'levels': {name: self.level(level) for name, level in view.levels.items()}
+        }
+
+    def level(self, level):
+        bars, live, indicators = level
+        state = indicators.state
+        return {
+            'bars': dict({field: self.ref(getattr(bars, field)) for field in BAR_FIELDS}, dates=self.ref(bars.dates)),
+            'live': None if live is None else {field: self.ref(value) for field, value in live.items()},
+            'indicators': {
+                'dates': self.ref(indicators.dates),
+                'values': {name: self.ref(values) for name, values in indicators.values.items()},
+                'state': None if state is None else {
+                    key: self.ref(value) if isinstance(value, np.ndarray) else
+                    value.item() if isinstance(value, np.generic) else value
+                    for key, value in state.items()
+                }
+            }
+        }
+
+    def breadth(self, breadth):
+        return {
+            'markets': breadth.markets,
+            'columns': {column: self.ref(getattr(breadth, column)) for column in BREADTH_COLUMNS}
+        }
+
+
+class _SegmentReader:
+    """Zero-copy arrays over a mapped segment and the arena files it references"""
+
+    def __init__(self, directory, segment, data_start, files):
+        self.directory = directory
+        self.segment = segment
+        self.data_start = data_start
+        self.previous_files = files
+        self.files = {}
+
+    def array(self, ref):
+        name = ref['file']
+        if name is None:
+            buffer, offset = self.segment, self.data_start + ref['offset']
+        else:
+            buffer = self.files.get(name) or self.previous_files.get(name)
+            if buffer is None:
+                buffer = _open_mapping(os.path.join(self.directory, name))
+            self.files[name] = buffer
+            offset = ref['offset']
+        return np.ndarray(ref['shape'], np.dtype(ref['dtype']), buffer=buffer, offset=offset,
+                          strides=ref['strides'])
+
+    def view(self, data):
+        symbols = [sys.intern(symbol) for symbol in data['symbols']]
+        levels = {name: self.level(symbols, level) for name, level in data['levels'].items()}
+        return MarketView(symbols, levels, self.array(data['previous_close']), self.array(data['high_window']),
+                          self.array(data['low_window']))
+
+    def breadth(self, data, historical):
+        """MarketBreadth over the segment's columns; each market's symbols come from its view"""
+        columns = {column: self.array(ref) for column, ref in data['columns'].items()}
+        markets = {}
+        lo = 0
+        for market_type in data['markets']:
+            symbols = historical[market_type].symbols
+            hi = lo + len(symbols)
+            markets[market_type] = (symbols, *(columns[column][lo:hi] for column in BREADTH_COLUMNS))
+            lo = hi
+        return MarketBreadth(markets)
+
+    def level(self, symbols, data):
+        bars = BarMatrix(symbols, self.array(data['bars']['dates']),
+                         *(self.array(data['bars'][field]) for field in BAR_FIELDS))
+        live = data['live']
+        if live is not None:
+            live = {field: self.array(ref) for field, ref in live.items()}
+            live['date'] = live['date'][()]
+        indicators = data['indicators']
+        state = indicators['state']
+        if state is not None:
+            state = {key: self.array(value) if isinstance(value, dict) else value for key, value in state.items()}
+        values = {name: self.array(ref) for name, ref in indicators['values'].items()}
+        return LevelView(bars, live, IndicatorView(self.array(indicators['dates']), values, state, bars, live))
+
+
+class SharedSnapshots:
+    """Publishes snapshots from the updater process and loads them in every other worker.
+
+    Each version is one segment file: a JSON header (prices, stats and the
+    layout of every market's bars and indicators) followed by the small
+    per-tick arrays. History buffers allocated from `arena` are referenced,
+    not copied. A control file holds the newest complete version and is
+    written only after its segment is in place, so readers never see a
+    partial snapshot.
+    """
+
+    def __init__(self, directory, keep=KEEP_VERSIONS):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.keep = keep
+        self.arena = SharedArena(directory)
+        self.lease = UpdaterLease(os.path.join(directory, LEASE_FILE))
+        self._published = deque(maxlen=keep)
+        self._control = None
+        self._control_writer = None
+        self._files = {}
+
+    def segment_path(self, version):
+        return os.path.join(self.directory, f'snapshot-{version}.seg')
+
+    def publish(self, snapshot):
+        """Write a snapshot's segment, then point the control file at it"""
+        writer = _SegmentWriter(self.arena)
+        header = json.dumps({
+            'version': snapshot.version,
+            'created_at': snapshot.created_at,
+            'prices': snapshot.prices,
+            'market_stats': snapshot.market_stats,
+            'historical': {market_type: writer.view(view) for market_type, view in snapshot.historical.items()},
+            'breadth': None if snapshot.breadth is None else writer.breadth(snapshot.breadth)
+        }, separators=(',', ':')).encode('utf-8')
+
+        path = self.segment_path(snapshot.version)
+        data_start = _aligned(SEGMENT_PREFIX.size + len(header))
+        with open(path + '.tmp', 'wb') as f:
+            f.write(SEGMENT_PREFIX.pack(SEGMENT_MAGIC, len(header)))
+            f.write(header)
+            for offset, array in writer.inline:
+                f.seek(data_start + offset)
+                f.write(array.tobytes())
+            f.truncate(max(data_start + writer.size, f.tell()))
+        os.replace(path + '.tmp', path)
+
+        if self._control_writer is None:
+            self._control_writer = _open_mapping(os.path.join(self.directory, CONTROL_FILE), 8, writable=True)
+        struct.pack_into('<q', self._control_writer, 0, snapshot.version)
+        # Referenced arena files live as long as these snapshots do
+        self._published.append(snapshot)
+        self._prune(snapshot.version)
+
+    def _prune(self, version):
+        """Drop segments older than `keep` versions and buffers left by a previous updater"""
+        for name in os.listdir(self.directory):
+            if name.startswith('snapshot-') and name.endswith('.seg'):
+                stale = int(name[len('snapshot-'):-len('.seg')]) <= version - self.keep
+            else:
+                stale = name.endswith('.arr') and not name.startswith(self.arena.prefix)
+            if stale:
+                try:
+                    os.unlink(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def latest_version(self):
+        """Newest published version, or 0 before anything was published; one 8-byte read"""
+        if self._control is None:
+            try:
+                self._control = _open_mapping(os.path.join(self.directory, CONTROL_FILE))
+            except (FileNotFoundError, ValueError):
+                return 0
+        return struct.unpack_from('<q', self._control)[0]
+
+    def load(self, version):
+        """MarketSnapshot for a published version, or None if it has already been pruned"""
+        try:
+            segment = _open_mapping(self.segment_path(version))
+            magic, length = SEGMENT_PREFIX.unpack_from(segment)
+            if magic != SEGMENT_MAGIC:
+                raise ValueError(f'{self.segment_path(version)} is not a snapshot segment')
+            header = json.loads(segment[SEGMENT_PREFIX.size:SEGMENT_PREFIX.size + length])
+            reader = _SegmentReader(self.directory, segment, _aligned(SEGMENT_PREFIX.size + length), self._files)
+            historical = {market_type: reader.view(view) for market_type, view in header['historical'].items()}
+            breadth = header['breadth'] and reader.breadth(header['breadth'], historical)
+        except FileNotFoundError:
+            return None
+        self._files = reader.files
+        return MarketSnapshot(header['version'], header['prices'], historical, header['market_stats'],
+                              created_at=header['created_at'], breadth=breadth)
@@ -4,8 +4,21 @@ console.log('🚀 Financial Dashboard Script loaded!');
 let refreshInterval;
 let newsUpdateInterval;
 let clockInterval; // New clock interval
+let priceStream = null; // Server-Sent Events connection to /api/stream
+let marketPrices = {}; // Latest prices per market, merged from stream deltas
+let chartHistory = {}; // Hourly bars per market from /api/historical/batch
 let apiBaseUrl = window.location.origin; // Dynamically get the base URL
 
+// Symbol plotted on each market's chart and the window it shows
+const CHART_SYMBOLS = {
+    forex: 'EUR/USD',
+    crypto: 'BTC/USDT',
+    stocks: 'AAPL',
+    commodities: 'XAUUSD'
+};
+const CHART_INTERVAL = '1h';
+const CHART_POINTS = 24;
+
 // DOM Content Loaded Event
 document.addEventListener('DOMContentLoaded', function() {
     console.log('🎯 DOM loaded, initializing Financial Dashboard...');
@@ -227,7 +240,7 @@ function formatPrice(price, symbol) {
     }
 }
 
-function initializeCharts() {
+async function initializeCharts() {
     console.log('📈 Initializing charts...');
     
     if (typeof Chart === 'undefined') {
@@ -236,6 +249,9 @@ function initializeCharts() {
         return;
     }
     
+    // One round trip for every chart; markets without history fall back to sample data
+    await fetchChartHistory();
+    
     const markets = ['forex', 'crypto', 'stocks', 'commodities'];
     
     markets.forEach(market => {
@@ -250,10 +266,7 @@ function initializeCharts() {
 
 function createChart(canvas, market) {
     const ctx = canvas.getContext('2d');
-    
-    // Generate realistic sample data
-    const data = generateChartData(market);
-    const labels = generateTimeLabels();
+    const { data, labels } = getChartSeries(market);
     
     new Chart(ctx, {
         type: 'line',
@@ -320,6 +333,50 @@ function createChart(canvas, market) {
     console.log(`✅ Created chart for ${market}`);
 }
 
+async function fetchChartHistory() {
+    const markets = Object.keys(CHART_SYMBOLS);
+    const symbols = markets.map(market => `${market}/${CHART_SYMBOLS[market]}`).join(',');
+    const url = `${apiBaseUrl}/api/historical/batch?symbols=${encodeURIComponent(symbols)}` +
+        `&interval=${CHART_INTERVAL}&limit=${CHART_POINTS}`;
+    
+    try {
+        console.log('📡 Fetching chart history from:', url);
+        const response = await fetch(url);
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+        }
+        
+        const data = await response.json();
+        data.results.forEach(result => {
+            if (result.bars && result.bars.length) {
+                chartHistory[result.market] = result.bars;
+            } else if (result.error) {
+                console.warn(`⚠️ No chart history for ${result.market}/${result.symbol}: ${result.error}`);
+            }
+        });
+        console.log(`✅ Chart history loaded for ${Object.keys(chartHistory).length} markets`);
+    } catch (error) {
+        console.error('❌ Chart history fetch failed:', error);
+        console.log('🎭 Using sample chart data...');
+    }
+}
+
+function getChartSeries(market) {
+    const bars = chartHistory[market];
+    if (!bars) {
+        return { data: generateChartData(market), labels: generateTimeLabels() };
+    }
+    
+    return {
+        data: bars.map(bar => bar.close),
+        labels: bars.map(bar => new Date(bar.date + 'Z').toLocaleTimeString('en-US', {
+            hour: '2-digit',
+            minute: '2-digit',
+            hour12: false
+        }))
+    };
+}
+
 function generateChartData(market) {
     let basePrice;
     let volatility;
@@ -594,8 +651,7 @@ function createModalChart(market) {
         modalCanvas.chart.destroy();
     }
     
-    const data = generateChartData(market);
-    const labels = generateTimeLabels();
+    const { data, labels } = getChartSeries(market);
     
     modalCanvas.chart = new Chart(ctx, {
         type: 'line',
@@ -660,12 +716,10 @@ function closeModal() {
 function startPeriodicUpdates() {
     console.log('⏰ Starting periodic updates...');
     
-    // Update data every 30 seconds (but not the clock - that's separate now)
-    refreshInterval = setInterval(() => {
-        console.log('🔄 Periodic data update...');
-        // Don't update clock here anymore - it has its own interval
-        simulatePriceUpdates();
-    }, 30000);
+    // Prefer server push; only fall back to polling when SSE is unavailable
+    if (!connectPriceStream()) {
+        startPricePolling();
+    }
     
     // Update news every 5 minutes
     newsUpdateInterval = setInterval(() => {
@@ -677,6 +731,76 @@ function startPeriodicUpdates() {
     }, 300000);
 }
 
+function startPricePolling() {
+    if (refreshInterval) return;
+    
+    // Update data every 30 seconds (but not the clock - that's separate now)
+    refreshInterval = setInterval(() => {
+        console.log('🔄 Periodic data update...');
+        // Don't update clock here anymore - it has its own interval
+        simulatePriceUpdates();
+    }, 30000);
+}
+
+function connectPriceStream() {
+    if (!window.EventSource) {
+        console.log('⚠️ EventSource not supported, using polling');
+        return false;
+    }
+    
+    console.log('📡 Connecting to price stream...');
+    // EventSource reconnects on its own and resends Last-Event-ID
+    priceStream = new EventSource(`${apiBaseUrl}/api/stream`);
+    
+    // Full state on first connect or when too far behind to resume
+    priceStream.addEventListener('snapshot', (event) => {
+        const data = JSON.parse(event.data);
+        marketPrices = data.prices;
+        applyPriceChanges(data.prices, data.market_stats);
+    });
+    
+    // Only the symbols that changed since the previous version
+    priceStream.addEventListener('prices', (event) => {
+        const data = JSON.parse(event.data);
+        Object.entries(data.prices).forEach(([market, symbols]) => {
+            marketPrices[market] = Object.assign({}, marketPrices[market], symbols);
+        });
+        applyPriceChanges(data.prices, data.market_stats);
+    });
+    
+    priceStream.addEventListener('open', () => {
+        console.log('✅ Price stream connected');
+        if (refreshInterval) {
+            clearInterval(refreshInterval);
+            refreshInterval = null;
+        }
+    });
+    
+    priceStream.addEventListener('error', () => {
+        if (priceStream.readyState === EventSource.CLOSED) {
+            console.log('⚠️ Price stream closed, falling back to polling');
+            priceStream = null;
+            startPricePolling();
+        }
+    });
+    
+    return true;
+}
+
+function applyPriceChanges(changedMarkets, marketStats) {
+    Object.keys(changedMarkets).forEach(market => {
+        if (marketPrices[market]) {
+            updateMarketPrices(market, marketPrices[market]);
+        }
+    });
+    
+    if (marketStats) {
+        updateElement('total-gainers', marketStats.gainers);
+        updateElement('total-losers', marketStats.losers);
+        updateElement('market-trend', marketStats.trend);
+    }
+}
+
 function simulatePriceUpdates() {
     console.log('🎲 Simulating price updates...');
     
@@ -785,13 +909,15 @@ async function fetchDataFromAPI() {
         const data = await response.json();
         console.log('✅ API data received:', {
             keys: Object.keys(data),
-            lastUpdated: data.last_updated
+            lastUpdated: data.last_updated,
+            snapshotVersion: data.snapshot_version
         });
         
         // Update markets with real data
         let updatedMarkets = 0;
+        const metaKeys = ['last_updated', 'market_stats', 'snapshot_version'];
         Object.keys(data).forEach(market => {
-            if (market !== 'last_updated' && market !== 'market_stats' && data[market]) {
+            if (!metaKeys.includes(market) && data[market]) {
                 updateMarketPrices(market, data[market]);
                 updatedMarkets++;
             }
@@ -985,6 +1111,11 @@ function cleanup() {
         clearInterval(clockInterval);
         console.log('🧹 Cleared clock interval');
     }
+    if (priceStream) {
+        priceStream.close();
+        priceStream = null;
+        console.log('🧹 Closed price stream');
+    }
 }
 
 // Handle page unload
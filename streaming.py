@@ -0,0 +1,92 @@
+"""Server-Sent Events fan-out of snapshot price deltas"""
+import json
+import threading
+from collections import deque
+
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT_INTERVAL = 15
+
+# Delta events kept for Last-Event-ID resume
+DELTA_HISTORY = 256
+
+
+def format_event(event, version, payload):
+    """Encode one SSE frame; done once per snapshot and shared by every client"""
+    data = json.dumps(payload, separators=(',', ':'))
+    return f"id: {version}\nevent: {event}\ndata: {data}\n\n".encode('utf-8')
+
+
+def price_delta(previous, current):
+    """Symbols whose price entry differs between two prices mappings"""
+    changed = {}
+    for market_type, symbols in current.items():
+        before = previous.get(market_type, {}) if previous else {}
+        market_changes = {symbol: data for symbol, data in symbols.items() if before.get(symbol) != data}
+        if market_changes:
+            changed[market_type] = market_changes
+    return changed
+
+
+class SnapshotBroadcaster:
+    """Encodes each published snapshot once and fans it out to every open stream.
+
+    Clients only wait on a shared Condition and replay pre-encoded frames, so
+    the per-client cost is a few bytes of state. Under a cooperative worker
+    (gunicorn -k gevent) each idle stream is a greenlet rather than an OS thread.
+    """
+
+    def __init__(self, history=DELTA_HISTORY, heartbeat=HEARTBEAT_INTERVAL):
+        self.heartbeat = heartbeat
+        self._condition = threading.Condition()
+        self._deltas = deque(maxlen=history)
+        self._full = None
+        self._version = 0
+        self._prices = None
+        self.clients = 0
+
+    def publish(self, snapshot):
+        """Compute and encode the delta for a newly published snapshot, then wake clients"""
+        if snapshot.version <= self._version:
+            return
+
+        meta = {'version': snapshot.version, 'last_updated': snapshot.last_updated,
+                'market_stats': snapshot.market_stats}
+        delta = format_event('prices', snapshot.version,
+                             dict(meta, prices=price_delta(self._prices, snapshot.prices)))
+        full = format_event('snapshot', snapshot.version, dict(meta, prices=snapshot.prices))
+
+        with self._condition:
+            self._deltas.append((snapshot.version, delta))
+            self._full = full
+            self._version = snapshot.version
+            self._prices = snapshot.prices
+            self._condition.notify_all()
+
+    def _pending(self, since):
+        """Frames a client at version `since` needs to catch up (call with the lock held)"""
+        if since is None or not self._deltas or since < self._deltas[0][0] - 1:
+            return [self._full] if self._full else []
+        return [frame for version, frame in self._deltas if version > since]
+
+    def stream(self, last_event_id=None):
+        """Generator of SSE frames for one client, resuming after `last_event_id` if possible"""
+        with self._condition:
+            self.clients += 1
+            # An id from the future belongs to another process' history; start over
+            since = last_event_id if last_event_id is not None and last_event_id <= self._version else None
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                with self._condition:
+                    self._condition.wait_for(lambda: self._version > (since or 0), timeout=self.heartbeat)
+                    frames = self._pending(since) if self._version > (since or 0) else []
+                    version = self._version
+                if not frames:
+                    yield b": keep-alive\n\n"
+                    continue
+                for frame in frames:
+                    yield frame
+                since = version
+        finally:
+            with self._condition:
+                self.clients -= 1
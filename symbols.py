@@ -0,0 +1,89 @@
+"""Instrument registry: every symbol with a stable integer ID, loaded from a config file"""
+import csv
+import json
+import os
+import sys
+from collections import namedtuple
+
+# `id` is unique across markets; `row` is the symbol's position within its market's engine;
+# `daily_change` is an optional (min, max) fractional daily move for the mock random walk
+Instrument = namedtuple('Instrument', ['id', 'market', 'row', 'symbol', 'base_price', 'display_name',
+                                       'daily_change'])
+
+
+class SymbolRegistry:
+    """Instruments in config order, numbered densely from 0.
+
+    Market names, symbols and display names are interned, so the registry,
+    the engines and every snapshot share one string object per name however
+    many thousands of instruments there are.
+    """
+
+    def __init__(self, entries):
+        self.instruments = []
+        self.markets = {}
+        self._ids = {}
+        for market, symbol, base_price, display_name, daily_change in entries:
+            market, symbol = sys.intern(market), sys.intern(symbol)
+            if (market, symbol) in self._ids:
+                raise ValueError(f"Duplicate symbol '{market}/{symbol}'")
+            symbols = self.markets.setdefault(market, [])
+            instrument = Instrument(len(self.instruments), market, len(symbols), symbol,
+                                    float(base_price) if base_price not in (None, '') else None,
+                                    sys.intern(display_name) if display_name else None,
+                                    _change_range(market, symbol, daily_change))
+            self.instruments.append(instrument)
+            self._ids[(market, symbol)] = instrument.id
+            symbols.append(symbol)
+
+    def __len__(self):
+        return len(self.instruments)
+
+    def id(self, market, symbol):
+        """Integer ID of one instrument, or None if it is not registered"""
+        return self._ids.get((market, symbol))
+
+    def get(self, market, symbol):
+        """Instrument record for one symbol, or None"""
+        instrument_id = self._ids.get((market, symbol))
+        return self.instruments[instrument_id] if instrument_id is not None else None
+
+    def market_instruments(self, market):
+        """Instruments of one market in engine row order"""
+        return [self.instruments[self._ids[(market, symbol)]] for symbol in self.markets.get(market, [])]
+
+    def display_names(self, market):
+        """Display name (or None) per symbol of a market, aligned with its engine rows"""
+        return [instrument.display_name for instrument in self.market_instruments(market)]
+
+
+def _change_range(market, symbol, daily_change):
+    """(min, max) from a config value, or None when it is not set"""
+    if daily_change is None or daily_change == (None, None) or daily_change == ('', ''):
+        return None
+    try:
+        low, high = (float(value) for value in daily_change)
+        if not low < high:
+            raise ValueError
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid daily_change {daily_change!r} for '{market}/{symbol}'; expected [min, max]")
+    return low, high
+
+
+def load_registry(path):
+    """Read a registry from JSON ({market: [{symbol, base_price, display_name, daily_change}]}) or CSV.
+
+    CSV files have a header row with market,symbol,base_price,display_name,
+    daily_change_min,daily_change_max; all but the first two columns may be
+    empty. daily_change is [min, max] as fractions, e.g. [-0.03, 0.03].
+    """
+    with open(path, newline='') as f:
+        if os.path.splitext(path)[1].lower() == '.csv':
+            entries = [(row['market'], row['symbol'], row.get('base_price'), row.get('display_name'),
+                        (row.get('daily_change_min'), row.get('daily_change_max')))
+                       for row in csv.DictReader(f)]
+        else:
+            entries = [(market, item['symbol'], item.get('base_price'), item.get('display_name'),
+                        item.get('daily_change'))
+                       for market, items in json.load(f).items() for item in items]
+    return SymbolRegistry(entries)